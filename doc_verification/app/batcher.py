@@ -0,0 +1,168 @@
+"""Dynamic micro-batching in front of the doctr OCR predictor.
+
+Pages submitted by concurrent requests are queued and flushed to the predictor
+as a single batched forward pass once either ``max_batch`` pages are waiting
+or the oldest page has waited ``max_wait_ms``.  A document with more than
+``max_batch`` pages is split into chunks of at most ``max_batch``, so no
+forward pass is ever larger than that.  Each caller gets back exactly the pages
+it submitted, in order.  `OCRBatcher.stop` cancels the futures of
+pages that have not been dispatched yet.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Sequence
+
+import numpy as np
+
+import metrics
+
+
+@dataclass
+class _Job:
+    pages: Sequence[np.ndarray]
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class OCRBatcher:
+    """Collects pages from concurrent uploads and runs them through *predict* together.
+
+    Args:
+        predict: Callable taking a list of pages and returning a list of per‑page
+            results aligned with the input (e.g. `workers.run_ocr`).
+        max_batch: Upper bound on pages per forward pass.  Larger documents are
+            split into chunks of this size; a chunk that would push a batch past
+            it waits for the next batch.
+        max_wait_ms: Longest time the first queued page waits for company.
+        runner: Optional ``async runner(fn, *args)`` used to execute *predict*
+            off the event loop (e.g. ``ExecutionLayer.cpu``).  Defaults to the
+            loop's default thread pool.
+        max_inflight: Batches allowed to run at once; set it to the number of
+            OCR workers so every worker stays busy.
+    """
+
+    def __init__(self, predict: Callable[[List[np.ndarray]], Any],
+                 max_batch: int = 8, max_wait_ms: float = 20.0,
+                 runner: Callable[..., Awaitable[Any]] | None = None,
+                 max_inflight: int = 1):
+        self.predict = predict
+        self.max_inflight = max_inflight
+        self.runner = runner
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue[_Job] | None = None
+        self._worker: asyncio.Task | None = None
+        self._held: List[_Job] = []   # dequeued but not yet dispatched (incl. a carried‑over job)
+        self.queued_pages = 0
+
+    # ─────────────────────────── lifecycle ───────────────────────────
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop batching and cancel every job not yet dispatched; running batches finish."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        jobs, self._held = self._held, []
+        while self._queue is not None and not self._queue.empty():
+            jobs.append(self._queue.get_nowait())
+        for job in jobs:
+            job.future.cancel()
+        self.queued_pages = 0
+
+    # ──────────────────────────── public ─────────────────────────────
+
+    async def submit(self, pages: Sequence[np.ndarray]) -> list:
+        """Queue *pages*, in chunks of at most ``max_batch``, and wait for their per‑page OCR results."""
+        if not pages:
+            return []
+        self.start()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for i in range(0, len(pages), self.max_batch):
+            chunk = pages[i:i + self.max_batch]
+            futures.append(loop.create_future())
+            self.queued_pages += len(chunk)
+            await self._queue.put(_Job(chunk, futures[-1]))
+        # Wait for every chunk (so no failure goes unretrieved), then raise the first failure.
+        parts = await asyncio.gather(*futures, return_exceptions=True)
+        for part in parts:
+            if isinstance(part, BaseException):
+                raise part
+        return [r for part in parts for r in part]
+
+    # ─────────────────────────── internals ───────────────────────────
+
+    async def _collect(self) -> List[_Job]:
+        """Jobs for the next forward pass, into ``self._held``; never more than ``max_batch`` pages."""
+        if not self._held:
+            self._held.append(await self._queue.get())
+            self.queued_pages -= len(self._held[0].pages)
+        batch = self._held
+        n_pages = sum(len(job.pages) for job in batch)
+        deadline = batch[0].enqueued + self.max_wait
+        while n_pages < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            self.queued_pages -= len(job.pages)
+            if n_pages + len(job.pages) > self.max_batch:
+                self._held = [job]  # starts the next batch
+                return batch
+            batch.append(job)
+            n_pages += len(job.pages)
+        self._held = []
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        run = self.runner or (lambda fn, *args: loop.run_in_executor(None, fn, *args))
+        inflight = asyncio.Semaphore(self.max_inflight)
+        while True:
+            batch = await self._collect()
+            try:
+                await inflight.acquire()
+            except asyncio.CancelledError:
+                self._held = batch + self._held  # let stop() cancel them
+                raise
+            task = loop.create_task(self._dispatch(run, batch))
+            task.add_done_callback(lambda _: inflight.release())
+
+    async def _dispatch(self, run, batch: List[_Job]) -> None:
+        pages = [p for job in batch for p in job.pages]
+        try:
+            # The forward pass is blocking; keep the event loop free while it runs.
+            result = await run(self.predict, pages)
+        except Exception as e:  # route the failure to every waiting caller
+            logging.exception("Batched OCR failed for %d pages", len(pages))
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+        logging.debug("OCR batch: %d jobs, %d pages", len(batch), len(pages))
+        metrics.MODEL_CALLS.inc(model="ocr")
+        metrics.OCR_BATCH_PAGES.observe(len(pages))
+        metrics.observe_stages(getattr(result, "timings", None))
+        offset = 0
+        for job in batch:
+            n = len(job.pages)
+            if not job.future.done():
+                job.future.set_result(result[offset:offset + n])
+            offset += n
@@ -0,0 +1,159 @@
+"""Content‑addressed cache for document‑verification results.
+
+Entries are keyed by the SHA‑256 of the raw upload bytes and tagged with a
+*version* fingerprint of everything that influences the result (OCR model,
+classifier prompt, logo hashes).  A lookup only hits when the stored version
+matches the caller's current one, so changing any of those invalidates old
+entries without an explicit flush.
+
+Two tiers:
+* an in‑process LRU (``OrderedDict``) for hot entries;
+* a SQLite file with TTL and a total‑size cap (least recently used rows are
+  evicted first) that survives restarts and is shared by workers on one host.
+
+The disk size is tracked as a running total, so a put costs no table scan.
+Every ``sweep_every`` puts, and whenever the total passes the cap, expired rows
+are dropped and the total is re-read from the table to pick up other workers'
+writes; eviction then goes down to ``EVICT_TO`` of the cap so the next few puts
+do not evict again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+
+def content_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable short hash of arbitrary JSON‑serialisable values."""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+EVICT_TO = 0.9  # fraction of the disk cap left after an eviction
+
+
+class ResultCache:
+    def __init__(self, path: Optional[Path], max_items: int = 1024,
+                 ttl_s: float = 7 * 24 * 3600, max_disk_mb: float = 512, sweep_every: int = 256):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.sweep_every = sweep_every
+        self._disk_bytes = 0  # running total of results.size
+        self._puts = 0
+        self._lru: OrderedDict[str, tuple[str, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, version TEXT NOT NULL, created REAL NOT NULL,"
+                " accessed REAL NOT NULL, size INTEGER NOT NULL, value TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed)")
+            self._db_sweep()
+
+    # ──────────────────────────── public ─────────────────────────────
+
+    def get(self, key: str, version: str) -> Optional[dict]:
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None and hit[0] == version:
+                self._lru.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return hit[1]
+            if hit is not None:
+                del self._lru[key]
+                self.stats["stale"] += 1
+
+            value = self._db_get(key, version)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._lru_put(key, version, value)
+            return value
+
+    def put(self, key: str, version: str, value: dict) -> None:
+        with self._lock:
+            self._lru_put(key, version, value)
+            if self._db is not None:
+                blob = json.dumps(value)
+                now = time.time()
+                old = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, version, now, now, len(blob), blob),
+                )
+                self._disk_bytes += len(blob) - (old[0] if old else 0)
+                self._puts += 1
+                if self._puts % self.sweep_every == 0 or self._disk_bytes > self.max_disk_bytes:
+                    self._db_sweep()
+                    self._db_evict()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            out = dict(self.stats, memory_items=len(self._lru),
+                       hit_ratio=round(hits / lookups, 4) if lookups else 0.0)
+            if self._db is not None:
+                n, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+                out.update(disk_items=n, disk_bytes=size)
+            return out
+
+    # ─────────────────────────── internals ───────────────────────────
+
+    def _lru_put(self, key: str, version: str, value: dict) -> None:
+        self._lru[key] = (version, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def _db_get(self, key: str, version: str) -> Optional[dict]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT version, created, size, value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        stored_version, created, size, blob = row
+        if stored_version != version or time.time() - created > self.ttl_s:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._disk_bytes -= size
+            self.stats["stale"] += 1
+            return None
+        self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(blob)
+
+    def _db_sweep(self) -> None:
+        """Drop expired rows and re-read the size total (other workers share the file)."""
+        cur = self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl_s,))
+        self.stats["evictions"] += max(cur.rowcount, 0)
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _db_evict(self) -> None:
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        target = int(self.max_disk_bytes * EVICT_TO)
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            self._disk_bytes -= size
+            if self._disk_bytes <= target:
+                break
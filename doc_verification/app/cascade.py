@@ -0,0 +1,221 @@
+"""Confidence‑gated classification cascade.
+
+Tier 1  TF‑IDF nearest‑centroid model trained in‑process from
+        `FEW_SHOT_EXAMPLES` plus any labelled history (microseconds).
+Tier 2  `bart-large-mnli` zero‑shot (`classifier.py`), optional (hundreds of ms on CPU).
+Tier 3  Gemini (`llm_classifier`), only when the local tiers are unsure.
+
+Each tier answers only if its confidence clears that tier's threshold;
+otherwise the document falls through to the next one.  Every decision records
+which tier answered and how long each tier took.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import llm_classifier
+from text_terms import terms
+
+
+class TfidfCentroidClassifier:
+    """Cosine similarity to per‑label TF‑IDF centroids, softmax‑scaled into a confidence.
+
+    The softmax only ranks labels against each other, so a document unlike
+    every example can still win one label by a wide factor. A prediction is
+    trusted only if its best cosine reaches ``min_similarity`` and leads the
+    runner‑up by ``min_margin``. Otherwise its confidence is capped at
+    ``min(softmax, best cosine, GATED_MAX_CONF)``, which keeps it below any
+    tier threshold above ``GATED_MAX_CONF``.
+    """
+
+    GATED_MAX_CONF = 0.5
+
+    def __init__(self, temperature: float = 20.0, min_similarity: float = 0.5, min_margin: float = 0.1):
+        self.temperature = temperature
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.labels: List[str] = []
+        self._vocab: Dict[str, int] = {}
+        self._idf = np.empty(0)
+        self._centroids = np.empty((0, 0))
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str]) -> "TfidfCentroidClassifier":
+        docs = [Counter(terms(t)) for t in texts]
+        df = Counter(tok for d in docs for tok in d)
+        self._vocab = {tok: i for i, tok in enumerate(sorted(df))}
+        n = len(docs)
+        self._idf = np.array([math.log((1 + n) / (1 + df[tok])) + 1 for tok in sorted(df)])
+        x = np.vstack([self._vector(d) for d in docs])
+        self.labels = sorted(set(labels))
+        y = np.array([self.labels.index(l) for l in labels])
+        centroids = np.vstack([x[y == i].mean(axis=0) for i in range(len(self.labels))])
+        self._centroids = centroids / np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        return self
+
+    def _vector(self, counts: Counter) -> np.ndarray:
+        v = np.zeros(len(self._vocab))
+        for tok, c in counts.items():
+            i = self._vocab.get(tok)
+            if i is not None:
+                v[i] = 1 + math.log(c)
+        v *= self._idf
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        sims = self._centroids @ self._vector(Counter(terms(text)))
+        if not sims.any():
+            return self.labels[0], 0.0
+        z = np.exp(self.temperature * (sims - sims.max()))
+        probs = z / z.sum()
+        best = int(probs.argmax())
+        top = float(sims[best])
+        runner_up = float(np.partition(sims, -2)[-2]) if len(sims) > 1 else 0.0
+        conf = float(probs[best])
+        if top < self.min_similarity or top - runner_up < self.min_margin:
+            conf = min(conf, top, self.GATED_MAX_CONF)
+        return self.labels[best], conf
+
+
+def load_history(path: Optional[Path]) -> Tuple[List[str], List[str]]:
+    """Labelled documents from a JSONL file of ``{"text": ..., "label": ...}`` rows."""
+    texts, labels = [], []
+    if path is None or not path.exists():
+        return texts, labels
+    with path.open() as fh:
+        for line in fh:
+            if line.strip():
+                row = json.loads(line)
+                if row.get("label") in llm_classifier.CANDIDATE_LABELS:
+                    texts.append(row["text"])
+                    labels.append(row["label"])
+    return texts, labels
+
+
+@dataclass
+class TierResult:
+    tier: str
+    label: str
+    confidence: Optional[float]
+    latency_ms: float
+
+
+@dataclass
+class CascadeDecision:
+    label: str
+    tier: str
+    confidence: Optional[float]
+    latency_ms: float
+    tiers: List[TierResult] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ClassifierCascade:
+    """Run tiers in order of cost and stop at the first confident answer.
+
+    Args:
+        llm: Client for the final tier.
+        zero_shot: Optional blocking ``fn(text, labels) -> (label, score)``; ``None``
+            skips tier 2.
+        runner: Optional ``async runner(fn, *args)`` that executes *zero_shot* off the
+            event loop (e.g. ``ExecutionLayer.cpu``; *zero_shot* must then be
+            picklable).  Defaults to a thread.
+        tier1_min_conf / tier2_min_conf: Confidence required for a tier to answer.
+        tier1_min_similarity / tier1_min_margin: Cosine floor and lead over the runner‑up
+            below which tier 1's confidence is capped (see `TfidfCentroidClassifier`).
+        history_path: Optional JSONL of labelled documents added to tier 1's training set.
+    """
+
+    def __init__(self, llm: llm_classifier.GeminiClassifier,
+                 zero_shot: Optional[Callable[[str, List[str]], Tuple[str, float]]] = None,
+                 tier1_min_conf: float = 0.85, tier2_min_conf: float = 0.8,
+                 history_path: Optional[Path] = None, zero_shot_concurrency: int = 1,
+                 tier1_min_similarity: float = 0.5, tier1_min_margin: float = 0.1,
+                 runner: Optional[Callable[..., Awaitable[Any]]] = None):
+        self.llm = llm
+        self.zero_shot = zero_shot
+        self.runner = runner or asyncio.to_thread
+        self.tier1_min_conf = tier1_min_conf
+        self.tier2_min_conf = tier2_min_conf
+        texts = [ex["document"] for ex in llm_classifier.FEW_SHOT_EXAMPLES]
+        labels = [ex["label"] for ex in llm_classifier.FEW_SHOT_EXAMPLES]
+        hist_texts, hist_labels = load_history(history_path)
+        if tier1_min_conf <= TfidfCentroidClassifier.GATED_MAX_CONF:
+            logging.warning("tier1_min_conf %.2f lets gated (out-of-distribution) tier-1 answers through",
+                            tier1_min_conf)
+        self.tier1 = TfidfCentroidClassifier(min_similarity=tier1_min_similarity,
+                                             min_margin=tier1_min_margin).fit(texts + hist_texts, labels + hist_labels)
+        self._zero_shot_limit = zero_shot_concurrency
+        self._zero_shot_sem: Optional[asyncio.Semaphore] = None
+        self.counts = Counter()
+        self.latency_ms = Counter()
+        logging.info("Classifier cascade: tier 1 trained on %d examples", len(texts) + len(hist_texts))
+
+    async def classify(self, text: str, llm_text: Optional[str] = None) -> CascadeDecision:
+        """Classify *text*; *llm_text* (default *text*) is what the remote tier receives."""
+        start = time.perf_counter()
+        steps: List[TierResult] = []
+
+        label, conf = self.tier1.predict(text)
+        steps.append(TierResult("tfidf", label, round(conf, 4), _ms(start)))
+        if conf >= self.tier1_min_conf:
+            return self._decide(steps, start)
+
+        if self.zero_shot is not None:
+            t = time.perf_counter()
+            if self._zero_shot_sem is None:
+                self._zero_shot_sem = asyncio.Semaphore(self._zero_shot_limit)
+            async with self._zero_shot_sem:
+                label, conf = await self.runner(self.zero_shot, text, llm_classifier.CANDIDATE_LABELS)
+            steps.append(TierResult("zero_shot", label, round(conf, 4), _ms(t)))
+            if conf >= self.tier2_min_conf:
+                return self._decide(steps, start)
+
+        t = time.perf_counter()
+        label = await self.llm.classify(llm_text if llm_text is not None else text)
+        steps.append(TierResult("gemini", label, None, _ms(t)))
+        return self._decide(steps, start)
+
+    def _decide(self, steps: List[TierResult], start: float) -> CascadeDecision:
+        final = steps[-1]
+        total = _ms(start)
+        self.counts[final.tier] += 1
+        self.latency_ms[final.tier] += total
+        return CascadeDecision(final.label, final.tier, final.confidence, total, steps)
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        return {
+            "decisions": total,
+            "by_tier": {
+                tier: {"count": n, "share": round(n / total, 4),
+                       "mean_latency_ms": round(self.latency_ms[tier] / n, 3)}
+                for tier, n in self.counts.items()
+            },
+            "thresholds": {"tfidf": self.tier1_min_conf, "zero_shot": self.tier2_min_conf},
+        }
+
+
+def _ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 3)
+
+
+def zero_shot_top(text: str, labels: List[str]) -> Tuple[str, float]:
+    """Tier‑2 adapter around `classifier.classify_texts` (one batched pass over all labels)."""
+    import classifier
+
+    result = classifier.classify_texts([text], labels=labels, return_full=True)[0]
+    return result["labels"][0], float(result["scores"][0])
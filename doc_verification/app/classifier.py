@@ -1,16 +1,29 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any
-
-from transformers import pipeline, Pipeline
+import os
+import threading
+from typing import List, Dict, Any, Sequence
 
 # ---------------------------------------------------------------------------
-# Load the MNLI zero‑shot pipeline once at import time so that subsequent calls
-# are fast.  Use the default device (auto‑detect GPU/CPU).
+# The MNLI zero‑shot pipeline is built on first use (or by a warmup task) and
+# then reused, so importing this module does not pull in transformers/torch.
+# Use the default device (auto‑detect GPU/CPU).
 # ---------------------------------------------------------------------------
-_classifier: Pipeline = pipeline(
-    "zero-shot-classification", model="facebook/bart-large-mnli", device_map="auto"
-)
+MODEL_NAME: str = "facebook/bart-large-mnli"
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier():
+    """Return the shared zero‑shot pipeline, loading it on first call."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                from transformers import pipeline
+
+                _classifier = pipeline("zero-shot-classification", model=MODEL_NAME, device_map="auto")
+    return _classifier
 
 # ---------------------------------------------------------------------------
 # Candidate labels – make them *descriptive phrases* rather than bare nouns.
@@ -33,6 +46,13 @@ HYPOTHESIS_TEMPLATE: str = "This document is a {}."
 # keeps the prompt inside the model’s context window even for very long PDFs.
 MAX_LEN: int = 4000
 
+# Batched path (`classify_texts`): the premise is truncated by *tokens*, leaving
+# room for the hypothesis and special tokens inside this budget.
+MAX_TOKENS: int = 512
+BATCH_SIZE: int = 16
+# "torch" (fp32), "int8" (dynamic quantisation of Linear layers) or "onnx" (ONNX Runtime via optimum).
+BACKEND: str = os.getenv("ZERO_SHOT_BACKEND", "torch")
+
 
 def classify_text(
     text: str,
@@ -56,7 +76,7 @@ def classify_text(
     # Truncate long text blocks – empirically 4 000 chars ≈ 1 000 tokens.
     snippet = text[:MAX_LEN]
 
-    result = _classifier(
+    result = get_classifier()(
         snippet,
         labels,
         hypothesis_template=HYPOTHESIS_TEMPLATE,
@@ -69,6 +89,104 @@ def classify_text(
     return result if return_full else result["labels"][0]
 
 
+# ---------------------------------------------------------------------------
+# Batched NLI inference.  Every (document, hypothesis) pair of a batch is packed
+# into length‑sorted, padded tensors, so N documents × L labels cost about
+# ceil(N·L / BATCH_SIZE) forward passes instead of N·L.
+# ---------------------------------------------------------------------------
+_nli: Dict[str, Any] = {}
+_nli_lock = threading.Lock()
+
+
+def get_nli(backend: str | None = None):
+    """Return ``(tokenizer, model, entailment_id)`` for *backend*, loading it once."""
+    backend = backend or BACKEND
+    if backend not in _nli:
+        with _nli_lock:
+            if backend not in _nli:
+                _nli[backend] = _load_nli(backend)
+    return _nli[backend]
+
+
+def _load_nli(backend: str):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+
+        model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME).eval()
+        if backend == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif backend != "torch":
+            raise ValueError(f"Unknown zero-shot backend {backend!r}")
+    label2id = {k.lower(): v for k, v in model.config.label2id.items()}
+    return tokenizer, model, label2id["entailment"]
+
+
+def _encode_pairs(tokenizer, texts: Sequence[str], hypotheses: Sequence[str], max_tokens: int):
+    """Token ids for every (text, hypothesis) pair; each text is tokenised once."""
+    hyp_ids = [tokenizer(h, add_special_tokens=False)["input_ids"] for h in hypotheses]
+    special = tokenizer.num_special_tokens_to_add(pair=True)
+    pairs = []
+    for text in texts:
+        doc_ids = tokenizer(text, add_special_tokens=False, truncation=True, max_length=max_tokens)["input_ids"]
+        for h in hyp_ids:
+            budget = max(max_tokens - len(h) - special, 1)
+            pairs.append(tokenizer.build_inputs_with_special_tokens(doc_ids[:budget], h))
+    return pairs
+
+
+def classify_texts(
+    texts: Sequence[str],
+    labels: List[str] | None = None,
+    return_full: bool = False,
+    batch_size: int = BATCH_SIZE,
+    max_tokens: int = MAX_TOKENS,
+    backend: str | None = None,
+) -> List[str] | List[Dict[str, Any]]:
+    """Batch version of `classify_text`.
+
+    Scores match the zero‑shot pipeline with ``multi_label=False``: a softmax
+    over each label's entailment logit.
+
+    Returns:
+        list: Best label per text (default) or pipeline‑style dicts with
+        ``sequence``, ``labels`` and ``scores`` sorted by score.
+    """
+    import torch
+
+    if labels is None:
+        labels = CANDIDATE_LABELS
+    if not texts:
+        return []
+    tokenizer, model, entail_id = get_nli(backend)
+    pairs = _encode_pairs(tokenizer, texts, [HYPOTHESIS_TEMPLATE.format(l) for l in labels], max_tokens)
+
+    # Sorting by length keeps padding inside each batch to a minimum.
+    order = sorted(range(len(pairs)), key=lambda i: len(pairs[i]))
+    entail = torch.empty(len(pairs))
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            batch = tokenizer.pad({"input_ids": [pairs[i] for i in idx]}, return_tensors="pt")
+            logits = model(**batch).logits
+            entail[idx] = torch.as_tensor(logits)[:, entail_id].float()
+
+    scores = entail.view(len(texts), len(labels)).softmax(dim=-1)
+    results = []
+    for text, row in zip(texts, scores.tolist()):
+        ranked = sorted(zip(labels, row), key=lambda x: -x[1])
+        if return_full:
+            results.append({"sequence": text, "labels": [l for l, _ in ranked], "scores": [s for _, s in ranked]})
+        else:
+            results.append(ranked[0][0])
+    return results
+
+
 # ---------------------------------------------------------------------------
 # Quick self‑test – run `python zero_shot_classifier.py` from the CLI.
 # ---------------------------------------------------------------------------
@@ -83,3 +201,4 @@ if __name__ == "__main__":
     """
 
     print("Predicted label:", classify_text(_sample_txt))
+    print("Batched:", classify_texts([_sample_txt]))
@@ -0,0 +1,75 @@
+"""In‑memory representation of an uploaded document.
+
+The raw upload bytes are held once and decoded once; OCR and every forgery
+check read from this object instead of re‑opening a file on disk.  For PDFs the
+native text layer is read first and only pages without usable text are
+rasterised for OCR.  The page arrays go to OCR only: ELA runs in the same
+worker call that decodes them (``ela``), so the forgery checks get the bytes and
+these small results, not the pages.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import pdf_text
+
+IMAGE_EXT = {".jpg", ".jpeg", ".png"}
+
+
+@dataclass
+class UploadedDocument:
+    data: bytes
+    ext: str
+    pages: Optional[List[np.ndarray]] = None  # RGB arrays of the pages that need OCR, filled by `decode()`
+    text_layer: Optional[List[Optional[str]]] = None  # per page: native text, or None if it needs OCR
+    ela: Optional[Dict[int, object]] = None  # page number → `ela.ELAResult`, computed where the pages were decoded
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.ext == ".pdf"
+
+    @property
+    def is_image(self) -> bool:
+        return self.ext in IMAGE_EXT
+
+    @property
+    def ocr_indices(self) -> List[int]:
+        """Page numbers that have no usable text layer and must go through OCR."""
+        if self.text_layer is None:
+            return [0] if self.is_image else []
+        return [i for i, t in enumerate(self.text_layer) if t is None]
+
+    def decode(self) -> List[np.ndarray]:
+        """Decode the buffer into arrays for the pages that need OCR, once."""
+        if self.pages is None:
+            if self.is_pdf:
+                if self.text_layer is None:
+                    self.text_layer = pdf_text.page_texts(self.data)
+                self.pages = pdf_text.render_pages(self.data, self.ocr_indices)
+            else:
+                from PIL import Image, ImageOps
+
+                # Same result as doctr's `DocumentFile.from_images` (EXIF‑rotated RGB),
+                # without importing doctr in processes that only decode.
+                with Image.open(io.BytesIO(self.data)) as img:
+                    page = np.asarray(ImageOps.exif_transpose(img).convert("RGB"))
+                self.text_layer = [None]
+                self.pages = [page]
+        return self.pages
+
+    def image(self):
+        """First page as a PIL RGB image, built from the already decoded array."""
+        from PIL import Image
+
+        return Image.fromarray(self.decode()[0])
+
+    def open_pdf(self):
+        """Open the buffer with pikepdf (caller should use it as a context manager)."""
+        import pikepdf
+
+        return pikepdf.open(io.BytesIO(self.data))
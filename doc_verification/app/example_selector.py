@@ -0,0 +1,142 @@
+"""Few‑shot example selection for the Gemini classifier prompt.
+
+The labelled pool (`FEW_SHOT_EXAMPLES` plus an optional JSONL file) is indexed
+once with BM25 over words and word bigrams.  For each document the *k* most
+similar examples are chosen, with at most ``max_per_label`` of any one label,
+and added in rank order for as long as they fit the prompt's token budget.
+Prompt size therefore depends on *k* and the budget, not on how large the pool
+grows.
+
+A document that shares no terms with the pool gets the first example of each
+of the first *k* labels instead.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from text_terms import terms
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough model token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def load_pool(path: Optional[Path], labels: Sequence[str]) -> List[dict]:
+    """Examples from a JSONL file of ``{"text" | "document": ..., "label": ...}`` rows.
+
+    Rows whose label is not one of *labels* are skipped.
+    """
+    examples: List[dict] = []
+    if path is None or not path.exists():
+        return examples
+    with path.open() as fh:
+        for line in fh:
+            if line.strip():
+                row = json.loads(line)
+                text = row.get("document", row.get("text"))
+                if text and row.get("label") in labels:
+                    examples.append({"document": text, "label": row["label"]})
+    return examples
+
+
+class ExampleSelector:
+    """BM25 retrieval of few‑shot examples under a token budget.
+
+    Args:
+        examples: ``{"document", "label"}`` dicts; duplicates are dropped.
+        k: Examples per prompt, at most.
+        max_per_label: Cap on examples sharing one label, so near‑duplicates of a
+            single template do not crowd out the runner‑up labels.
+        example_chars: Each example document is cut to this many characters.
+    """
+
+    def __init__(self, examples: Iterable[dict], k: int = 4, max_per_label: int = 2,
+                 example_chars: int = 600, k1: float = 1.2, b: float = 0.75):
+        seen = set()
+        self.examples: List[dict] = []
+        for ex in examples:
+            key = (ex["document"].strip(), ex["label"])
+            if key not in seen:
+                seen.add(key)
+                self.examples.append({"document": ex["document"].strip()[:example_chars], "label": ex["label"]})
+        self.k = k
+        self.max_per_label = max_per_label
+        self.example_chars = example_chars
+        self.labels = np.array([ex["label"] for ex in self.examples])
+        self.blocks = [format_example(ex) for ex in self.examples]
+        self.block_tokens = np.array([estimate_tokens(s) for s in self.blocks])
+        self._index(k1, b)
+
+    def _index(self, k1: float, b: float) -> None:
+        # Inverted index: term -> (example ids, BM25 term weight in each), built once.
+        docs = [Counter(terms(ex["document"])) for ex in self.examples]
+        lengths = np.array([sum(d.values()) for d in docs], dtype=float)
+        avg = lengths.mean() if len(docs) else 1.0
+        postings: Dict[str, list] = defaultdict(list)
+        for i, d in enumerate(docs):
+            norm = k1 * (1 - b + b * lengths[i] / avg)
+            for tok, tf in d.items():
+                postings[tok].append((i, tf * (k1 + 1) / (tf + norm)))
+        n = len(docs)
+        self._postings = {}
+        for tok, hits in postings.items():
+            idf = math.log(1 + (n - len(hits) + 0.5) / (len(hits) + 0.5))
+            ids, weights = zip(*hits)
+            self._postings[tok] = (np.array(ids), np.array(weights) * idf)
+        self.fingerprint = hashlib.blake2b(
+            json.dumps([self.examples, self.k, self.max_per_label]).encode(), digest_size=8).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.examples)
+
+    def scores(self, text: str) -> np.ndarray:
+        """BM25 score of every example against *text* (each query term counted once)."""
+        out = np.zeros(len(self.examples))
+        for tok in set(terms(text)):
+            hit = self._postings.get(tok)
+            if hit is not None:
+                out[hit[0]] += hit[1]
+        return out
+
+    def _ranked(self, text: str) -> List[int]:
+        scores = self.scores(text)
+        if not scores.any():
+            firsts = {}
+            for i, label in enumerate(self.labels):
+                firsts.setdefault(label, i)
+            return list(firsts.values())
+        # Only the best few matter; partition first so the sort stays small as the pool grows.
+        m = min(len(scores), self.k * self.max_per_label * 4)
+        top = np.argpartition(-scores, m - 1)[:m]
+        return [int(i) for i in top[np.argsort(-scores[top], kind="stable")] if scores[i] > 0]
+
+    def select(self, text: str, budget_tokens: Optional[int] = None) -> List[dict]:
+        """Up to *k* examples most similar to *text* whose blocks fit within *budget_tokens*."""
+        chosen: List[dict] = []
+        per_label: Counter = Counter()
+        used = 0
+        for i in self._ranked(text):
+            if len(chosen) == self.k:
+                break
+            label = self.labels[i]
+            if per_label[label] >= self.max_per_label:
+                continue
+            if budget_tokens is not None and used + self.block_tokens[i] > budget_tokens:
+                continue
+            chosen.append(self.examples[i])
+            per_label[label] += 1
+            used += int(self.block_tokens[i])
+        return chosen
+
+
+def format_example(example: dict) -> str:
+    return f"Document:\n{example['document']}\nLabel: {example['label']}\n\n"
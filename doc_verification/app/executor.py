@@ -0,0 +1,99 @@
+"""Execution layer: bounded worker pools and request admission control.
+
+* CPU‑bound work (page decoding, OCR forward passes, forgery checks) runs in a
+  ``ProcessPoolExecutor`` so it never blocks the event loop or the GIL.
+* Blocking I/O (the SQLite result cache, SDK initialisation) runs in a
+  ``ThreadPoolExecutor``; the Gemini call itself is async (`llm_classifier`).
+* ``Admission`` caps how many documents are processed at once and how many may
+  wait for a slot; beyond that the request is rejected with 503 + Retry‑After.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+from fastapi import HTTPException
+
+import workers
+
+CPU_WORKERS     = int(os.getenv("CPU_WORKERS", str(workers.default_workers())))
+IO_WORKERS      = int(os.getenv("IO_WORKERS", "16"))
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", str(CPU_WORKERS * 2)))  # documents in flight
+MAX_QUEUE       = int(os.getenv("MAX_QUEUE", "32"))                         # documents waiting
+RETRY_AFTER_S   = int(os.getenv("RETRY_AFTER_S", "5"))
+
+
+class Admission:
+    """Concurrency limit plus a bounded waiting room."""
+
+    def __init__(self, limit: int, queue_size: int, retry_after: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._sem = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.active = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._sem.locked() and self.waiting >= self.queue_size:
+            raise HTTPException(503, "Server busy, retry later",
+                                headers={"Retry-After": str(self.retry_after)})
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+
+class ExecutionLayer:
+    def __init__(self, cpu_workers: int = CPU_WORKERS, io_workers: int = IO_WORKERS, warm: bool = False,
+                 warm_zero_shot: bool = False):
+        self.cpu_workers = cpu_workers
+        self.warm = warm  # load the OCR predictor in each worker's initializer
+        self.warm_zero_shot = warm_zero_shot  # … and the zero-shot NLI model
+        self.io_workers = io_workers
+        self.cpu_pool: ProcessPoolExecutor | None = None
+        self.io_pool: ThreadPoolExecutor | None = None
+        self.admission = Admission(MAX_CONCURRENCY, MAX_QUEUE, RETRY_AFTER_S)
+
+    def start(self) -> None:
+        if self.cpu_pool is None:
+            threads = (os.cpu_count() or 1) // self.cpu_workers
+            self.cpu_pool = ProcessPoolExecutor(self.cpu_workers, initializer=workers.init_worker,
+                                                initargs=(threads, self.warm, self.warm_zero_shot))
+            self.io_pool = ThreadPoolExecutor(self.io_workers, thread_name_prefix="io")
+
+    def shutdown(self) -> None:
+        if self.cpu_pool is not None:
+            self.cpu_pool.shutdown(cancel_futures=True)
+            self.io_pool.shutdown(cancel_futures=True)
+            self.cpu_pool = self.io_pool = None
+
+    async def cpu(self, fn: Callable[..., Any], *args) -> Any:
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self.cpu_pool, fn, *args)
+
+    async def io(self, fn: Callable[..., Any], *args) -> Any:
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self.io_pool, fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "cpu_workers": self.cpu_workers,
+            "io_workers": self.io_workers,
+            "max_concurrency": self.admission.limit,
+            "max_queue": self.admission.queue_size,
+            "active": self.admission.active,
+            "waiting": self.admission.waiting,
+        }
@@ -1,45 +1,186 @@
+"""Metadata extraction from OCR text.
+
+All field keywords are compiled into one alternation and found in a single
+left‑to‑right scan; each keyword hit then runs its field's value pattern
+anchored at that position (``Pattern.match``), with every repetition bounded.
+Nothing ever re‑scans the whole text, so cost is linear in its length.
+
+Given an `OCRResult` instead of a string, match confidence is scaled by the OCR
+confidence of the matched words, and fields the flat text misses are looked
+up spatially: the value to the right of, or on the line below, the keyword.
+"""
+
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Container, Dict, Iterable, Iterator, List, Optional
+
+_SEP = r"\s*[:\-]?\s*"
+
+
+@dataclass(frozen=True)
+class _Field:
+    name: str
+    keywords: tuple
+    value: "re.Pattern"
+    confidence: float  # base confidence when the value follows "<keyword>:"
+
+
+_FIELDS = (
+    _Field("Name", ("Name", "Student", "Employee", "Customer"),
+           re.compile(_SEP + r"([A-Z][a-z]+\s[A-Z][a-z]+)"), 0.8),
+    _Field("Date", ("Date of Issue", "Date", "Due Date", "Enrollment Date"),
+           re.compile(_SEP + r"(\d{2}/\d{2}/\d{4}|\d{4}-\d{2}-\d{2})"), 0.95),
+    _Field("ID", ("Student ID", "Account Number", "Employee ID", "Transaction ID", "Reference Number"),
+           re.compile(_SEP + r"(\w+)"), 0.85),
+    _Field("Phone", ("Phone", "Contact"),
+           re.compile(_SEP + r"(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})"), 0.85),
+    _Field("Routing", ("Routing Number", "Routing No", "Routing", "ABA"),
+           re.compile(_SEP + r"(\d{3}[\s-]?\d{3}[\s-]?\d{3})(?!\d)"), 0.9),
+    _Field("Amount", ("Total Due", "Amount", "Balance", "Net Pay", "Gross Pay"),
+           re.compile(_SEP + r"\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)"), 0.9),
+    # Bounded (≤120 chars) instead of the open‑ended `[\w\s,]+`, which backtracked
+    # across the rest of the document on every "Address" hit.
+    _Field("Address", ("Address", "Location"),
+           re.compile(_SEP + r"([\w\s,]{1,120}(?:\d{5}|\d{4}))"), 0.7),
+)
+
+_BY_KEYWORD: Dict[str, List[_Field]] = {}
+for _f in _FIELDS:
+    for _kw in _f.keywords:
+        _BY_KEYWORD.setdefault(_kw, []).append(_f)
+
+# Longest keywords first so "Student ID" wins over "Student", "Due Date" over "Date".
+_MASTER = re.compile(
+    "|".join(re.escape(k) for k in sorted(_BY_KEYWORD, key=len, reverse=True)) + "|@"
+)
+FIELD_NAMES = tuple(f.name for f in _FIELDS) + ("Email",)
+_EMAIL_LOCAL = re.compile(r"[a-zA-Z0-9._%+-]{1,64}$")
+_EMAIL_DOMAIN = re.compile(r"@[a-zA-Z0-9.-]{1,253}\.[a-zA-Z]{2,}")
+
+
+@dataclass(frozen=True)
+class MetadataMatch:
+    field: str
+    value: str
+    start: int       # offset of the value in the text
+    end: int
+    keyword: Optional[str]
+    confidence: float
+
+
+def iter_matches(text: str, skip: Container[str] = ()) -> Iterator[MetadataMatch]:
+    """Metadata matches in *text*, lazily and in document order.
+
+    Fields named in *skip* are not evaluated; it is consulted on every hit, so a
+    caller may pass a container it keeps filling (e.g. its result dict).
+    """
+    for hit in _MASTER.finditer(text):
+        kw = hit.group(0)
+        if kw == "@":
+            if "Email" in skip:
+                continue
+            m = _email_at(text, hit.start())
+            if m is not None:
+                yield m
+            continue
+        for field in _BY_KEYWORD[kw]:
+            if field.name in skip:
+                continue
+            m = field.value.match(text, hit.end())
+            if m is None:
+                continue
+            separated = ":" in text[hit.end():m.start(1)]
+            conf = field.confidence if separated else field.confidence - 0.15
+            yield MetadataMatch(field.name, m.group(1), m.start(1), m.end(1), kw, round(conf, 2))
+            break
+
 
-def extract_metadata(text):
+def scan(text: str) -> List[MetadataMatch]:
+    """Every metadata match in *text*, in document order, with offsets and confidence."""
+    return list(iter_matches(text))
+
+
+def _email_at(text: str, at: int) -> Optional[MetadataMatch]:
+    local = _EMAIL_LOCAL.search(text, max(0, at - 64), at)
+    domain = _EMAIL_DOMAIN.match(text, at)
+    if local is None or domain is None:
+        return None
+    start, end = local.start(), domain.end()
+    return MetadataMatch("Email", text[start:end], start, end, None, 0.95)
+
+
+def _text_of(doc) -> str:
+    """Accept plain strings or anything exposing ``.text`` (e.g. an `OCRResult`)."""
+    return doc if isinstance(doc, str) else doc.text
+
+
+def _weighted(m: MetadataMatch, ocr) -> MetadataMatch:
+    i, j = ocr.words_at(m.start, m.end)
+    return replace(m, confidence=round(m.confidence * ocr.span_confidence(i, j), 2))
+
+
+def spatial_matches(ocr, fields: Container[str]) -> Iterator[MetadataMatch]:
+    """Layout lookups for *fields*: keyword → the words right of it or on the line below."""
+    for field in _FIELDS:
+        if field.name not in fields:
+            continue
+        for kw in field.keywords:
+            span = ocr.value_after(kw)
+            if span is None:
+                continue
+            m = field.value.match(ocr.span_text(*span))
+            if m is None:
+                continue
+            start = int(ocr.offsets[span[0]]) + m.start(1)
+            conf = field.confidence * 0.9 * ocr.span_confidence(*ocr.words_at(start, start + len(m.group(1))))
+            yield MetadataMatch(field.name, m.group(1), start, start + len(m.group(1)), kw, round(conf, 2))
+            break
+
+
+def extract_metadata(text, all_matches: bool = False):
     """
     Extracts metadata from the given text, including names, dates, IDs, phone numbers,
     email addresses, monetary amounts, and more.
+
+    *text* may be a string or an `OCRResult`.  By default returns
+    ``{field: first value}``; with ``all_matches=True`` returns
+    ``{field: [MetadataMatch, ...]}`` with offsets and confidence for every hit.
+    """
+    ocr = None if isinstance(text, str) else text
+    metadata, weak = {}, set()
+    for m in iter_matches(_text_of(text), skip=() if all_matches else metadata):
+        if ocr is not None and m.keyword is not None and not ocr.adjacent(ocr.words_at(m.start, m.end)[0]):
+            # The flat text joined the keyword to a value from another line or table cell.
+            weak.add(m.field)
+        if all_matches:
+            metadata.setdefault(m.field, []).append(_weighted(m, ocr) if ocr is not None else m)
+        else:
+            metadata.setdefault(m.field, m.value)
+            if len(metadata) == len(FIELD_NAMES):
+                break
+    if ocr is not None:
+        retry = ({f.name for f in _FIELDS} - metadata.keys()) | weak
+        for m in spatial_matches(ocr, retry):
+            if all_matches:
+                metadata.setdefault(m.field, []).insert(0, m)
+            else:
+                metadata[m.field] = m.value
+    return metadata
+
+
+def _extract_chunk(texts: List[str]) -> List[dict]:
+    return [extract_metadata(t) for t in texts]
+
+
+def extract_many(texts: Iterable[str], workers: int = 1, chunk_size: int = 256) -> List[dict]:
+    """`extract_metadata` over many texts, e.g. bulk re‑processing of archived OCR output.
+
+    With ``workers > 1`` chunks are spread over a process pool; order is preserved.
     """
-    metadata = {}
-
-    # Name
-    name_match = re.search(r"(Name|Student|Employee|Customer)\s*[:\-]?\s*([A-Z][a-z]+\s[A-Z][a-z]+)", text)
-    if name_match:
-        metadata["Name"] = name_match.group(2)
-
-    # Date
-    date_match = re.search(r"(Date of Issue|Date|Due Date|Enrollment Date)\s*[:\-]?\s*(\d{2}/\d{2}/\d{4}|\d{4}-\d{2}-\d{2})", text)
-    if date_match:
-        metadata["Date"] = date_match.group(2)
-
-    # ID
-    id_match = re.search(r"(Student ID|Account Number|Employee ID|Transaction ID|Reference Number)\s*[:\-]?\s*(\w+)", text)
-    if id_match:
-        metadata["ID"] = id_match.group(2)
-
-    # Phone Number
-    phone_match = re.search(r"(Phone|Contact)\s*[:\-]?\s*(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})", text)
-    if phone_match:
-        metadata["Phone"] = phone_match.group(2)
-
-    # Email Address
-    email_match = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
-    if email_match:
-        metadata["Email"] = email_match.group(0)
-
-    # Monetary Amount
-    amount_match = re.search(r"(Total Due|Amount|Balance|Net Pay|Gross Pay)\s*[:\-]?\s*\$?(\d{1,3}(,\d{3})*(\.\d{2})?)", text)
-    if amount_match:
-        metadata["Amount"] = amount_match.group(2)
-
-    # Address
-    address_match = re.search(r"(Address|Location)\s*[:\-]?\s*([\w\s,]+(?:\d{5}|\d{4}))", text)
-    if address_match:
-        metadata["Address"] = address_match.group(2)
-
-    return metadata
\ No newline at end of file
+    texts = [_text_of(t) for t in texts]
+    if workers <= 1 or len(texts) <= chunk_size:
+        return _extract_chunk(texts)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(workers) as pool:
+        return [md for part in pool.map(_extract_chunk, chunks) for md in part]
@@ -0,0 +1,229 @@
+"""Forgery heuristics: PDF metadata sanity, perceptual bank‑logo matching and ELA noise.
+
+Each heuristic is a check registered with `register_check` and a declared
+relative cost.  Every check reads the same `CheckContext`: the document is
+decoded once (`document.py`), and derived views such as the first page as a
+PIL image or the PDF info dictionary are built once on first use, so a new
+check adds no I/O of its own.  Cheap checks run first, in cost order; checks
+costing ``FORGERY_PARALLEL_COST`` or more run concurrently in a thread pool.
+With ``FORGERY_SHORT_CIRCUIT=1`` the engine stops at the first check that
+reports an issue, since one issue already decides the verdict.
+
+Kept free of FastAPI and model imports so the checks can run inside worker
+processes (see `executor.py`) without dragging the web app along.
+"""
+
+from pathlib import Path
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+import ela
+from document import UploadedDocument
+from logo_index import LogoIndex, MATCH_THRESHOLD
+from ocr_result import OCRResult
+
+LOGO_DIR = Path("logos")  # put logo images here
+
+# ELA thresholds (mean absolute difference on a 0‑255 scale, see `ela.py`).
+ELA_MAX_SIDE        = int(os.getenv("ELA_MAX_SIDE", str(ela.DEFAULT_MAX_SIDE)))
+ELA_NOISE_THRESHOLD = 15.0   # whole‑page mean
+ELA_TILE_FLOOR      = 3.0    # a suspicious tile must differ at least this much …
+ELA_TILE_Z          = 8.0    # … and stand this many robust std‑devs above typical tiles
+
+# OCR layout: digits whose glyph height differs this much from the rest of their line.
+OCR_HEIGHT_TOLERANCE = 0.35
+
+# Check engine: declared cost at which a check moves to the thread pool, pool size, early stop.
+FORGERY_PARALLEL_COST = float(os.getenv("FORGERY_PARALLEL_COST", "10"))
+FORGERY_THREADS       = int(os.getenv("FORGERY_THREADS", "4"))
+FORGERY_SHORT_CIRCUIT = os.getenv("FORGERY_SHORT_CIRCUIT", "0") == "1"
+
+BANK_STATEMENT = "bank account statement"  # as returned by the classifier cascade
+
+# ─────────────────────── perceptual logo index ───────────────────────
+
+LOGO_INDEX = LogoIndex(
+    LOGO_DIR,
+    threshold=int(os.getenv("LOGO_MATCH_THRESHOLD", str(MATCH_THRESHOLD))),
+    refresh_s=float(os.getenv("LOGO_REFRESH_S", "5")),
+)
+
+# ───────────────────────── check context ──────────────────────────
+
+@dataclass
+class CheckContext:
+    """Inputs shared by every check; derived views are built at most once."""
+
+    doc: UploadedDocument
+    doc_type: str
+    metadata: dict
+    ocr: Optional[OCRResult] = None
+    _views: dict = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _view(self, name: str, build: Callable):
+        with self._lock:
+            if name not in self._views:
+                self._views[name] = build()
+            return self._views[name]
+
+    def image(self):
+        """First decoded page as a PIL RGB image."""
+        return self._view("image", self.doc.image)
+
+    def pdf_info(self) -> Dict[str, str]:
+        """The PDF document info dictionary (``/Producer``, ``/CreationDate`` …)."""
+        def build():
+            with self.doc.open_pdf() as pdf:
+                return {str(k): str(v) for k, v in (pdf.docinfo or {}).items()}
+        return self._view("pdf_info", build)
+
+    @property
+    def is_bank_statement(self) -> bool:
+        return self.doc_type == BANK_STATEMENT
+
+# ─────────────────────────── registry ─────────────────────────────
+
+@dataclass(frozen=True)
+class ForgeryCheck:
+    name: str
+    run: Callable[[CheckContext], List[str]]   # returns the issues found (empty if none)
+    cost: float                                # relative cost; orders checks, picks pool vs inline
+    applies: Callable[[CheckContext], bool]
+
+
+CHECKS: Dict[str, ForgeryCheck] = {}
+
+
+def register_check(name: str, cost: float, applies: Optional[Callable[[CheckContext], bool]] = None):
+    """Decorator: add ``fn(ctx) -> issues`` to the engine as check *name*."""
+    def decorator(fn: Callable[[CheckContext], List[str]]):
+        CHECKS[name] = ForgeryCheck(name, fn, cost, applies or (lambda ctx: True))
+        return fn
+    return decorator
+
+# ──────────────────────────── checks ──────────────────────────────
+
+@register_check("routing", cost=0, applies=lambda ctx: ctx.is_bank_statement and bool(ctx.metadata.get("Routing")))
+def _routing_issues(ctx: CheckContext) -> List[str]:
+    """ABA routing number (extractor field ``Routing``): nine digits with a valid 3‑7‑1 checksum."""
+    digits = "".join(c for c in ctx.metadata["Routing"] if c.isdigit())
+    if len(digits) != 9 or sum(w * int(d) for w, d in zip((3, 7, 1) * 3, digits)) % 10:
+        return ["Routing number unusual"]
+    return []
+
+
+@register_check("ocr_layout", cost=1, applies=lambda ctx: ctx.ocr is not None)
+def _ocr_layout_issues(ctx: CheckContext) -> List[str]:
+    """Numbers set in a different font size than the rest of their line (pasted‑in edits)."""
+    ocr = ctx.ocr
+    odd = [i for i in ocr.height_outliers(OCR_HEIGHT_TOLERANCE) if any(c.isdigit() for c in ocr.words[i])]
+    pages = sorted({int(ocr.page[i]) + 1 for i in odd})
+    return [f"Inconsistent glyph height in numbers (page {p})" for p in pages]
+
+
+@register_check("pdf_metadata", cost=2, applies=lambda ctx: ctx.doc.is_pdf)
+def _pdf_metadata_issues(ctx: CheckContext) -> List[str]:
+    info, issues = ctx.pdf_info(), []
+    creation = info.get("/CreationDate", "")
+    if len(creation) >= 6 and creation[2:6] > "2030":
+        issues.append("Future creation date")
+    if info.get("/Producer", "").lower().startswith("word"):
+        issues.append("Producer = Word")
+    return issues
+
+
+# Only meaningful with reference logos to compare against.
+@register_check("logo", cost=20, applies=lambda ctx: ctx.is_bank_statement and ctx.doc.is_image and len(LOGO_INDEX) > 0)
+def _logo_issues(ctx: CheckContext) -> List[str]:
+    return [] if LOGO_INDEX.match(ctx.image()) is not None else ["Bank logo hash mismatch"]
+
+
+@register_check("ela", cost=100)
+def _ela_issues(ctx: CheckContext) -> List[str]:
+    """ELA over every decoded page (the image itself, or the scanned pages of a PDF).
+
+    Pages already analysed where they were decoded (``doc.ela``) are not analysed again.
+    """
+    doc = ctx.doc
+    if doc.ela is not None:
+        results = sorted(doc.ela.items())
+    else:
+        numbers = doc.ocr_indices if doc.is_pdf else [0]
+        results = zip(numbers, ela.analyze_pages(doc.decode(), max_side=ELA_MAX_SIDE))
+    issues = []
+    for page_no, res in results:
+        where = f" (page {page_no + 1})" if doc.is_pdf else ""
+        if res.mean > ELA_NOISE_THRESHOLD:
+            issues.append("High ELA noise" + where)
+        if res.max_tile > ELA_TILE_FLOOR and res.tile_z > ELA_TILE_Z:
+            issues.append("Localized ELA anomaly" + where)
+    return issues
+
+# ──────────────────────────── engine ──────────────────────────────
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_pid: Optional[int] = None
+
+
+def _check_pool() -> ThreadPoolExecutor:
+    # Created lazily in the process that uses it: a forked worker must not inherit the parent's threads.
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool, _pool_pid = ThreadPoolExecutor(FORGERY_THREADS, thread_name_prefix="forgery"), os.getpid()
+    return _pool
+
+
+def _timed_run(check: ForgeryCheck, ctx: CheckContext, timings: dict) -> List[str]:
+    start = time.perf_counter()
+    try:
+        return check.run(ctx)
+    finally:
+        timings[f"forgery_{check.name}"] = time.perf_counter() - start
+
+
+def run_checks(ctx: CheckContext, checks: Optional[Iterable[ForgeryCheck]] = None,
+               short_circuit: bool = FORGERY_SHORT_CIRCUIT) -> dict:
+    """Run the applicable *checks* (default: every registered one) against *ctx*.
+
+    Issues are reported in check order regardless of completion order;
+    ``skipped`` lists applicable checks not run because of a short circuit.
+    """
+    selected = sorted((c for c in (CHECKS.values() if checks is None else checks) if c.applies(ctx)),
+                      key=lambda c: c.cost)
+    results: Dict[str, List[str]] = {}
+    timings: Dict[str, float] = {}
+    cheap = [c for c in selected if c.cost < FORGERY_PARALLEL_COST]
+    costly = [c for c in selected if c.cost >= FORGERY_PARALLEL_COST]
+
+    for check in cheap:
+        results[check.name] = _timed_run(check, ctx, timings)
+        if short_circuit and results[check.name]:
+            costly = []
+            break
+
+    if len(costly) == 1:
+        results[costly[0].name] = _timed_run(costly[0], ctx, timings)
+    elif costly:
+        pending = {_check_pool().submit(_timed_run, c, ctx, timings): c for c in costly}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                results[pending.pop(fut).name] = fut.result()
+            if short_circuit and any(results.values()):
+                for fut in pending:
+                    fut.cancel()  # not started yet; running checks finish in the background
+                break
+
+    issues = [issue for c in selected for issue in results.get(c.name, [])]
+    return {"is_forged": bool(issues), "issues": issues,
+            "skipped": [c.name for c in selected if c.name not in results], "timings_s": dict(timings)}
+
+
+def detect_forgery(doc: UploadedDocument, doc_type: str, metadata: dict,
+                   ocr: Optional[OCRResult] = None) -> dict:
+    """Run every check; ``timings_s`` holds per‑check wall time for instrumentation."""
+    return run_checks(CheckContext(doc, doc_type, metadata, ocr))
@@ -1,10 +1,42 @@
-import vertexai
-from vertexai.generative_models import GenerativeModel
+"""Gemini few‑shot document classifier.
 
-# Initialize Vertex AI
+A single long‑lived `GeminiClassifier` holds the static instruction prefix
+(built once at import), a pluggable backend, a concurrency limit, and
+retry/timeout policy.  The few‑shot examples are chosen per document by
+`example_selector.ExampleSelector` from `FEW_SHOT_EXAMPLES` plus an optional
+JSONL pool (``FEW_SHOT_POOL``), and the whole prompt is held to
+``PROMPT_BUDGET_TOKENS``.  `VertexBackend` calls Gemini; `StubBackend` answers
+locally for offline benchmarks.  `classify_document_with_gemini` remains as a
+synchronous wrapper for scripts.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import weakref
+from pathlib import Path
+from typing import List, Optional, Protocol, Sequence
+
+from example_selector import ExampleSelector, estimate_tokens, format_example, load_pool
+
+logger = logging.getLogger(__name__)
+
+# Vertex AI settings.  The SDK is imported and initialised lazily (see `init_vertex`)
+# so that importing this module for its labels or examples stays cheap.
 PROJECT_ID = "ai-experimentation-428115"  # Replace with your GCP project ID
 REGION = "us-central1"                   # Replace with your desired region
-vertexai.init(project=PROJECT_ID, location=REGION)
+
+MODEL_NAME = "gemini-2.0-flash-001"
+
+# Prompt assembly: examples retrieved per document, the whole prompt held to a fixed budget.
+FEW_SHOT_POOL = os.getenv("FEW_SHOT_POOL")  # JSONL of {"text", "label"} added to FEW_SHOT_EXAMPLES
+FEW_SHOT_K = int(os.getenv("FEW_SHOT_K", "4"))
+PROMPT_BUDGET_TOKENS = int(os.getenv("PROMPT_BUDGET_TOKENS", "1500"))
+PROMPT_DOCUMENT_TOKENS = int(os.getenv("PROMPT_DOCUMENT_TOKENS", "1000"))  # OCR text beyond this is cut
 
 # Define the candidate labels
 CANDIDATE_LABELS = [
@@ -103,65 +135,223 @@ Due Date: 04/25/2025
     },
 ]
 
-def build_few_shot_prompt(ocr_text: str) -> str:
-    """
-    Builds a prompt with few-shot examples to classify the OCR text.
-    """
-    print("[DEBUG] Building few-shot prompt...")
-    examples_block = []
-    for example in FEW_SHOT_EXAMPLES:
-        examples_block.append(
-            f"""Document:
-{example['document']}
-Label: {example['label']}
+_vertex_initialised = False
+_vertex_lock = threading.Lock()
 
-"""
-        )
+
+def init_vertex() -> None:
+    """Import and initialise the Vertex AI SDK once per process."""
+    global _vertex_initialised
+    with _vertex_lock:
+        if not _vertex_initialised:
+            import vertexai
+
+            vertexai.init(project=PROJECT_ID, location=REGION)
+            _vertex_initialised = True
+
+
+def _build_static_prefix() -> str:
+    """Instructions and label set: identical for every request."""
     classification_labels = ", ".join(CANDIDATE_LABELS)
 
-    prompt = f"""You are a helpful AI document classifier. Your task is to classify documents into one of the following categories:
+    return f"""You are a helpful AI document classifier. Your task is to classify documents into one of the following categories:
 {classification_labels}
 
-Below are some examples:
+"""
 
-{''.join(examples_block)}
 
-Now classify the following document:
-Document:
+STATIC_PREFIX = _build_static_prefix()
+_DOCUMENT_MARKER = "Now classify the following document:\n"
+_QUERY_TEMPLATE = "{examples}" + _DOCUMENT_MARKER + """Document:
 {ocr_text}
 
-Please respond with the single best label from the categories: {classification_labels}.
-"""
-    print("[DEBUG] Prompt built successfully.")
-    return prompt
+Please respond with the single best label from the categories: """ + ", ".join(CANDIDATE_LABELS) + ".\n"
+_EXAMPLES_HEADER = "Below are some examples:\n\n"
 
-def classify_document_with_gemini(ocr_text: str) -> str:
+_selector: Optional[ExampleSelector] = None
+_selector_lock = threading.Lock()
+
+
+def get_selector() -> ExampleSelector:
+    """The process-wide example selector, indexed on first use."""
+    global _selector
+    with _selector_lock:
+        if _selector is None:
+            pool = load_pool(Path(FEW_SHOT_POOL) if FEW_SHOT_POOL else None, CANDIDATE_LABELS)
+            _selector = ExampleSelector(FEW_SHOT_EXAMPLES + pool, k=FEW_SHOT_K)
+            logger.info("Few-shot pool: %d examples, k=%d", len(_selector), FEW_SHOT_K)
+        return _selector
+
+
+def build_query(ocr_text: str) -> str:
+    """The per-request part of the prompt that follows `STATIC_PREFIX`.
+
+    The document is cut to ``PROMPT_DOCUMENT_TOKENS``; the most similar pool
+    examples fill what is left of ``PROMPT_BUDGET_TOKENS``.
     """
-    Classifies an OCR text into one of the predefined categories using Vertex AI's Gemini model.
+    ocr_text = ocr_text[:PROMPT_DOCUMENT_TOKENS * 4]
+    frame = estimate_tokens(STATIC_PREFIX + _EXAMPLES_HEADER + _QUERY_TEMPLATE.format(examples="", ocr_text=ocr_text))
+    examples = get_selector().select(ocr_text, budget_tokens=PROMPT_BUDGET_TOKENS - frame)
+    block = _EXAMPLES_HEADER + "".join(format_example(ex) for ex in examples) if examples else ""
+    return _QUERY_TEMPLATE.format(examples=block, ocr_text=ocr_text)
+
+
+def build_few_shot_prompt(ocr_text: str) -> str:
+    """
+    Builds a prompt with the few-shot examples most similar to the OCR text.
     """
-    print("[DEBUG] Starting document classification...")
-    print("[DEBUG] OCR text length:", len(ocr_text))
-    print("[DEBUG] OCR text snippet:", ocr_text[:100])  # Print first 100 characters for brevity
-    prompt_text = build_few_shot_prompt(ocr_text)
+    return STATIC_PREFIX + build_query(ocr_text)
 
-    print("[DEBUG] Prompt text for classification:")
-    print(prompt_text)
-    classifier = GenerativeModel(model_name="gemini-2.0-flash-001")
 
-    print("[DEBUG] Sending prompt to Gemini model...")
-    response = classifier.generate_content(prompt_text)
+def prompt_fingerprint() -> str:
+    """Fingerprint of everything that decides the prompt for a given document."""
+    parts = [STATIC_PREFIX, _QUERY_TEMPLATE, get_selector().fingerprint, PROMPT_BUDGET_TOKENS, PROMPT_DOCUMENT_TOKENS]
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
 
-    # Extract the predicted label
-    predicted_label = response.text.strip()
-    print(f"[DEBUG] Model response: {predicted_label}")
+# ─────────────────────────────── backends ─────────────────────────────
 
-    # Validate the predicted label
-    if predicted_label not in CANDIDATE_LABELS:
-        print(f"[WARNING] Unexpected label: {predicted_label}")
-        return "Unknown"
+class ClassifierBackend(Protocol):
+    async def generate(self, query: str) -> str:
+        """Return the model's raw answer for *query* (the prompt after `STATIC_PREFIX`)."""
+        ...
+
+
+class VertexBackend:
+    """Gemini via Vertex AI; the prefix is sent inline with every request.
+
+    The prefix (instructions and labels) is far below the provider's minimum
+    size for context caching, so no cached content is registered.
+    """
 
-    print(f"[DEBUG] Classification successful. Predicted label: {predicted_label}")
-    return predicted_label
+    def __init__(self, model_name: str = MODEL_NAME):
+        init_vertex()
+        from vertexai.generative_models import GenerativeModel
+
+        self._model = GenerativeModel(model_name=model_name)
+
+    async def generate(self, query: str) -> str:
+        response = await self._model.generate_content_async(STATIC_PREFIX + query)
+        return response.text
+
+
+class StubBackend:
+    """Offline backend: picks the few-shot label sharing the most words with the document."""
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self._vocab = [(set(re.findall(r"\w+", ex["document"].lower())), ex["label"]) for ex in FEW_SHOT_EXAMPLES]
+
+    async def generate(self, query: str) -> str:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        document = query.rsplit(_DOCUMENT_MARKER, 1)[-1].split("\n\nPlease respond", 1)[0]
+        words = set(re.findall(r"\w+", document.lower()))
+        return max(self._vocab, key=lambda v: len(v[0] & words))[1]
+
+# ─────────────────────────────── client ───────────────────────────────
+
+class GeminiClassifier:
+    def __init__(self, backend: Optional[ClassifierBackend] = None, max_concurrency: int = 8,
+                 timeout_s: float = 30.0, retries: int = 3, backoff_s: float = 0.5):
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def backend(self) -> ClassifierBackend:
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = VertexBackend()
+        return self._backend
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # One semaphore per event loop: the sync wrapper runs its own short-lived loops.
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    async def classify(self, ocr_text: str) -> str:
+        """Label for *ocr_text*, or ``"Unknown"`` if the model answers off‑list."""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Classifying %d chars: %r", len(ocr_text), ocr_text[:100])
+        query = build_query(ocr_text)
+        async with self._semaphore():
+            answer = await self._generate_with_retries(query)
+
+        predicted_label = answer.strip()
+        if predicted_label not in CANDIDATE_LABELS:
+            logger.warning("Unexpected label: %s", predicted_label)
+            return "Unknown"
+        logger.debug("Predicted label: %s", predicted_label)
+        return predicted_label
+
+    async def classify_many(self, texts: Sequence[str]) -> List[str]:
+        """Classify *texts* concurrently (bounded by ``max_concurrency``), preserving order."""
+        return list(await asyncio.gather(*(self.classify(t) for t in texts)))
+
+    async def _generate_with_retries(self, query: str) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                return await asyncio.wait_for(self.backend.generate(query), self.timeout_s)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff_s * 2 ** attempt * (1 + random.random())
+                logger.warning("Gemini call failed (%s); retry %d in %.1fs", e, attempt + 1, delay)
+                await asyncio.sleep(delay)
+
+
+def _default_backend() -> Optional[ClassifierBackend]:
+    if os.getenv("CLASSIFIER_BACKEND", "vertex") == "stub":
+        return StubBackend(latency_s=float(os.getenv("CLASSIFIER_STUB_LATENCY_S", "0")))
+    return None  # VertexBackend, created on first use
+
+
+_client: Optional[GeminiClassifier] = None
+
+
+def get_client() -> GeminiClassifier:
+    """The process-wide classifier client."""
+    global _client
+    if _client is None:
+        _client = GeminiClassifier(
+            backend=_default_backend(),
+            max_concurrency=int(os.getenv("CLASSIFIER_MAX_CONCURRENCY", "8")),
+            timeout_s=float(os.getenv("CLASSIFIER_TIMEOUT_S", "30")),
+            retries=int(os.getenv("CLASSIFIER_RETRIES", "3")),
+        )
+    return _client
+
+
+def warmup() -> None:
+    """Create the backend (SDK init) and index the example pool ahead of the first request."""
+    get_selector()
+    get_client().backend
+
+
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_lock = threading.Lock()
+
+
+def classify_document_with_gemini(ocr_text: str) -> str:
+    """
+    Classifies an OCR text into one of the predefined categories using Vertex AI's Gemini model.
+
+    Blocking convenience wrapper; async callers should use ``get_client().classify``.
+    A private loop is reused across calls so the backend's async channel stays valid.
+    """
+    global _sync_loop
+    with _sync_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+        return _sync_loop.run_until_complete(get_client().classify(ocr_text))
 
 # Example usage
 if __name__ == "__main__":
@@ -174,6 +364,6 @@ if __name__ == "__main__":
     Due Date: 04/20/2025
     """
 
-    print("[DEBUG] Running example classification...")
+    logging.basicConfig(level=logging.DEBUG)
     predicted_label = classify_document_with_gemini(sample_ocr_text)
     print("Predicted Label:", predicted_label)
\ No newline at end of file
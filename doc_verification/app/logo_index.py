@@ -0,0 +1,227 @@
+"""Perceptual‑hash index of bank logos.
+
+Every logo in `logos/` is fingerprinted with 64‑bit dHash and pHash values at a
+few scales, packed into one ``uint64`` array.  A document is matched by hashing
+several candidate header regions and running a vectorised Hamming‑distance
+search against the whole array, so the cost is a handful of XOR/popcount passes
+regardless of how many banks are indexed.
+
+Crops are trimmed to their non‑background bounding box before hashing, which
+makes matching tolerant to where the logo sits inside the region; dHash/pHash
+tolerate re‑compression, scaling and small colour shifts that break an exact
+MD5.
+
+The directory is re‑scanned at most every ``refresh_s`` seconds (``stat`` only);
+new or modified files are hashed incrementally and ``version`` is bumped, so a
+running service picks up logo changes without a restart.  A service can instead
+call `LogoIndex.refresh` from a background task; ``fingerprint`` only reads the
+current snapshot, so it is safe to use on an event loop.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8                   # 8×8 → 64‑bit hashes
+MATCH_THRESHOLD = 10            # max Hamming distance (bits) for a match
+LOGO_SCALES = (1.0, 0.75, 0.5)  # logo re‑scales indexed alongside the original
+BACKGROUND_LEVEL = 240          # grayscale ≥ this counts as paper background
+
+# Candidate logo regions of a document page, as (left, top, right, bottom) fractions.
+QUERY_REGIONS: Tuple[Tuple[float, float, float, float], ...] = (
+    (0.0, 0.0, 0.35, 0.15),
+    (0.0, 0.0, 0.5, 0.25),
+    (0.3, 0.0, 0.7, 0.15),
+    (0.65, 0.0, 1.0, 0.15),
+    (0.5, 0.0, 1.0, 0.25),
+)
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy ≥ 2.0
+        return np.bitwise_count(x)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1)
+
+
+def _pack(bits: np.ndarray) -> np.uint64:
+    return np.uint64(int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big"))
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def dhash(gray: Image.Image) -> np.uint64:
+    px = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR), dtype=np.int16)
+    return _pack(px[:, 1:] > px[:, :-1])
+
+
+def phash(gray: Image.Image) -> np.uint64:
+    px = np.asarray(gray.resize((32, 32), Image.BILINEAR), dtype=np.float64)
+    low = (_DCT32 @ px @ _DCT32.T)[:HASH_SIZE, :HASH_SIZE]
+    return _pack(low > np.median(low[1:, 1:]))
+
+
+def _trim(gray: Image.Image) -> Optional[Image.Image]:
+    """Crop *gray* to the bounding box of its non‑background pixels."""
+    px = np.asarray(gray)
+    ys, xs = np.nonzero(px < BACKGROUND_LEVEL)
+    if len(xs) < 16:
+        return None
+    return gray.crop((xs.min(), ys.min(), xs.max() + 1, ys.max() + 1))
+
+
+def fingerprints(img: Image.Image, scales=(1.0,)) -> np.ndarray:
+    """dHash and pHash of the trimmed image at each scale, as ``uint64``."""
+    gray = _trim(img.convert("L"))
+    if gray is None:
+        return np.empty(0, dtype=np.uint64)
+    out = []
+    for s in scales:
+        g = gray if s == 1.0 else gray.resize((max(1, int(gray.width * s)), max(1, int(gray.height * s))))
+        out.extend((dhash(g), phash(g)))
+    return np.array(out, dtype=np.uint64)
+
+
+def query_fingerprints(page: Image.Image) -> np.ndarray:
+    """Fingerprints of every candidate logo region of a document page."""
+    w, h = page.size
+    parts = [fingerprints(page.crop((int(l * w), int(t * h), int(r * w), int(b * h))))
+             for l, t, r, b in QUERY_REGIONS]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+
+
+@dataclass
+class _Entry:
+    stamp: Tuple[int, int]  # (mtime_ns, size)
+    bank: str
+    hashes: np.ndarray
+
+
+class LogoIndex:
+    def __init__(self, directory: Path, threshold: int = MATCH_THRESHOLD, refresh_s: float = 5.0):
+        self.directory = directory
+        self.threshold = threshold
+        self.refresh_s = refresh_s
+        self.version = 0
+        self._entries: Dict[Path, _Entry] = {}
+        # (banks, hashes, owners) swapped as one tuple so readers always see a consistent
+        # snapshot; owners maps each hash row to its index in banks.
+        self._snapshot: Tuple[List[str], np.ndarray, np.ndarray] = (
+            [], np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32))
+        self._fingerprint = self._hash_snapshot()
+        self._checked = float("-inf")  # first use triggers the initial scan
+        self._lock = threading.Lock()
+
+    # ──────────────────────────── public ─────────────────────────────
+
+    def __len__(self) -> int:
+        self.maybe_refresh()
+        return len(self._snapshot[0])
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the indexed fingerprints (changes whenever a logo does); never rescans."""
+        return self._fingerprint
+
+    def refresh(self) -> bool:
+        """Re‑scan the directory, hashing only new or modified files.  Returns ``True`` on change."""
+        with self._lock:
+            self._checked = time.monotonic()
+            if not self.directory.exists():
+                if self.version == 0:
+                    logging.warning("Logo directory %s does not exist", self.directory)
+                changed = bool(self._entries)
+                self._entries.clear()
+            else:
+                changed = self._scan()
+            if changed or self.version == 0:
+                self._rebuild()
+                self.version += 1
+                logging.info("Logo index v%d: %d logos, %d fingerprints",
+                             self.version, len(self._snapshot[0]), len(self._snapshot[1]))
+            return changed
+
+    def maybe_refresh(self) -> None:
+        if time.monotonic() - self._checked >= self.refresh_s:
+            self.refresh()
+
+    def match(self, page: Image.Image) -> Optional[Tuple[str, int]]:
+        """Best ``(bank, distance)`` for *page* within the threshold, else ``None``."""
+        self.maybe_refresh()
+        banks, hashes, owners = self._snapshot
+        query = query_fingerprints(page)
+        if not len(hashes) or not len(query):
+            return None
+        dist = _popcount(query[:, None] ^ hashes[None, :])
+        q, row = np.unravel_index(int(dist.argmin()), dist.shape)
+        best = int(dist[q, row])
+        return (banks[owners[row]], best) if best <= self.threshold else None
+
+    def summary(self) -> dict:
+        self.maybe_refresh()
+        banks, hashes, owners = self._snapshot
+        return {
+            "version": self.version,
+            "size": len(banks),
+            "fingerprints": int(len(hashes)),
+            "threshold": self.threshold,
+            "fingerprint": self.fingerprint,
+            "logos": {bank: [f"{int(h):016x}" for h in hashes[owners == i]]
+                      for i, bank in enumerate(banks)},
+        }
+
+    # ─────────────────────────── internals ───────────────────────────
+
+    def _scan(self) -> bool:
+        seen, changed = set(), False
+        for img_path in self.directory.glob("*.[pj][pn]g"):
+            seen.add(img_path)
+            st = img_path.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+            entry = self._entries.get(img_path)
+            if entry is not None and entry.stamp == stamp:
+                continue
+            try:
+                with Image.open(img_path) as img:
+                    hashes = fingerprints(img, LOGO_SCALES)
+            except Exception as e:
+                logging.error("Failed hashing %s: %s", img_path, e)
+                continue
+            bank_name = img_path.stem.replace("_", " ").title()
+            self._entries[img_path] = _Entry(stamp, bank_name, hashes)
+            changed = True
+        for gone in set(self._entries) - seen:
+            del self._entries[gone]
+            changed = True
+        return changed
+
+    def _rebuild(self) -> None:
+        entries = sorted(self._entries.values(), key=lambda e: e.bank)
+        banks = [e.bank for e in entries]
+        hashes = np.concatenate([e.hashes for e in entries]) if entries else np.empty(0, dtype=np.uint64)
+        owners = np.concatenate([np.full(len(e.hashes), i, dtype=np.int32) for i, e in enumerate(entries)]) \
+            if entries else np.empty(0, dtype=np.int32)
+        self._snapshot = (banks, hashes, owners)
+        self._fingerprint = self._hash_snapshot()
+
+    def _hash_snapshot(self) -> str:
+        banks, hashes, _ = self._snapshot
+        return hashlib.sha256(hashes.tobytes() + "|".join(banks).encode()).hexdigest()[:16]
@@ -2,170 +2,531 @@
    **and basic forgery heuristics with dynamic bank‑logo hashing**.
 
 🔄 **NEW FEATURES**
-• Automatically computes MD5 hashes for every logo image placed in the `logos/` folder (PNG/JPG).
-• Stores them in `BANK_LOGO_HASHES` at startup and logs the mapping.
-• Adds `/logo-hashes` endpoint to return the current dictionary as JSON for easy copy‑paste.
+• Fingerprints every logo image placed in the `logos/` folder (PNG/JPG) with perceptual
+  dHash/pHash values and matches documents by Hamming distance (`logo_index.py`).
+• The index picks up added, changed or removed logos without a restart.
+• Adds `/logo-hashes` endpoint to return the index version, size and fingerprints.
+• OCR pages from concurrent uploads are micro‑batched into shared forward passes (`batcher.py`).
+• Adds `/upload/batch` to verify many files in a single request.
+• OCR, decoding and forgery checks run in a process pool, Gemini calls on an async client;
+  excess load is shed with 503 + Retry‑After (`executor.py`).
+• Uploads never touch disk: one in‑memory buffer is decoded once and shared by OCR and
+  the forgery checks (`document.py`).
+• PDF pages with a usable embedded text layer skip OCR entirely (`pdf_text.py`).
+• `/upload/stream` OCRs pages one at a time and emits NDJSON events (classification,
+  metadata, forgery) as soon as each is known, optionally stopping OCR early.
+• OCR output is a compact array‑backed `OCRResult` (words, boxes, confidences, line ids)
+  instead of flattened `export()` text, enabling layout‑aware extraction (`ocr_result.py`).
+• ELA runs in memory on every decoded page and reports localized anomalies per tile (`ela.py`).
+• Forgery checks are registered plugins with a declared cost: cheap ones run first, expensive
+  ones concurrently, all reading one shared decoded document (`forgery.py`).
+• Classification is a cascade: TF‑IDF → zero‑shot MNLI → Gemini, each tier answering only
+  when confident (`cascade.py`); see `/classifier/stats`.
+• The Gemini prompt carries only the pool examples most similar to the document, within a
+  fixed token budget (`example_selector.py`).
+• Results are cached by content hash in memory and SQLite (`cache.py`); see `/cache/stats`.
+• `/metrics` exports Prometheus stage histograms, queue depths, page/byte counts and model
+  calls; request tracing and a sampling profiler can be switched on at runtime (`metrics.py`).
+• Models load lazily or in a background warmup (`models.py`); `/healthz` answers at once,
+  `/readyz` turns 200 when the models are warm.
 
 Place files like `chase.png`, `boa.png`, `discover.png`, etc., into `logos/`.
 Each image should be the corporate logo on a white background, at least 250 × 250 px.
 """
 
+from dataclasses import replace
 from pathlib import Path
+from typing import List
 from fastapi import FastAPI, UploadFile, File, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from doctr.io import DocumentFile
-from doctr.models import ocr_predictor
-from llm_classifier import classify_document_with_gemini
+from starlette.background import BackgroundTask
+import llm_classifier
+import metrics
 from extractor import extract_metadata
-import os, hashlib, logging, cv2
-from PIL import Image, ImageChops
-import pikepdf
+from ocr_result import OCRResult, merge as merge_ocr
+from batcher import OCRBatcher
+from executor import ExecutionLayer
+from forgery import CHECKS, ELA_MAX_SIDE, FORGERY_SHORT_CIRCUIT, LOGO_INDEX, detect_forgery
+import workers
+from document import UploadedDocument
+from cache import ResultCache, content_key, fingerprint
+from models import registry
+from cascade import ClassifierCascade, zero_shot_top
+import asyncio, json, os, logging, threading
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
 
 # ─────────────────────────────── config ──────────────────────────────
 MAX_MB   = 10
-LOGO_DIR = Path("logos")  # put logo images here
+MAX_BYTES = MAX_MB * 1024 * 1024
+READ_CHUNK = 256 * 1024
+ALLOWED_EXT = {".jpg", ".jpeg", ".png", ".pdf"}
+OCR_MAX_BATCH   = int(os.getenv("OCR_MAX_BATCH", "8"))       # pages per forward pass
+OCR_MAX_WAIT_MS = float(os.getenv("OCR_MAX_WAIT_MS", "20"))  # max time a page waits for a batch
 CACHE_DIR = Path("/tmp/.cache_doctr"); CACHE_DIR.mkdir(parents=True, exist_ok=True)
 os.environ.setdefault("HF_HOME", str(CACHE_DIR))
+RESULT_CACHE_DB     = os.getenv("RESULT_CACHE_DB", str(CACHE_DIR / "results.sqlite3"))  # "" → memory only
+RESULT_CACHE_ITEMS  = int(os.getenv("RESULT_CACHE_ITEMS", "1024"))
+RESULT_CACHE_TTL_S  = float(os.getenv("RESULT_CACHE_TTL_S", str(7 * 24 * 3600)))
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "512"))
+# Classification cascade: local tiers answer when confident, Gemini only otherwise.
+CASCADE_TIER1_MIN_CONF = float(os.getenv("CASCADE_TIER1_MIN_CONF", "0.85"))
+CASCADE_TIER2_MIN_CONF = float(os.getenv("CASCADE_TIER2_MIN_CONF", "0.8"))
+CASCADE_TIER1_MIN_SIM    = float(os.getenv("CASCADE_TIER1_MIN_SIM", "0.5"))     # best TF‑IDF cosine …
+CASCADE_TIER1_MIN_MARGIN = float(os.getenv("CASCADE_TIER1_MIN_MARGIN", "0.1"))  # … and its lead over the runner‑up
+ZERO_SHOT = os.getenv("ZERO_SHOT", "1") != "0"        # enable the bart-large-mnli tier
+CLASSIFIER_HISTORY = os.getenv("CLASSIFIER_HISTORY")  # JSONL of {"text", "label"} for tier 1
+WARMUP = os.getenv("WARMUP", "1") != "0"  # load models in the background right after startup
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "0") == "1"  # runtime tracing/profiler toggles
+
+CLASSIFY_CHARS = 4000  # OCR characters sent to the classifier
+# Streaming mode: OCR stops early once these fields are found (when `early_exit=true`).
+STREAM_REQUIRED_FIELDS = {"Name", "Date", "ID", "Amount"}
 
-# ─────────────────────── dynamic logo hashing ────────────────────────
+# ─────────────────────── app & OCR predictor ─────────────────────────
+app = FastAPI()
+templates = Jinja2Templates(directory="templates")
+execution = ExecutionLayer(warm=WARMUP, warm_zero_shot=WARMUP and ZERO_SHOT)
+result_cache = ResultCache(Path(RESULT_CACHE_DB) if RESULT_CACHE_DB else None,
+                           max_items=RESULT_CACHE_ITEMS, ttl_s=RESULT_CACHE_TTL_S,
+                           max_disk_mb=RESULT_CACHE_MAX_MB)
+gemini = llm_classifier.get_client()
+cascade = ClassifierCascade(
+    gemini,
+    zero_shot=zero_shot_top if ZERO_SHOT else None,
+    tier1_min_conf=CASCADE_TIER1_MIN_CONF,
+    tier2_min_conf=CASCADE_TIER2_MIN_CONF,
+    tier1_min_similarity=CASCADE_TIER1_MIN_SIM,
+    tier1_min_margin=CASCADE_TIER1_MIN_MARGIN,
+    history_path=Path(CLASSIFIER_HISTORY) if CLASSIFIER_HISTORY else None,
+    runner=execution.cpu,  # the NLI model lives in the CPU workers, like the OCR predictor
+)
+ocr_batcher = OCRBatcher(workers.run_ocr, max_batch=OCR_MAX_BATCH, max_wait_ms=OCR_MAX_WAIT_MS,
+                         runner=execution.cpu, max_inflight=execution.cpu_workers)
+metrics.QUEUE_DEPTH.set_function(lambda: {
+    ("admission_waiting",): execution.admission.waiting,
+    ("admission_active",): execution.admission.active,
+    ("ocr_pages",): ocr_batcher.queued_pages,
+})
+
+
+def _warm_ocr_workers() -> int:
+    """Start the CPU pool and wait for a worker to answer; returns its pid.
+
+    Each worker loads the predictor in its initializer (``ExecutionLayer(warm=...)``),
+    so this only confirms the pool is up with a working model.
+    """
+    execution.start()
+    return execution.cpu_pool.submit(workers.warmup).result()
+
+
+def _warm_zero_shot_workers() -> int:
+    """As `_warm_ocr_workers`, for the zero‑shot NLI model (``ExecutionLayer(warm_zero_shot=...)``)."""
+    execution.start()
+    return execution.cpu_pool.submit(workers.warmup_zero_shot).result()
+
+
+async def _refresh_logos() -> None:
+    """Re‑scan the logo directory every ``refresh_s`` on the I/O pool, never on the event loop."""
+    while True:
+        try:
+            await execution.io(LOGO_INDEX.refresh)
+            registry.mark_loaded("logos")
+        except Exception:
+            logging.exception("Logo index refresh failed")
+        await asyncio.sleep(LOGO_INDEX.refresh_s)
+
+
+registry.register("ocr", _warm_ocr_workers)
+registry.register("gemini", llm_classifier.warmup)
+registry.register("logos", LOGO_INDEX.refresh, required=False)
+if ZERO_SHOT:
+    registry.register("zero_shot", _warm_zero_shot_workers)
+
+
+@app.on_event("startup")
+async def _start_workers():
+    execution.start()
+    ocr_batcher.start()
+    app.state.logo_refresh = asyncio.ensure_future(_refresh_logos())
+    if WARMUP:
+        # Not awaited: the app answers health checks while models load.
+        asyncio.ensure_future(execution.io(registry.warmup))
+
+
+@app.on_event("shutdown")
+async def _stop_workers():
+    app.state.logo_refresh.cancel()
+    await ocr_batcher.stop()
+    execution.shutdown()
+
+
+def _cache_version() -> str:
+    """Fingerprint of everything a cached result depends on (no I/O: logos refresh in the background)."""
+    return fingerprint(
+        workers.OCR_DET_ARCH, workers.OCR_RECO_ARCH,
+        llm_classifier.MODEL_NAME, llm_classifier.prompt_fingerprint(),
+        CASCADE_TIER1_MIN_CONF, CASCADE_TIER2_MIN_CONF, CASCADE_TIER1_MIN_SIM, CASCADE_TIER1_MIN_MARGIN,
+        ZERO_SHOT, CLASSIFIER_HISTORY,
+        LOGO_INDEX.fingerprint, sorted(CHECKS), FORGERY_SHORT_CIRCUIT,
+    )
 
-def _logo_hash(img: Image.Image) -> str:
-    """Return MD5 of top‑left 250×250 grayscale, down‑sampled to 64×64."""
-    crop = img.crop((0, 0, 250, 250)).convert("L").resize((64, 64))
-    return hashlib.md5(crop.tobytes()).hexdigest()
 
+async def _verify(content: bytes, ext: str) -> dict:
+    """OCR → classify → metadata → forgery for one uploaded document, fully in memory.
+
+    Results are cached by content hash, so a re‑upload of the same bytes skips
+    OCR and the Gemini call entirely.
+    """
+    metrics.BYTES_PROCESSED.inc(len(content))
+    key, version = content_key(content), _cache_version()
+    with metrics.stage("cache_lookup"):
+        cached = await execution.io(result_cache.get, key, version)
+    metrics.DOCUMENTS.inc(cache="miss" if cached is None else "hit")
+    if cached is None:
+        with metrics.stage("pipeline"):
+            cached = await _run_pipeline(content, ext)
+        await execution.io(result_cache.put, key, version, cached)
+
+    doc_type, metadata, forgery = cached["prediction"], cached["metadata"], cached["forgery"]
+    return {"prediction": doc_type, "classification": cached.get("classification"),
+            "metadata": metadata, "forgery": forgery, "valid": _is_valid(doc_type, metadata, forgery)}
+
+
+def _is_valid(doc_type: str, metadata: dict, forgery: dict) -> bool:
+    return bool(doc_type and metadata) and not forgery["is_forged"]
+
+
+async def _run_pipeline(content: bytes, ext: str) -> dict:
+    doc = UploadedDocument(content, ext)
+    with metrics.stage("decode"):
+        doc.text_layer, doc.pages, doc.ela = await execution.cpu(workers.load_pages, doc, ELA_MAX_SIDE)
+    metrics.DOCUMENT_PAGES.observe(len(doc.text_layer))
+    with metrics.stage("ocr"):
+        ocr = merge_ocr(doc.text_layer, await _ocr(doc.pages))
+    extracted_text = ocr.text
+
+    decision = await _classify(extracted_text)
+    doc_type = decision.label
+
+    with metrics.stage("extract_metadata"):
+        metadata = extract_metadata(ocr)
+    forgery = await _detect_forgery(doc, doc_type, metadata, ocr)
+    return {"text": extracted_text, "prediction": doc_type, "classification": decision.to_dict(),
+            "metadata": metadata, "forgery": forgery}
+
+
+async def _ocr(pages: list) -> list:
+    """OCR *pages* through the micro‑batcher; a successful pass marks the OCR model loaded."""
+    results = await ocr_batcher.submit(pages)
+    if pages:
+        registry.mark_loaded("ocr")
+    return results
+
+
+async def _classify(extracted_text: str):
+    """Run the cascade on the first CLASSIFY_CHARS characters of the OCR text."""
+    snippet = extracted_text[:CLASSIFY_CHARS]
+    with metrics.stage("classify"):
+        decision = await cascade.classify(snippet)
+    for tier in decision.tiers:
+        metrics.MODEL_CALLS.inc(model=tier.tier)
+        registry.mark_loaded(tier.tier)  # "zero_shot" / "gemini" answered, so their models are loaded
+        metrics.observe_stages({f"classify_{tier.tier}": tier.latency_ms / 1000})
+    return decision
+
+
+async def _detect_forgery(doc: UploadedDocument, doc_type: str, metadata: dict, ocr: OCRResult) -> dict:
+    """Forgery checks in the CPU pool; per‑check timings go to metrics, not the response.
+
+    The page arrays stay behind: ELA was computed where the pages were decoded
+    (``doc.ela``), so only the upload bytes and small results cross to the worker.
+    """
+    with metrics.stage("forgery"):
+        forgery = await execution.cpu(detect_forgery, replace(doc, pages=None), doc_type, metadata, ocr)
+    metrics.observe_stages(forgery.pop("timings_s", None))
+    return forgery
+
+# ─────────────────────────── streaming mode ──────────────────────────
+
+async def _iter_page_results(doc: UploadedDocument):
+    """Yield ``(page_no, source, OCRResult)`` one page at a time.
+
+    Only one rasterised page is alive at any moment, so memory does not grow
+    with page count.  Scanned PDF pages get their ELA as they are rendered
+    (``doc.ela``), so the forgery checks see the same pages as the full pipeline.
+    """
+    if doc.is_pdf:
+        doc.text_layer = await execution.cpu(workers.read_text_layer, doc.data)
+        doc.ela = {}
+        for i, native in enumerate(doc.text_layer):
+            if native is not None:
+                yield i, "text", OCRResult.from_text(native)
+            else:
+                with metrics.stage("decode"):
+                    page, doc.ela[i] = await execution.cpu(workers.render_page_ela, doc.data, i, ELA_MAX_SIDE)
+                with metrics.stage("ocr"):
+                    result = (await _ocr([page]))[0]
+                yield i, "ocr", result
+    else:
+        with metrics.stage("decode"):
+            doc.text_layer, doc.pages, doc.ela = await execution.cpu(workers.load_pages, doc, ELA_MAX_SIDE)
+        with metrics.stage("ocr"):
+            result = (await _ocr(doc.pages))[0]
+        yield 0, "ocr", result
+
+
+async def _stream_events(content: bytes, ext: str, early_exit: bool):
+    """Produce verification events for one document as they become available."""
+    metrics.BYTES_PROCESSED.inc(len(content))
+    key, version = content_key(content), _cache_version()
+    cached = await execution.io(result_cache.get, key, version)
+    metrics.DOCUMENTS.inc(cache="miss" if cached is None else "hit")
+    if cached is not None:
+        yield {"event": "classification", "prediction": cached["prediction"],
+               "classification": cached.get("classification"), "cached": True}
+        yield {"event": "metadata", "fields": cached["metadata"]}
+        yield {"event": "forgery", **cached["forgery"]}
+        yield {"event": "done", "valid": _is_valid(cached["prediction"], cached["metadata"], cached["forgery"])}
+        return
+
+    doc = UploadedDocument(content, ext)
+    results, page_nos, metadata = [], [], {}
+    chars = 0
+    classify_task, decision = None, None
+    stopped_early = False
+
+    async for page_no, source, result in _iter_page_results(doc):
+        results.append(result)
+        page_nos.append(page_no)
+        chars += len(result.text) + (chars > 0)  # pages are joined with one space
+        yield {"event": "page", "page": page_no, "source": source, "chars": len(result.text)}
+
+        # Classification only ever sees the first CLASSIFY_CHARS, so start it as soon as we have them.
+        if classify_task is None and chars >= CLASSIFY_CHARS:
+            classify_task = asyncio.ensure_future(_classify(OCRResult.concat(results, pages=page_nos).text))
+
+        # Per page, so the work stays linear in page count; the whole document is re-read once at the end.
+        with metrics.stage("extract_metadata"):
+            found = extract_metadata(result)
+        new = {k: v for k, v in found.items() if k not in metadata}
+        if new:
+            metadata.update(new)
+            yield {"event": "metadata", "fields": new}
+
+        if decision is None and classify_task is not None and classify_task.done():
+            decision = classify_task.result()
+            yield {"event": "classification", "prediction": decision.label, "classification": decision.to_dict()}
+        if early_exit and classify_task is not None and STREAM_REQUIRED_FIELDS <= metadata.keys():
+            stopped_early = True
+            yield {"event": "early_exit", "pages_processed": len(results)}
+            break
+
+    ocr = OCRResult.concat(results, pages=page_nos)
+    extracted_text = ocr.text
+    metrics.DOCUMENT_PAGES.observe(len(results))
+    if classify_task is None:
+        classify_task = asyncio.ensure_future(_classify(extracted_text))
+    if decision is None:
+        decision = await classify_task
+        yield {"event": "classification", "prediction": decision.label, "classification": decision.to_dict()}
+    doc_type = decision.label
+
+    # Final metadata as the full pipeline computes it (cross-page matches, spatial retry of weak
+    # fields), so a cached stream result equals a cached upload result; corrections are re-emitted.
+    with metrics.stage("extract_metadata"):
+        final = extract_metadata(ocr)
+    changed = {k: v for k, v in final.items() if metadata.get(k) != v}
+    metadata = final
+    if changed:
+        yield {"event": "metadata", "fields": changed}
+
+    forgery = await _detect_forgery(doc, doc_type, metadata, ocr)
+    yield {"event": "forgery", **forgery}
+    yield {"event": "done", "valid": _is_valid(doc_type, metadata, forgery), "early_exit": stopped_early}
+
+    if not stopped_early:
+        await execution.io(result_cache.put, key, version, {
+            "text": extracted_text, "prediction": doc_type, "classification": decision.to_dict(),
+            "metadata": metadata, "forgery": forgery})
+
+
+async def _read_upload(file: UploadFile) -> tuple[bytes, str]:
+    """Read the upload in chunks into memory, rejecting it as soon as it passes MAX_MB."""
+    if not file.filename:
+        raise HTTPException(400, "Missing filename")
 
-def _build_logo_hashes(directory: Path) -> dict:
-    mapping = {}
-    if not directory.exists():
-        logging.warning("Logo directory %s does not exist", directory)
-        return mapping
-    for img_path in directory.glob("*.[pj][pn]g"):
-        try:
-            digest = _logo_hash(Image.open(img_path))
-            bank_name = img_path.stem.replace("_", " ").title()
-            mapping[bank_name] = digest
-        except Exception as e:
-            logging.error("Failed hashing %s: %s", img_path, e)
-    return mapping
+    ext = Path(file.filename).suffix.lower()
+    if ext not in ALLOWED_EXT:
+        raise HTTPException(415, "Unsupported type")
 
-BANK_LOGO_HASHES = _build_logo_hashes(LOGO_DIR)
-logging.info("Loaded %d logo hashes", len(BANK_LOGO_HASHES))
+    if file.size is not None and file.size > MAX_BYTES:
+        raise HTTPException(413, "File too large")
 
-# ─────────────────────── app & OCR predictor ─────────────────────────
-app = FastAPI()
-templates = Jinja2Templates(directory="templates")
-ocr = ocr_predictor(det_arch="db_resnet50", reco_arch="crnn_vgg16_bn", pretrained=True)
+    content = bytearray()
+    while chunk := await file.read(READ_CHUNK):
+        if len(content) + len(chunk) > MAX_BYTES:
+            raise HTTPException(413, "File too large")
+        content += chunk
+    return bytes(content), ext
 
-# ───────────────────── forgery‑detection helpers ─────────────────────
+# ───────────────────────────── routes ────────────────────────────────
 
-def _logo_hash_match(img: Image.Image) -> bool:
-    return _logo_hash(img) in BANK_LOGO_HASHES.values()
+@app.get("/", response_class=HTMLResponse)
+async def form(request: Request):
+    return templates.TemplateResponse("index.html", {"request": request})
 
 
-def _ela_score(img_path: Path) -> float:
-    img = Image.open(img_path).convert("RGB")
-    tmp_path = img_path.with_suffix(".ela.jpg")
-    img.save(tmp_path, "JPEG", quality=95)
-    ela = ImageChops.difference(img, Image.open(tmp_path))
-    std = float(cv2.cvtColor(cv2.imread(str(tmp_path)), cv2.COLOR_BGR2GRAY).std())
-    tmp_path.unlink(missing_ok=True)
-    return std
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and the event loop is responsive."""
+    return {"status": "ok"}
 
 
-def detect_forgery(tmp_path: Path, ext: str, doc_type: str, metadata: dict) -> dict:
-    issues = []
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once every required model is loaded, 503 until then."""
+    return JSONResponse({"ready": registry.ready, "models": registry.status()},
+                        status_code=200 if registry.ready else 503)
 
-    # 1️⃣ PDF metadata sanity
-    if ext == ".pdf":
-        with pikepdf.open(tmp_path) as pdf:
-            info = pdf.docinfo or {}
-            creation = str(info.get("/CreationDate", ""))
-            if len(creation) >= 6 and creation[2:6] > "2030":
-                issues.append("Future creation date")
-            if str(info.get("/Producer", "")).lower().startswith("word"):
-                issues.append("Producer = Word")
 
-    # 2️⃣ Logo hash (Bank Statement images)    
-    if doc_type == "Bank Statement" and ext in {".jpg", ".jpeg", ".png"}:
-        if not _logo_hash_match(Image.open(tmp_path)):
-            issues.append("Bank logo hash mismatch")
+@app.get("/logo-hashes")
+async def logo_hashes():
+    """Return the logo index version, size and bank → fingerprint mapping."""
+    await execution.io(LOGO_INDEX.maybe_refresh)
+    return JSONResponse(LOGO_INDEX.summary())
 
-    # 3️⃣ ELA noise
-    if ext in {".jpg", ".jpeg", ".png"}:
-        if _ela_score(tmp_path) > 25:
-            issues.append("High ELA noise")
 
-    # 4️⃣ Routing sanity
-    if doc_type == "Bank Statement" and metadata.get("routing_number", "").startswith("0") is False:
-        issues.append("Routing number unusual")
+@app.get("/workers")
+async def worker_stats():
+    """Pool sizes and current admission‑queue occupancy."""
+    return JSONResponse(execution.stats())
 
-    return {"is_forged": bool(issues), "issues": issues}
 
-# ─────────────────────────── OCR helper ──────────────────────────────
+@app.get("/classifier/stats")
+async def classifier_stats():
+    """How many documents each cascade tier answered, and how fast."""
+    return JSONResponse(cascade.stats())
 
-def _extract_text(result) -> str:
-    doc_json = result.export()
-    return " ".join(w["value"]
-                     for p in doc_json["pages"]
-                     for b in p["blocks"]
-                     for l in b["lines"]
-                     for w in l["words"])
 
-# ───────────────────────────── routes ────────────────────────────────
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and occupancy of the result cache."""
+    return JSONResponse(await execution.io(result_cache.snapshot))
 
-@app.get("/", response_class=HTMLResponse)
-async def form(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
-@app.get("/logo-hashes")
-async def logo_hashes():
-    """Return dictionary of bank → MD5 logo hashes."""
-    return JSONResponse(BANK_LOGO_HASHES)
+
+@app.middleware("http")
+async def _trace_requests(request: Request, call_next):
+    """With tracing on, report each request's stage spans in a ``Server-Timing`` header."""
+    if not metrics.tracing_enabled():
+        return await call_next(request)
+    with metrics.request_trace() as spans:
+        response = await call_next(request)
+    if spans:
+        response.headers["Server-Timing"] = metrics.server_timing(spans)
+    return response
+
+
+def _require_debug():
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(404, "Not Found")
+
+
+@app.post("/debug/tracing")
+async def toggle_tracing(enabled: bool = True):
+    """Switch per‑request trace spans on or off (needs ``DEBUG_ENDPOINTS=1``)."""
+    _require_debug()
+    metrics.set_tracing(enabled)
+    return {"tracing": metrics.tracing_enabled()}
+
+
+@app.post("/debug/profiler/start")
+async def profiler_start(interval_ms: float = 5.0, event_loop_only: bool = False):
+    """Start the sampling profiler (needs ``DEBUG_ENDPOINTS=1``)."""
+    _require_debug()
+    metrics.PROFILER.start(interval_ms, threading.get_ident() if event_loop_only else None)
+    return {"running": True, "interval_ms": interval_ms}
+
+
+@app.post("/debug/profiler/stop")
+async def profiler_stop():
+    """Stop the profiler and return collapsed stacks, ready for flamegraph tools."""
+    _require_debug()
+    stacks = await execution.io(metrics.PROFILER.stop)
+    return PlainTextResponse(stacks)
 
 
 @app.post("/upload/")
 async def handle_upload(request: Request, file: UploadFile = File(...)):
-    if not file.filename:
-        raise HTTPException(400, "Missing filename")
+    content, ext = await _read_upload(file)
+    async with execution.admission.slot():
+        result = await _verify(content, ext)
+    return templates.TemplateResponse("index.html", {"request": request, **result})
 
-    ext = Path(file.filename).suffix.lower()
-    if ext not in {".jpg", ".jpeg", ".png", ".pdf"}:
-        raise HTTPException(415, "Unsupported type")
 
-    content = await file.read()
-    if len(content) > MAX_MB * 1024 * 1024:
-        raise HTTPException(413, "File too large")
+class _SlotStreamingResponse(StreamingResponse):
+    """A `StreamingResponse` that gives back its admission slot however the response ends.
+
+    The slot is released by a background task after the last chunk and, failing
+    that (client disconnect, cancellation), when ``__call__`` unwinds, never by
+    finalising the body generator, which may not even have started.
+    """
+
+    def __init__(self, content, slot, **kwargs):
+        super().__init__(content, background=BackgroundTask(self._release), **kwargs)
+        self._slot = slot
+        self._released = False
+
+    async def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            await self._slot.__aexit__(None, None, None)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._release()
+
+
+@app.post("/upload/stream")
+async def handle_upload_stream(file: UploadFile = File(...), early_exit: bool = False):
+    """Verify one document page by page, emitting NDJSON events as results arrive."""
+    content, ext = await _read_upload(file)
+    slot = execution.admission.slot()
+    await slot.__aenter__()  # reject with 503 before the response starts
+
+    async def body():
+        try:
+            async for event in _stream_events(content, ext, early_exit):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logging.exception("Streaming verification failed")
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
 
-    tmp_path = Path(f"temp{ext}")
     try:
-        tmp_path.write_bytes(content)
-        doc = DocumentFile.from_pdf(str(tmp_path)) if ext == ".pdf" else DocumentFile.from_images([str(tmp_path)])
-        extracted_text = _extract_text(ocr(doc))
-    finally:
-        pass  # keep temp for forgery check
-
-    # classify
-    prompt = (
-        "You are a strict document‑type classifier. Return **one** label from: "
-        "[Bank Statement, School Enrollment, Payslip, W‑2, 1099, Cell Phone Bill].\n\n" + extracted_text[:4000]
-    )
-    doc_type = classify_document_with_gemini(prompt)
+        return _SlotStreamingResponse(body(), slot, media_type="application/x-ndjson")
+    except BaseException:
+        await slot.__aexit__(None, None, None)
+        raise
 
-    metadata = extract_metadata(extracted_text)
-    forgery  = detect_forgery(tmp_path, ext, doc_type, metadata)
-    valid    = bool(doc_type and metadata) and not forgery["is_forged"]
 
-    tmp_path.unlink(missing_ok=True)
+@app.post("/upload/batch")
+async def handle_upload_batch(files: List[UploadFile] = File(...)):
+    """Verify many documents in one call; their pages share OCR batches."""
+    async def one(file: UploadFile) -> dict:
+        try:
+            content, ext = await _read_upload(file)
+            async with execution.admission.slot():
+                return {"filename": file.filename, **await _verify(content, ext)}
+        except HTTPException as e:
+            return {"filename": file.filename, "error": e.detail, "status_code": e.status_code}
 
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "prediction": doc_type,
-        "metadata": metadata,
-        "forgery": forgery,
-        "valid": valid,
-    })
+    return JSONResponse(await asyncio.gather(*(one(f) for f in files)))
@@ -0,0 +1,307 @@
+"""Pipeline instrumentation: Prometheus metrics, request traces and a sampling profiler.
+
+* Counters, gauges and histograms are kept in process and rendered in the
+  Prometheus text format by ``/metrics`` (no client library required).
+* ``stage(name)`` times a pipeline stage into ``docver_stage_seconds{stage=…}``;
+  with tracing switched on it also records a span for the current request
+  (returned as a ``Server-Timing`` header) and, when ``opentelemetry`` is
+  installed, opens an OpenTelemetry span.
+* ``PROFILER`` samples Python stacks of the running threads on demand and
+  returns them in collapsed ("flamegraph") format.
+
+With ``METRICS=0`` and tracing off, ``stage`` returns a shared no‑op context
+manager, so instrumented code pays one attribute lookup and a function call.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+ENABLED = os.getenv("METRICS", "1") != "0"
+_tracing = os.getenv("TRACING", "0") == "1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ─────────────────────────── metric types ────────────────────────────
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self._values: Dict[Tuple[str, ...], float] = {}
+        super().__init__(name, help, labelnames)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """A gauge read at scrape time from a callback returning ``{label values: value}``."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        self._fn: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+        super().__init__(name, help, labelnames)
+
+    def set_function(self, fn: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        self._fn = fn
+
+    def _samples(self):
+        values = self._fn() if self._fn is not None else {}
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {v}" for k, v in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key → [bucket counts…, +Inf count, sum]
+        super().__init__(name, help, labelnames)
+
+    def observe(self, value: float, **labels) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def _samples(self):
+        out = []
+        with self._lock:
+            items = [(k, list(s)) for k, s in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {series[-1]}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cumulative}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(line for m in self._metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram("docver_stage_seconds", "Wall time per pipeline stage.", ("stage",))
+DOCUMENT_PAGES = Histogram("docver_document_pages", "Pages per processed document.",
+                           buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250))
+OCR_BATCH_PAGES = Histogram("docver_ocr_batch_pages", "Pages per batched OCR forward pass.",
+                            buckets=(1, 2, 4, 8, 16, 32, 64))
+BYTES_PROCESSED = Counter("docver_bytes_processed_total", "Upload bytes accepted for verification.")
+DOCUMENTS = Counter("docver_documents_total", "Documents verified, by result‑cache outcome.", ("cache",))
+MODEL_CALLS = Counter("docver_model_calls_total", "Model invocations, by model.", ("model",))
+QUEUE_DEPTH = Gauge("docver_queue_depth", "Current depth of the internal queues.", ("queue",))
+
+# ──────────────────────────── tracing ────────────────────────────────
+
+_trace: ContextVar[Optional[list]] = ContextVar("docver_trace", default=None)
+_otel_tracer = None
+_active: _Tally = _Tally()  # stages currently in flight, tracked while tracing is on
+
+
+def tracing_enabled() -> bool:
+    return _tracing
+
+
+def active_stages() -> List[str]:
+    """Stages in flight right now (tracing only), e.g. to attribute sampled RSS to stages."""
+    return [name for name, n in list(_active.items()) if n > 0]
+
+
+def set_tracing(enabled: bool) -> None:
+    global _tracing, _otel_tracer
+    _tracing = enabled
+    if enabled and _otel_tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            _otel_tracer = False
+        else:
+            _otel_tracer = trace.get_tracer("doc_verification")
+
+
+if _tracing:
+    set_tracing(True)
+
+
+class _Stage:
+    __slots__ = ("name", "start", "span", "tracked")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.tracked = _tracing
+        self.span = _otel_tracer.start_as_current_span(self.name) if _tracing and _otel_tracer else None
+        if self.span is not None:
+            self.span.__enter__()
+        if self.tracked:
+            _active[self.name] += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.tracked:
+            _active[self.name] -= 1
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append((self.name, elapsed))
+        if self.span is not None:
+            self.span.__exit__(*exc)
+        return False
+
+
+_NULL = nullcontext()
+
+
+def stage(name: str):
+    """Context manager timing one pipeline stage (no‑op when metrics and tracing are off)."""
+    if not ENABLED and not _tracing:
+        return _NULL
+    return _Stage(name)
+
+
+def observe_stages(timings: Optional[Dict[str, float]]) -> None:
+    """Record stage timings measured elsewhere (e.g. inside a worker process)."""
+    for name, seconds in (timings or {}).items():
+        STAGE_SECONDS.observe(seconds, stage=name)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append((name, seconds))
+
+
+@contextmanager
+def request_trace():
+    """Collect the spans of the current request into the yielded list."""
+    spans: List[Tuple[str, float]] = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+
+def server_timing(spans: List[Tuple[str, float]]) -> str:
+    """Spans as a ``Server-Timing`` header value (durations in ms)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in spans)
+
+# ─────────────────────────── profiler ────────────────────────────────
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of this process's threads every ``interval_ms``.
+
+    Only the web process is sampled; work inside the CPU process pool shows up
+    as the thread waiting on its future.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: _Tally = _Tally()
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval_ms: float = 5.0, thread_id: Optional[int] = None) -> None:
+        """Start sampling every thread, or only *thread_id*."""
+        if self.running:
+            return
+        self._stacks.clear()
+        self.samples = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval_ms / 1000.0, thread_id),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return collapsed stacks (``frame;frame;… count`` per line)."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return "".join(f"{stack} {n}\n" for stack, n in self._stacks.most_common())
+
+    def _run(self, interval: float, thread_id: Optional[int]) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me or (thread_id is not None and tid != thread_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+PROFILER = SamplingProfiler()
@@ -0,0 +1,98 @@
+"""Lazy model registry.
+
+Nothing heavy is loaded at import time.  Each model is registered with a
+loader and built on first use (``get``) or by the background ``warmup`` that
+the app starts after it begins accepting connections.  ``status`` feeds the
+``/readyz`` endpoint so a new pod passes liveness immediately and only
+receives traffic once its models are warm.
+
+Models that load somewhere ``get`` cannot see, such as inside worker
+processes or behind a client's own lazy getter, are recorded with
+``mark_loaded`` on their first successful use on the serving path.  A failed
+warmup is retried with exponential backoff.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+@dataclass
+class _Slot:
+    loader: Callable[[], Any]
+    required: bool = True
+    value: Any = None
+    loaded: bool = False
+    load_s: Optional[float] = None
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._slots: Dict[str, _Slot] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], required: bool = True) -> None:
+        """Declare a model; *loader* runs at most once, on first ``get`` or during warmup."""
+        self._slots[name] = _Slot(loader, required)
+
+    def mark_loaded(self, name: str) -> None:
+        """Record that *name* is loaded and working, e.g. after it served a request."""
+        slot = self._slots.get(name)
+        if slot is not None and not slot.loaded:
+            slot.loaded, slot.error = True, None
+
+    def get(self, name: str) -> Any:
+        slot = self._slots[name]
+        if slot.loaded:
+            return slot.value
+        with slot.lock:
+            if not slot.loaded:
+                start = time.perf_counter()
+                try:
+                    slot.value = slot.loader()
+                except Exception as e:
+                    slot.error = f"{type(e).__name__}: {e}"
+                    raise
+                slot.load_s = round(time.perf_counter() - start, 3)
+                slot.loaded, slot.error = True, None
+                logging.info("Model %s loaded in %.2fs", name, slot.load_s)
+        return slot.value
+
+    def warmup(self, names: Iterable[str] | None = None, retries: int = 5,
+               backoff_s: float = 2.0, max_backoff_s: float = 60.0) -> None:
+        """Load every (or the named) model, retrying failures with exponential backoff.
+
+        Failures are logged, not raised; models still failing after *retries*
+        rounds keep their error in ``status`` and load on first use instead.
+        """
+        pending = list(names or self._slots)
+        for attempt in range(retries + 1):
+            failed = []
+            for name in pending:
+                try:
+                    self.get(name)
+                except Exception:
+                    logging.exception("Warmup of %s failed (attempt %d)", name, attempt + 1)
+                    failed.append(name)
+            if not failed or attempt == retries:
+                return
+            pending = failed
+            time.sleep(min(max_backoff_s, backoff_s * 2 ** attempt))
+
+    @property
+    def ready(self) -> bool:
+        return all(s.loaded for s in self._slots.values() if s.required)
+
+    def status(self) -> dict:
+        return {
+            name: {"loaded": s.loaded, "required": s.required, "load_s": s.load_s, "error": s.error}
+            for name, s in self._slots.items()
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,227 @@
+"""Compact, array‑backed OCR output.
+
+doctr's ``Document.export()`` materialises a nested dict of pages → blocks →
+lines → words with geometry, only for the pipeline to keep the word strings.
+`OCRResult` is built by walking the predictor's objects directly and stores
+
+* ``words``       the recognised strings, in reading order;
+* ``boxes``       ``(n, 4)`` float32 ``xmin, ymin, xmax, ymax``, relative to the page
+                  (NaN for words taken from a PDF text layer, which has no geometry);
+* ``confidence``  ``(n,)`` float32 recognition confidence (1.0 for native text);
+* ``page`` / ``line``  ``(n,)`` int32 page number and document‑wide line index.
+
+``.text`` is the same space‑joined string the pipeline always used, so
+regex extraction keeps working, while layout‑aware code (e.g. "the value to the
+right of / below *Account Number*") can query the arrays.  Results are small
+and pickle cheaply, so worker processes return them instead of doctr objects.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_STRIP = ":-–—.,;"
+MAX_GAP = 0.08  # horizontal gap (page widths) beyond which same‑line words are separate cells
+
+
+def _norm(word: str) -> str:
+    return word.strip(_STRIP).lower()
+
+
+@dataclass(eq=False)
+class OCRResult:
+    words: List[str]
+    boxes: np.ndarray = field(repr=False)
+    confidence: np.ndarray = field(repr=False)
+    page: np.ndarray = field(repr=False)
+    line: np.ndarray = field(repr=False)
+
+    # ─────────────────────────── builders ────────────────────────────
+
+    @classmethod
+    def empty(cls) -> "OCRResult":
+        return cls([], np.empty((0, 4), np.float32), np.empty(0, np.float32),
+                   np.empty(0, np.int32), np.empty(0, np.int32))
+
+    @classmethod
+    def from_page(cls, page, page_no: int = 0) -> "OCRResult":
+        """Build from one doctr ``Page`` without going through ``export()``."""
+        words, geoms, conf, lines = [], [], [], []
+        n_lines = 0
+        for block in page.blocks:
+            for ln in block.lines:
+                for w in ln.words:
+                    words.append(w.value)
+                    geoms.append(w.geometry)
+                    conf.append(w.confidence)
+                    lines.append(n_lines)
+                n_lines += 1
+        if not words:
+            return cls.empty()
+        # Straight pages give ((xmin, ymin), (xmax, ymax)); rotated ones a 4‑point polygon.
+        pts = np.asarray(geoms, dtype=np.float32).reshape(len(words), -1, 2)
+        boxes = np.concatenate([pts.min(axis=1), pts.max(axis=1)], axis=1)
+        return cls(words, boxes, np.asarray(conf, np.float32),
+                   np.full(len(words), page_no, np.int32), np.asarray(lines, np.int32))
+
+    @classmethod
+    def from_text(cls, text: str, page_no: int = 0) -> "OCRResult":
+        """Wrap native PDF text (one line, no geometry) so it composes with OCR output."""
+        words = text.split()
+        n = len(words)
+        return cls(words, np.full((n, 4), np.nan, np.float32), np.ones(n, np.float32),
+                   np.full(n, page_no, np.int32), np.zeros(n, np.int32))
+
+    @classmethod
+    def concat(cls, parts: Sequence["OCRResult"], pages: Optional[Sequence[int]] = None) -> "OCRResult":
+        """Join per‑page results in order; *pages* renumbers each part's page index."""
+        parts = list(parts)
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1 and pages is None:
+            return parts[0]
+        offsets = np.cumsum([0] + [int(p.line.max()) + 1 if len(p) else 0 for p in parts[:-1]])
+        page_arr = [np.full(len(p), pages[i], np.int32) if pages is not None else p.page
+                    for i, p in enumerate(parts)]
+        return cls(
+            [w for p in parts for w in p.words],
+            np.concatenate([p.boxes for p in parts]),
+            np.concatenate([p.confidence for p in parts]),
+            np.concatenate(page_arr),
+            np.concatenate([p.line + off for p, off in zip(parts, offsets)]).astype(np.int32),
+        )
+
+    # ──────────────────────────── views ──────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @cached_property
+    def text(self) -> str:
+        return " ".join(self.words)
+
+    @cached_property
+    def offsets(self) -> np.ndarray:
+        """Character offset of every word inside ``text``."""
+        lengths = np.fromiter((len(w) + 1 for w in self.words), np.int64, len(self.words))
+        return np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(self.words) else lengths
+
+    @cached_property
+    def _positions(self) -> Dict[str, List[int]]:
+        index: Dict[str, List[int]] = {}
+        for i, w in enumerate(self.words):
+            index.setdefault(_norm(w), []).append(i)
+        return index
+
+    def lines(self) -> List[str]:
+        """Text of each line, in order."""
+        if not len(self):
+            return []
+        cuts = np.flatnonzero(np.diff(self.line)) + 1
+        return [" ".join(self.words[a:b]) for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(self)])]
+
+    def words_at(self, start: int, end: int) -> Tuple[int, int]:
+        """Word span ``[i, j)`` covering the character range ``[start, end)`` of ``text``."""
+        i = int(np.searchsorted(self.offsets, start, side="right")) - 1
+        j = int(np.searchsorted(self.offsets, end, side="left"))
+        return max(i, 0), max(j, i + 1)
+
+    def span_text(self, i: int, j: int) -> str:
+        return " ".join(self.words[i:j])
+
+    def span_confidence(self, i: int, j: int) -> float:
+        return float(self.confidence[i:j].min()) if j > i else 0.0
+
+    # ─────────────────────────── layout ──────────────────────────────
+
+    def adjacent(self, i: int, max_gap: float = MAX_GAP) -> bool:
+        """Whether word *i* continues word ``i-1``: same line and no column‑sized gap."""
+        if i <= 0 or i >= len(self) or self.line[i] != self.line[i - 1]:
+            return False
+        gap = self.boxes[i, 0] - self.boxes[i - 1, 2]
+        return bool(np.isnan(gap) or gap <= max_gap)
+
+    def find(self, phrase: str) -> List[Tuple[int, int]]:
+        """Word spans whose words equal *phrase* (case and trailing punctuation ignored)."""
+        tokens = [_norm(t) for t in phrase.split()]
+        hits = []
+        for i in self._positions.get(tokens[0], ()):
+            j = i + len(tokens)
+            if j <= len(self) and all(_norm(self.words[i + k]) == t for k, t in enumerate(tokens[1:], 1)) \
+                    and len(set(self.line[i:j].tolist())) == 1:
+                hits.append((i, j))
+        return hits
+
+    def value_after(self, key: str, max_words: int = 8) -> Optional[Tuple[int, int]]:
+        """Word span holding the value for *key*: the words right after it on its line,
+        else the cell below it.
+
+        "Right after" stops at the first column‑sized gap; "below" means the nearest
+        following line on the same page whose horizontal extent overlaps the key, as
+        in two‑row header/value tables.
+        """
+        for i, j in self.find(key):
+            line_end = j
+            while line_end < len(self) and self.adjacent(line_end) and line_end - j < max_words:
+                line_end += 1
+            if line_end > j:
+                return j, line_end
+            below = self._below(i, j)
+            if below is not None:
+                return below
+        return None
+
+    def _below(self, i: int, j: int) -> Optional[Tuple[int, int]]:
+        key_box = self.boxes[i:j]
+        if np.isnan(key_box).any():
+            return None
+        x0, x1, bottom = key_box[:, 0].min(), key_box[:, 2].max(), key_box[:, 3].max()
+        cand = (self.page == self.page[i]) & (self.boxes[:, 1] >= bottom) \
+            & (self.boxes[:, 0] < x1) & (self.boxes[:, 2] > x0)
+        idx = np.flatnonzero(cand)
+        if not len(idx):
+            return None
+        nearest_line = self.line[idx[np.argmin(self.boxes[idx, 1])]]
+        start = int(idx[self.line[idx] == nearest_line].min())
+        end = start + 1
+        while end < len(self) and self.adjacent(end):
+            end += 1
+        return start, end
+
+    def height_outliers(self, tolerance: float = 0.35, min_words: int = 3) -> np.ndarray:
+        """Indices of words whose box height differs from their line's median by > *tolerance*.
+
+        Text pasted into a scan rarely matches the surrounding font size exactly.
+        """
+        heights = self.boxes[:, 3] - self.boxes[:, 1]
+        valid = ~np.isnan(heights)
+        out: List[np.ndarray] = []
+        if not valid.any():
+            return np.empty(0, np.int64)
+        idx = np.flatnonzero(valid)
+        lines = self.line[idx]
+        cuts = np.flatnonzero(np.diff(lines)) + 1
+        for group in np.split(idx, cuts):
+            if len(group) < min_words:
+                continue
+            h = heights[group]
+            med = np.median(h)
+            if med > 0:
+                out.append(group[np.abs(h - med) / med > tolerance])
+        return np.concatenate(out) if out else np.empty(0, np.int64)
+
+
+def from_doctr(document) -> List[OCRResult]:
+    """One `OCRResult` per page of a doctr ``Document`` (anything with ``.pages``)."""
+    return [OCRResult.from_page(p) for p in document.pages]
+
+
+def merge(text_layer: Iterable[Optional[str]], ocr_pages: Iterable[OCRResult]) -> OCRResult:
+    """Interleave native PDF text and OCR results back into page order."""
+    ocr_iter = iter(ocr_pages)
+    parts = [OCRResult.from_text(t) if t is not None else next(ocr_iter) for t in text_layer]
+    return OCRResult.concat(parts, pages=range(len(parts)))
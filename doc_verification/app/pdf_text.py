@@ -0,0 +1,69 @@
+"""Native text‑layer extraction for PDFs.
+
+Digitally generated statements already carry a perfect text layer; reading it
+with pdfium is orders of magnitude cheaper than rasterising the page and running
+detection + recognition.  Pages whose layer is missing or too sparse (scans,
+image‑only pages) come back as ``None`` so only they are sent to OCR.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+
+# Minimum non‑whitespace characters per page, and per square inch of page area,
+# for the embedded text to be trusted instead of OCR.
+MIN_CHARS: int = 32
+MIN_CHARS_PER_SQ_INCH: float = 0.5
+# Fraction of characters that must be printable (guards against broken font maps).
+MIN_PRINTABLE_RATIO: float = 0.9
+
+# Same rendering settings doctr's `DocumentFile.from_pdf` uses.
+RENDER_SCALE: float = 2.0
+
+
+def _usable(text: str, width_pt: float, height_pt: float) -> bool:
+    chars = sum(1 for c in text if not c.isspace())
+    if chars < MIN_CHARS:
+        return False
+    area_sq_in = max(width_pt * height_pt / (72.0 * 72.0), 1e-6)
+    if chars / area_sq_in < MIN_CHARS_PER_SQ_INCH:
+        return False
+    printable = sum(1 for c in text if (c.isprintable() and c != "\ufffd") or c.isspace())
+    return printable / len(text) >= MIN_PRINTABLE_RATIO
+
+
+def page_texts(data: bytes) -> List[Optional[str]]:
+    """Per‑page native text in reading order, or ``None`` where OCR is needed.
+
+    Whitespace is collapsed to single spaces so the result matches the
+    format of OCR output (`ocr_result.OCRResult.text`).
+    """
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(data)
+    try:
+        out: List[Optional[str]] = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            width, height = page.get_size()
+            out.append(" ".join(text.split()) if _usable(text, width, height) else None)
+            textpage.close()
+            page.close()
+        return out
+    finally:
+        pdf.close()
+
+
+def render_pages(data: bytes, indices: List[int]) -> List[np.ndarray]:
+    """Rasterise only the pages at *indices* to RGB arrays."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(data)
+    try:
+        # `to_pil()` normalises pdfium's native BGR(A) layout across pypdfium2 versions.
+        return [np.asarray(pdf[i].render(scale=RENDER_SCALE).to_pil().convert("RGB")) for i in indices]
+    finally:
+        pdf.close()
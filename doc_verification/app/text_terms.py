@@ -0,0 +1,18 @@
+"""Term extraction shared by the tier‑1 TF‑IDF classifier (`cascade`) and the
+few‑shot example selector (`example_selector`), so both see the same terms.
+
+Terms are lower‑cased words of two or more characters (letters first, hyphens
+allowed) and numbers of three or more digits, plus every adjacent word bigram.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+_TOKEN = re.compile(r"[a-z][a-z0-9\-]+|\d{3,}")
+
+
+def terms(text: str) -> List[str]:
+    words = _TOKEN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
@@ -0,0 +1,143 @@
+"""Functions executed inside the CPU process pool.
+
+Each worker process builds its own doctr predictor on first use, so nothing
+heavy is pickled across the process boundary except the page arrays.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import ela
+import pdf_text
+from document import UploadedDocument
+from ocr_result import from_doctr
+
+OCR_DET_ARCH = "db_resnet50"
+OCR_RECO_ARCH = "crnn_vgg16_bn"
+
+_predictor = None
+_stage_s: Dict[str, float] = {}   # detection/recognition time of the current forward pass
+
+
+class OCRBatch(list):
+    """Per‑page `OCRResult`s of one forward pass, plus its stage timings (seconds)."""
+
+    timings: Dict[str, float]
+
+
+def _time_submodule(module, stage: str) -> None:
+    """Accumulate *module*'s forward time into ``_stage_s[stage]`` via torch hooks."""
+    if not hasattr(module, "register_forward_hook"):
+        return
+    started = {}
+    module.register_forward_pre_hook(lambda m, args: started.__setitem__(stage, time.perf_counter()))
+    module.register_forward_hook(lambda m, args, out: _stage_s.__setitem__(
+        stage, _stage_s.get(stage, 0.0) + time.perf_counter() - started[stage]))
+
+
+def init_worker(n_threads: int, warm: bool = False, warm_zero_shot: bool = False) -> None:
+    """Pool initializer: cap intra‑op threads, and with *warm* load the predictor
+    (with *warm_zero_shot* also the zero‑shot NLI model).
+
+    Warming here means every worker has its model before it takes its first
+    task, however the pool distributes work.  A failed load is only logged
+    (an initializer error would break the whole pool); the worker then loads
+    on first use.
+    """
+    try:
+        import torch
+    except ImportError:  # e.g. a stub OCR predictor in offline benchmarks
+        torch = None
+    if torch is not None:
+        torch.set_num_threads(max(1, n_threads))
+    if warm:
+        try:
+            warmup()
+        except Exception:
+            logging.exception("OCR warmup failed in worker %d", os.getpid())
+    if warm_zero_shot:
+        try:
+            warmup_zero_shot()
+        except Exception:
+            logging.exception("Zero-shot warmup failed in worker %d", os.getpid())
+
+
+def _get_predictor():
+    global _predictor
+    if _predictor is None:
+        from doctr.models import ocr_predictor
+
+        _predictor = ocr_predictor(det_arch=OCR_DET_ARCH, reco_arch=OCR_RECO_ARCH, pretrained=True)
+        _time_submodule(getattr(_predictor, "det_predictor", None), "ocr_detection")
+        _time_submodule(getattr(_predictor, "reco_predictor", None), "ocr_recognition")
+    return _predictor
+
+
+def load_pages(doc: UploadedDocument, ela_max_side: Optional[int] = None
+               ) -> Tuple[List[Optional[str]], List[np.ndarray], Optional[Dict[int, ela.ELAResult]]]:
+    """Read the PDF text layer and decode only the pages that still need OCR.
+
+    With *ela_max_side* the decoded pages also get their ELA here, while they are
+    in this worker, so the forgery checks never need the page arrays shipped
+    to them.
+    """
+    pages = doc.decode()
+    results = None
+    if ela_max_side is not None:
+        results = {n: ela.analyze(p, max_side=ela_max_side) for n, p in zip(doc.ocr_indices, pages)}
+    return doc.text_layer, pages, results
+
+
+def read_text_layer(data: bytes) -> List[Optional[str]]:
+    return pdf_text.page_texts(data)
+
+
+def render_page(data: bytes, index: int) -> np.ndarray:
+    return pdf_text.render_pages(data, [index])[0]
+
+
+def render_page_ela(data: bytes, index: int, max_side: int) -> Tuple[np.ndarray, ela.ELAResult]:
+    """Render one PDF page and run ELA on it while it is still in this worker (streaming mode)."""
+    page = render_page(data, index)
+    return page, ela.analyze(page, max_side=max_side)
+
+
+def run_ocr(pages: List[np.ndarray]) -> OCRBatch:
+    """One batched forward pass over *pages*; returns one compact `OCRResult` per page.
+
+    Converting here keeps doctr's object tree inside the worker: only words and
+    a few small arrays are pickled back to the event loop.
+    """
+    predictor = _get_predictor()
+    _stage_s.clear()
+    start = time.perf_counter()
+    document = predictor(pages)
+    forward = time.perf_counter()
+    batch = OCRBatch(from_doctr(document))
+    batch.timings = {**_stage_s, "ocr_forward": forward - start,
+                     "ocr_convert": time.perf_counter() - forward}
+    return batch
+
+
+def warmup() -> int:
+    """Load the predictor and run one tiny page through it; returns this worker's pid."""
+    _get_predictor()([np.full((64, 64, 3), 255, dtype=np.uint8)])
+    return os.getpid()
+
+
+def warmup_zero_shot() -> int:
+    """Load the zero‑shot NLI model that `cascade.zero_shot_top` runs here; returns this worker's pid."""
+    import classifier
+
+    classifier.get_nli()
+    return os.getpid()
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) // 2)
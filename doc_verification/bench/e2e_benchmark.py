@@ -0,0 +1,263 @@
+"""End‑to‑end load test of the doc_verification app, fully offline.
+
+Synthetic documents (`synthetic_docs.py`) are POSTed one per request to
+``/upload/batch`` (the same `_verify` path as ``/upload/``, minus HTML
+rendering) with ``httpx`` over an in‑process ASGI transport, ``--concurrency``
+at a time, for every combination of format, page count and resolution.  The Gemini tier uses
+the stub backend with ``--llm-latency-ms`` of injected latency, and unless
+``--real-ocr`` is given OCR runs through `synthetic_docs.stub_ocr` (no doctr,
+no weights), so the suite runs on a CPU‑only box without network.
+
+Per scenario it reports p50/p95/p99 latency, docs/sec and the peak RSS of the
+process tree (workers included); per pipeline stage, latency percentiles from
+the request traces (``Server-Timing``) and the peak RSS seen while the stage
+was running.  Results are written as JSON; ``--compare`` diffs against an
+earlier run and exits non‑zero on a regression.
+
+    python doc_verification/bench/e2e_benchmark.py --docs 40 --concurrency 1 8 --out run.json
+    python doc_verification/bench/e2e_benchmark.py --docs 40 --concurrency 1 8 --compare run.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synthetic_docs  # noqa: E402
+
+# ─────────────────────────── process RSS ─────────────────────────────
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _children(pid: int) -> List[int]:
+    kids = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as fh:
+                kids.extend(int(k) for k in fh.read().split())
+    except OSError:
+        pass
+    return kids
+
+
+def tree_rss_mb() -> float:
+    """RSS of this process and all its descendants (the OCR / forgery workers)."""
+    total, todo = 0, [os.getpid()]
+    while todo:
+        pid = todo.pop()
+        total += _rss_kb(pid)
+        todo.extend(_children(pid))
+    return total / 1024
+
+
+class RSSSampler:
+    """Samples process‑tree RSS, attributing each sample to the stages in flight."""
+
+    def __init__(self, interval_s: float = 0.02):
+        import metrics
+
+        self._active = metrics.active_stages
+        self.interval_s = interval_s
+        self.peak = 0.0
+        self.by_stage: Dict[str, float] = defaultdict(float)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            rss = tree_rss_mb()
+            self.peak = max(self.peak, rss)
+            for name in self._active():
+                self.by_stage[name] = max(self.by_stage[name], rss)
+
+# ───────────────────────────── driver ────────────────────────────────
+
+
+def _pct(values: List[float]) -> dict:
+    if not values:
+        return {}
+    a = np.asarray(values) * 1000
+    return {"p50": round(float(np.percentile(a, 50)), 2), "p95": round(float(np.percentile(a, 95)), 2),
+            "p99": round(float(np.percentile(a, 99)), 2), "mean": round(float(a.mean()), 2)}
+
+
+def _parse_server_timing(header: str) -> Dict[str, float]:
+    out: Dict[str, float] = defaultdict(float)
+    for part in filter(None, (p.strip() for p in header.split(","))):
+        name, _, dur = part.partition(";dur=")
+        if dur:
+            out[name] += float(dur) / 1000
+    return out
+
+
+async def run_scenario(client, docs, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = defaultdict(list)
+    status: Dict[str, int] = defaultdict(int)
+
+    async def one(doc):
+        async with sem:
+            start = time.perf_counter()
+            r = await client.post("/upload/batch", files={"files": (doc.name + doc.ext, doc.data)})
+            elapsed = time.perf_counter() - start
+        code = r.status_code if r.status_code != 200 else r.json()[0].get("status_code", 200)
+        status[str(code)] += 1
+        if code == 200:
+            latencies.append(elapsed)
+            for name, s in _parse_server_timing(r.headers.get("server-timing", "")).items():
+                stages[name].append(s)
+
+    with RSSSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(d) for d in docs))
+        wall = time.perf_counter() - start
+
+    return {
+        "docs": len(docs),
+        "concurrency": concurrency,
+        "docs_per_s": round(len(latencies) / wall, 2),
+        "latency_ms": _pct(latencies),
+        "status": dict(status),
+        "peak_rss_mb": round(rss.peak, 1),
+        # Sub‑stages measured inside worker processes (ocr_*, forgery_*) have latency only.
+        "stages": {name: {**_pct(v), **({"peak_rss_mb": round(rss.by_stage[name], 1)}
+                                        if name in rss.by_stage else {})}
+                   for name, v in sorted(stages.items())},
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+    import main
+    import metrics
+
+    if not args.real_ocr:
+        main.ocr_batcher.predict = synthetic_docs.stub_ocr
+    metrics.set_tracing(True)
+    for handler in main.app.router.on_startup:
+        await handler()
+    if args.real_ocr:
+        await main.execution.io(main.registry.warmup)
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            warm = list(synthetic_docs.generate(2, 1, 100, "png", seed=999))
+            await run_scenario(client, warm, 1)
+            for fmt, pages, dpi in itertools.product(args.formats, args.pages, args.dpi):
+                if fmt != "pdf" and pages != args.pages[0]:
+                    continue  # images are single‑page; run them once
+                for conc in args.concurrency:
+                    # Fresh documents per run so the result cache never answers.
+                    docs = list(synthetic_docs.generate(args.docs, pages, dpi, fmt, seed=args.seed + conc))
+                    key = f"{fmt}-{docs[0].pages}p-{dpi}dpi-c{conc}"
+                    res = await run_scenario(client, docs, conc)
+                    res.update(format=fmt, pages=docs[0].pages, dpi=dpi,
+                               mean_doc_kb=round(sum(len(d.data) for d in docs) / len(docs) / 1024, 1))
+                    results[key] = res
+                    print(f"{key:28s} {res['docs_per_s']:8.2f} docs/s  p50 {res['latency_ms'].get('p50')} "
+                          f"p95 {res['latency_ms'].get('p95')} p99 {res['latency_ms'].get('p99')} ms  "
+                          f"rss {res['peak_rss_mb']} MB  {res['status']}", flush=True)
+    finally:
+        for handler in main.app.router.on_shutdown:
+            await handler()
+    return results
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> bool:
+    """Print per‑scenario deltas; return ``True`` if any scenario regressed beyond the limit."""
+    regressed = False
+    print(f"\n{'scenario':28s} {'docs/s':>18s} {'p95 ms':>20s}")
+    for key, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(key)
+        if base is None:
+            continue
+        d_tput = cur["docs_per_s"] / base["docs_per_s"] - 1 if base["docs_per_s"] else 0.0
+        d_p95 = cur["latency_ms"]["p95"] / base["latency_ms"]["p95"] - 1 if base["latency_ms"].get("p95") else 0.0
+        bad = d_tput < -max_regression or d_p95 > max_regression
+        regressed |= bad
+        print(f"{key:28s} {cur['docs_per_s']:8.2f} ({d_tput:+6.1%}) {cur['latency_ms']['p95']:10.1f} "
+              f"({d_p95:+6.1%}){'  REGRESSION' if bad else ''}")
+    return regressed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=30, help="documents per scenario")
+    ap.add_argument("--formats", nargs="+", default=["png", "pdf"], choices=["png", "jpeg", "pdf"])
+    ap.add_argument("--pages", type=int, nargs="+", default=[1, 5], help="pages per PDF")
+    ap.add_argument("--dpi", type=int, nargs="+", default=[150])
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    ap.add_argument("--llm-latency-ms", type=float, default=300.0, help="stub Gemini latency")
+    ap.add_argument("--real-ocr", action="store_true", help="use doctr instead of the stub OCR")
+    ap.add_argument("--zero-shot", action="store_true", help="enable the bart‑large‑mnli tier")
+    ap.add_argument("--cpu-workers", type=int)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path)
+    ap.add_argument("--compare", type=Path, help="baseline JSON from an earlier run")
+    ap.add_argument("--max-regression", type=float, default=0.10)
+    args = ap.parse_args()
+
+    # Must be set before the app is imported.
+    os.environ["CLASSIFIER_BACKEND"] = "stub"
+    os.environ["CLASSIFIER_STUB_LATENCY_S"] = str(args.llm_latency_ms / 1000)
+    os.environ["ZERO_SHOT"] = "1" if args.zero_shot else "0"
+    os.environ["RESULT_CACHE_DB"] = ""
+    os.environ.setdefault("MAX_QUEUE", str(max(args.concurrency) * 4))
+    os.environ.setdefault("WARMUP", "1" if args.real_ocr else "0")
+    if args.cpu_workers:
+        os.environ["CPU_WORKERS"] = str(args.cpu_workers)
+    os.chdir(APP_DIR)  # templates/ and logos/ are relative to the app
+
+    scenarios = asyncio.run(run(args))
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "scenarios": scenarios,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    if args.compare:
+        if compare(report, json.loads(args.compare.read_text()), args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
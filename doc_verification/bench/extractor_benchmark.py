@@ -0,0 +1,110 @@
+"""Scaling benchmark for `extractor.extract_metadata`.
+
+Times the single‑pass scanner against the previous one‑regex‑per‑field
+implementation as document size doubles, on two corpora:
+
+``statements``  concatenated `FEW_SHOT_EXAMPLES` pages;
+``narrative``   unpunctuated text that mentions "Address" but never a postcode,
+                the worst case for the old unbounded address pattern.
+
+A linear scanner keeps µs/KB flat across sizes.
+
+    python doc_verification/bench/extractor_benchmark.py --max-pages 256 --out extractor.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import extractor  # noqa: E402
+from llm_classifier import FEW_SHOT_EXAMPLES  # noqa: E402
+
+_LEGACY = (
+    ("Name", r"(Name|Student|Employee|Customer)\s*[:\-]?\s*([A-Z][a-z]+\s[A-Z][a-z]+)", 2),
+    ("Date", r"(Date of Issue|Date|Due Date|Enrollment Date)\s*[:\-]?\s*(\d{2}/\d{2}/\d{4}|\d{4}-\d{2}-\d{2})", 2),
+    ("ID", r"(Student ID|Account Number|Employee ID|Transaction ID|Reference Number)\s*[:\-]?\s*(\w+)", 2),
+    ("Phone", r"(Phone|Contact)\s*[:\-]?\s*(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})", 2),
+    ("Email", r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", 0),
+    ("Amount", r"(Total Due|Amount|Balance|Net Pay|Gross Pay)\s*[:\-]?\s*\$?(\d{1,3}(,\d{3})*(\.\d{2})?)", 2),
+    ("Address", r"(Address|Location)\s*[:\-]?\s*([\w\s,]+(?:\d{5}|\d{4}))", 2),
+)
+
+
+def legacy_extract(text: str) -> dict:
+    """The pre‑scanner implementation: one uncompiled ``re.search`` per field."""
+    metadata = {}
+    for name, pattern, group in _LEGACY:
+        m = re.search(pattern, text)
+        if m:
+            metadata[name] = m.group(group)
+    return metadata
+
+
+def make_document(pages: int, corpus: str) -> str:
+    if corpus == "narrative":
+        parts = ["Mailing Address on file was updated at the branch by the customer " * 6] * pages
+    else:
+        parts = [FEW_SHOT_EXAMPLES[i % len(FEW_SHOT_EXAMPLES)]["document"] for i in range(pages)]
+    # OCR output reaches the extractor as one space‑joined line.
+    return " ".join(" ".join(parts).split())
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--max-pages", type=int, default=128)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--skip-legacy-above", type=int, default=64,
+                    help="stop timing the legacy extractor beyond this many pages")
+    ap.add_argument("--batch", type=int, default=2000, help="documents for the extract_many run")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--out", type=Path)
+    args = ap.parse_args()
+
+    rows = []
+    for corpus in ("statements", "narrative"):
+        pages = 1
+        while pages <= args.max_pages:
+            text = make_document(pages, corpus)
+            kb = len(text) / 1024
+            row = {"corpus": corpus, "pages": pages, "kb": round(kb, 1)}
+            t = bench(extractor.extract_metadata, text, args.repeat)
+            row["scanner_ms"], row["scanner_us_per_kb"] = round(t * 1000, 3), round(t * 1e6 / kb, 2)
+            if pages <= args.skip_legacy_above:
+                t = bench(legacy_extract, text, args.repeat)
+                row["legacy_ms"], row["legacy_us_per_kb"] = round(t * 1000, 3), round(t * 1e6 / kb, 2)
+            rows.append(row)
+            print(json.dumps(row))
+            pages *= 2
+
+    docs = [" ".join(ex["document"].split()) for ex in FEW_SHOT_EXAMPLES] * (args.batch // len(FEW_SHOT_EXAMPLES))
+    mismatches = sum(legacy_extract(d) != extractor.extract_metadata(d) for d in docs[:len(FEW_SHOT_EXAMPLES)])
+    batch = {}
+    for workers in (1, args.workers):
+        start = time.perf_counter()
+        extractor.extract_many(docs, workers=workers)
+        batch[f"workers_{workers}_docs_per_s"] = round(len(docs) / (time.perf_counter() - start), 1)
+    print(json.dumps({"batch": batch, "few_shot_mismatches_vs_legacy": mismatches}))
+
+    if args.out:
+        args.out.write_text(json.dumps({"scaling": rows, "batch": batch,
+                                        "few_shot_mismatches_vs_legacy": mismatches}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Import‑time budget check for the doc_verification service.
+
+Imports each module in a fresh interpreter and fails (exit 1) if any takes
+longer than its budget.  Heavy models must stay behind `models.registry`, so
+these imports should only pay for FastAPI, NumPy and Pillow.
+
+    python doc_verification/bench/import_budget.py [--budget 1.0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+MODULES = ["main", "classifier", "llm_classifier", "extractor", "forgery", "workers"]
+
+
+def measure(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{out.stderr}")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed per module")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        took = measure(module)
+        ok = took <= args.budget
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'SLOW'} {module:<16} {took:6.3f}s (budget {args.budget:.1f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
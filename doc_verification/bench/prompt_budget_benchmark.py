@@ -0,0 +1,57 @@
+"""Prompt size and example selection cost as the few‑shot pool grows.
+
+Builds pools of perturbed `FEW_SHOT_EXAMPLES` variants, then for each pool
+size reports the mean/max prompt tokens per document, the time to select
+examples, and how often the top example's label matches the document's.  The
+"all examples" columns show what inlining the whole pool would cost.
+
+    python doc_verification/bench/prompt_budget_benchmark.py --pools 9 90 450 900
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import llm_classifier  # noqa: E402
+from example_selector import ExampleSelector, estimate_tokens, format_example  # noqa: E402
+from zero_shot_benchmark import synthetic_docs  # noqa: E402
+
+
+def run(pool_size: int, docs) -> dict:
+    pool = [{"document": t, "label": y} for t, y in synthetic_docs(pool_size, seed=1)]
+    start = time.perf_counter()
+    selector = ExampleSelector(pool, k=llm_classifier.FEW_SHOT_K)
+    index_ms = (time.perf_counter() - start) * 1000
+    llm_classifier._selector = selector
+
+    tokens, hits = [], 0
+    start = time.perf_counter()
+    for text, label in docs:
+        tokens.append(estimate_tokens(llm_classifier.build_few_shot_prompt(text)))
+        hits += selector.select(text)[0]["label"] == label
+    per_doc_ms = (time.perf_counter() - start) * 1000 / len(docs)
+    inline = estimate_tokens(llm_classifier.STATIC_PREFIX + "".join(format_example(ex) for ex in selector.examples))
+    return {"pool": len(selector), "index_ms": round(index_ms, 2), "prompt_ms": round(per_doc_ms, 3),
+            "prompt_tokens_mean": round(sum(tokens) / len(tokens), 1), "prompt_tokens_max": max(tokens),
+            "top_example_label_match": round(hits / len(docs), 4), "all_examples_tokens": inline}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pools", type=int, nargs="+", default=[9, 90, 450, 900])
+    parser.add_argument("--docs", type=int, default=180)
+    args = parser.parse_args()
+    docs = synthetic_docs(args.docs, seed=7)
+    for size in args.pools:
+        print(json.dumps(run(size, docs)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Synthetic documents and a stub OCR predictor for offline benchmarks.
+
+Pages are rendered with Pillow from the `FEW_SHOT_EXAMPLES` templates in
+`llm_classifier.py` (bank statements, W‑2s, payslips, utility bills, …) at a
+chosen resolution and page count, then encoded as PNG, JPEG or PDF.
+
+Every page carries a tiny marker in its top‑left corner: template index, page
+number and a per‑document serial (so the result cache never sees the same
+bytes twice unless asked to).  `stub_ocr` reads the marker back and returns
+the template's text as an `OCRResult`, spending a configurable time per
+megapixel, so the full pipeline runs without doctr or model weights.
+
+    python doc_verification/bench/synthetic_docs.py --out /tmp/docs --pages 1 3 --dpi 100 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Sequence
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from llm_classifier import FEW_SHOT_EXAMPLES  # noqa: E402
+
+PAGE_IN = (8.5, 11.0)   # US letter
+MARK = 100              # marker cell = page width / MARK, so it survives any re‑rendering scale
+STEP = 24               # marker value quantum (0‑9 per cell), wide enough to survive JPEG
+# Stub OCR cost, milliseconds per megapixel of input (≈ doctr db_resnet50 + crnn on a few cores).
+STUB_OCR_MS_PER_MPX = float(os.getenv("STUB_OCR_MS_PER_MPX", "120"))
+
+
+@dataclass
+class SyntheticDoc:
+    name: str
+    label: str
+    template: int
+    pages: int
+    dpi: int
+    fmt: str
+    data: bytes
+
+    @property
+    def ext(self) -> str:
+        return ".jpg" if self.fmt == "jpeg" else f".{self.fmt}"
+
+
+def _font(px: int):
+    try:
+        return ImageFont.load_default(size=px)
+    except TypeError:  # Pillow < 10.1: fixed‑size bitmap font
+        return ImageFont.load_default()
+
+
+def _perturb(text: str, rng: random.Random) -> str:
+    return re.sub(r"\d", lambda _: str(rng.randint(0, 9)), text)
+
+
+def _mark(img: Image.Image, template: int, page: int, serial: int) -> None:
+    draw = ImageDraw.Draw(img)
+    cell = img.width / MARK
+    values = (template, page % 10, serial % 10, (serial // 10) % 10)
+    for i, v in enumerate(values):
+        shade = v * STEP
+        draw.rectangle((int(i * cell), 0, int((i + 1) * cell) - 1, int(cell) - 1), fill=(shade, shade, shade))
+
+
+def read_mark(page: np.ndarray) -> tuple:
+    """``(template, page)`` encoded by `_mark` in an RGB page array of any scale."""
+    cell = page.shape[1] / MARK
+    y = int(cell / 2)
+    vals = [int(round(float(page[y, int((i + 0.5) * cell)].mean()) / STEP)) for i in range(2)]
+    return vals[0], vals[1]
+
+
+def render_page(template: int, page_no: int, pages: int, dpi: int, serial: int,
+                rng: random.Random) -> Image.Image:
+    w, h = int(PAGE_IN[0] * dpi), int(PAGE_IN[1] * dpi)
+    img = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(img)
+    font = _font(max(10, dpi * 11 // 72))
+    line_h = int(dpi * 11 / 72 * 1.6)
+    text = _perturb(FEW_SHOT_EXAMPLES[template]["document"], rng).strip().splitlines()
+    y = dpi // 2
+    draw.text((dpi // 2, y), f"Page {page_no + 1} of {pages}", fill="black", font=font)
+    y += 2 * line_h
+    # Fill the page with the template repeated, like a statement's transaction list.
+    while y < h - dpi // 2:
+        for line in text:
+            if y >= h - dpi // 2:
+                break
+            draw.text((dpi // 2, y), line, fill="black", font=font)
+            y += line_h
+        y += line_h
+    _mark(img, template, page_no, serial)
+    return img
+
+
+def encode(pages: Sequence[Image.Image], fmt: str, dpi: int) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "pdf":
+        pages[0].save(buf, "PDF", resolution=dpi, save_all=True, append_images=list(pages[1:]))
+    elif fmt == "jpeg":
+        pages[0].save(buf, "JPEG", quality=90)
+    else:
+        pages[0].save(buf, "PNG")
+    return buf.getvalue()
+
+
+def generate(n: int, pages: int = 1, dpi: int = 150, fmt: str = "png", seed: int = 0,
+             templates: Sequence[int] | None = None) -> Iterator[SyntheticDoc]:
+    """*n* documents cycling over *templates* (default: all); images are always one page."""
+    rng = random.Random(seed)
+    templates = list(templates if templates is not None else range(len(FEW_SHOT_EXAMPLES)))
+    n_pages = pages if fmt == "pdf" else 1
+    for serial in range(n):
+        t = templates[serial % len(templates)]
+        imgs = [render_page(t, p, n_pages, dpi, serial, rng) for p in range(n_pages)]
+        label = FEW_SHOT_EXAMPLES[t]["label"]
+        yield SyntheticDoc(f"doc{serial:05d}", label, t, n_pages, dpi, fmt, encode(imgs, fmt, dpi))
+
+
+def stub_ocr(pages: List[np.ndarray]):
+    """Drop‑in for `workers.run_ocr`: template text per page, at a doctr‑like cost."""
+    import workers
+    from ocr_result import OCRResult
+
+    start = time.perf_counter()
+    results = []
+    for page in pages:
+        template, _ = read_mark(page)
+        template = min(template, len(FEW_SHOT_EXAMPLES) - 1)
+        time.sleep(STUB_OCR_MS_PER_MPX * page.shape[0] * page.shape[1] / 1e9)
+        results.append(OCRResult.from_text(FEW_SHOT_EXAMPLES[template]["document"]))
+    batch = workers.OCRBatch(results)
+    batch.timings = {"ocr_forward": time.perf_counter() - start}
+    return batch
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("-n", type=int, default=len(FEW_SHOT_EXAMPLES))
+    ap.add_argument("--pages", type=int, nargs="+", default=[1])
+    ap.add_argument("--dpi", type=int, nargs="+", default=[150])
+    ap.add_argument("--formats", nargs="+", default=["png", "pdf"], choices=["png", "jpeg", "pdf"])
+    args = ap.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    for fmt in args.formats:
+        for pages in (args.pages if fmt == "pdf" else [1]):
+            for dpi in args.dpi:
+                for doc in generate(args.n, pages, dpi, fmt):
+                    path = args.out / f"{doc.name}_{fmt}_{pages}p_{dpi}dpi{doc.ext}"
+                    path.write_bytes(doc.data)
+                    print(path, doc.label)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Throughput/accuracy benchmark for the zero‑shot classifier.
+
+Compares the current per‑document pipeline path (`classify_text`) with the
+batched `classify_texts` API on each CPU backend, over synthetic documents
+derived from `FEW_SHOT_EXAMPLES` (numbers and line order perturbed).
+
+    python doc_verification/bench/zero_shot_benchmark.py --docs 60 --backends torch int8 onnx
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import classifier  # noqa: E402
+from llm_classifier import CANDIDATE_LABELS, FEW_SHOT_EXAMPLES  # noqa: E402
+
+
+def synthetic_docs(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        ex = FEW_SHOT_EXAMPLES[i % len(FEW_SHOT_EXAMPLES)]
+        lines = ex["document"].strip().splitlines()
+        head, rest = lines[0], lines[1:]
+        rng.shuffle(rest)
+        text = "\n".join([head] + rest)
+        text = re.sub(r"\d", lambda _: str(rng.randint(0, 9)), text)
+        docs.append((text, ex["label"]))
+    return docs
+
+
+def run(name, fn, texts, labels, reference=None):
+    fn(texts[:2])  # load model / warm caches outside the timed region
+    start = time.perf_counter()
+    preds = fn(texts)
+    elapsed = time.perf_counter() - start
+    acc = sum(p == y for p, y in zip(preds, labels)) / len(labels)
+    out = {"path": name, "docs_per_s": round(len(texts) / elapsed, 3), "seconds": round(elapsed, 3),
+           "accuracy": round(acc, 4)}
+    if reference is not None:
+        out["agreement_with_baseline"] = round(sum(a == b for a, b in zip(preds, reference)) / len(preds), 4)
+    return out, preds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=36)
+    parser.add_argument("--batch-size", type=int, default=classifier.BATCH_SIZE)
+    parser.add_argument("--max-tokens", type=int, default=classifier.MAX_TOKENS)
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8"])
+    parser.add_argument("--out", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    data = synthetic_docs(args.docs)
+    texts, labels = [t for t, _ in data], [l for _, l in data]
+
+    baseline, ref = run("classify_text (per doc)",
+                        lambda ts: [classifier.classify_text(t, labels=CANDIDATE_LABELS) for t in ts],
+                        texts, labels)
+    results = [baseline]
+    for backend in args.backends:
+        res, _ = run(f"classify_texts[{backend}]",
+                     lambda ts, b=backend: classifier.classify_texts(
+                         ts, labels=CANDIDATE_LABELS, batch_size=args.batch_size,
+                         max_tokens=args.max_tokens, backend=b),
+                     texts, labels, reference=ref)
+        res["speedup"] = round(res["docs_per_s"] / baseline["docs_per_s"], 2)
+        res["accuracy_delta"] = round(res["accuracy"] - baseline["accuracy"], 4)
+        results.append(res)
+
+    for r in results:
+        print(json.dumps(r))
+    if args.out:
+        args.out.write_text(json.dumps({"docs": args.docs, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
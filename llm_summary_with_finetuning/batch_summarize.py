@@ -0,0 +1,328 @@
+"""Bulk, asynchronous call summarization with checkpoint/resume.
+
+Memos are grouped by ``account_id`` (from the columnar memo store) and each
+account's memo set is summarized with the same prompt as `summarize_call`.
+Calls run concurrently, bounded by a concurrency cap and a token-bucket rate
+limit, and are retried with exponential backoff and jitter.
+
+Identical memo sets are summarized once. The prompt hash is the dedup key:
+accounts whose prompts match share one call, both within a run and across
+runs.
+
+Every finished account is appended to a JSONL checkpoint as soon as it
+completes. A crashed or interrupted run started again with the same
+checkpoint skips accounts already done and reuses their summaries for
+duplicate memo sets.
+
+    python batch_summarize.py --backend stub --checkpoint summaries.jsonl --concurrency 16 --rate 20
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from glossary import GlossaryIndex
+from incremental import DEFAULT_BUDGET_TOKENS, IncrementalSummarizer, WatermarkStore
+from memo_store import MemoStore
+from prompts import SUMMARY_MODEL, build_prompt, format_memos
+
+logger = logging.getLogger(__name__)
+
+SHORTCODES_CSV = "banking_call_center_shortcodes.csv"
+MEMOS_CSV = "large_call_center_memos.csv"
+
+# ─────────────────────────── backends ─────────────────────────────
+
+
+class StubBackend:
+    """Offline stand-in for Gemini: fixed latency, optional injected failures."""
+
+    def __init__(self, latency_s: float = 0.2, fail_rate: float = 0.0, seed: int = 0):
+        self.latency_s = latency_s
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+
+    async def generate(self, prompt: str) -> str:
+        await asyncio.sleep(self.latency_s)
+        if self._rng.random() < self.fail_rate:
+            raise RuntimeError("stub backend: injected failure")
+        memo = re.split(r"### (?:New )?Memos?\n", prompt)[-1].split("### Task", 1)[0].strip().splitlines()
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        return f"Call Summary:\n- {len(memo)} memo lines, latest: {memo[-1].strip() if memo else '-'} [{digest}]"
+
+
+class GeminiBackend:
+    """Vertex AI Gemini; one model instance shared by all calls."""
+
+    def __init__(self, model_name: str = SUMMARY_MODEL, project: Optional[str] = None,
+                 location: Optional[str] = None):
+        import vertexai
+        from vertexai.generative_models import GenerativeModel
+
+        if project:
+            vertexai.init(project=project, location=location)
+        self.model = GenerativeModel(model_name=model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+# ─────────────────────────── runner ───────────────────────────────
+
+
+class RateLimiter:
+    """Token bucket: at most *rate* acquisitions per second, bursts up to *burst*."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class Report:
+    accounts: int = 0
+    skipped: int = 0        # already in the checkpoint
+    deduplicated: int = 0   # answered by another account's identical memo set
+    calls: int = 0
+    retries: int = 0
+    failed: int = 0
+    wall_s: float = 0.0
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+    def as_dict(self) -> dict:
+        lat = np.asarray(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        done = self.accounts - self.skipped - self.failed
+        return {
+            "accounts": self.accounts, "skipped": self.skipped, "summarized": done,
+            "deduplicated": self.deduplicated, "calls": self.calls, "retries": self.retries,
+            "failed": self.failed, "wall_s": round(self.wall_s, 2),
+            "accounts_per_s": round(done / self.wall_s, 2) if self.wall_s else 0.0,
+            "calls_per_s": round(self.calls / self.wall_s, 2) if self.wall_s else 0.0,
+            "call_p50_ms": round(float(np.percentile(lat, 50)), 1),
+            "call_p95_ms": round(float(np.percentile(lat, 95)), 1),
+        }
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()[:32]
+
+
+def load_checkpoint(path: str) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """``(done accounts, summary by prompt key)`` from a checkpoint; a torn last line is ignored."""
+    done: Dict[str, dict] = {}
+    by_key: Dict[str, str] = {}
+    if os.path.exists(path):
+        with open(path) as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if rec.get("status") == "ok":
+                    done[rec["account_id"]] = rec
+                    by_key[rec["key"]] = rec["summary"]
+    return done, by_key
+
+
+class BatchSummarizer:
+    def __init__(self, backend, checkpoint: str, concurrency: int = 8, rate: float = 5.0,
+                 retries: int = 4, backoff_s: float = 1.0, max_backoff_s: float = 30.0,
+                 resume: bool = True, on_success: Optional[Callable[[str, str], None]] = None):
+        self.backend = backend
+        self.resume = resume
+        self.on_success = on_success
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst=max(1, concurrency))
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.report = Report()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _call(self, prompt: str) -> str:
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                self.report.calls += 1
+                text = await self.backend.generate(prompt)
+                self.report.latencies.append(time.perf_counter() - start)
+                return text
+            except Exception as exc:  # noqa: BLE001 - transient API errors are not typed consistently
+                if attempt == self.retries:
+                    raise
+                self.report.retries += 1
+                delay = min(self.max_backoff_s, self.backoff_s * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning("summary call failed (%s); retry %d in %.1fs", exc, attempt + 1, delay)
+                await asyncio.sleep(delay)
+
+    async def _summarize(self, key: str, prompt: str) -> Tuple[str, bool]:
+        """Summary for *prompt*, sharing one call among concurrent identical prompts."""
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await asyncio.shield(fut), True
+        fut = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            text = await self._call(prompt)
+        except Exception as exc:
+            fut.set_exception(exc)
+            fut.exception()  # mark retrieved; waiters re-raise it
+            del self._inflight[key]
+            raise
+        fut.set_result(text)
+        return text, False
+
+    async def run(self, items: AsyncIterator[Tuple[str, str]] | Iterable[Tuple[str, str]]) -> Report:
+        """Summarize ``(account_id, prompt)`` items, appending results to the checkpoint."""
+        done, by_key = load_checkpoint(self.checkpoint) if self.resume else ({}, {})
+        for key, summary in by_key.items():
+            fut = asyncio.get_running_loop().create_future()
+            fut.set_result(summary)
+            self._inflight[key] = fut
+        sem = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+
+        with open(self.checkpoint, "a") as out:
+            def write(rec: dict) -> None:
+                out.write(json.dumps(rec) + "\n")
+                out.flush()
+
+            async def one(account_id: str, prompt: str) -> None:
+                key = prompt_key(prompt)
+                t0 = time.perf_counter()
+                try:
+                    summary, shared = await self._summarize(key, prompt)
+                except Exception as exc:  # noqa: BLE001
+                    self.report.failed += 1
+                    write({"account_id": account_id, "key": key, "status": "error", "error": str(exc)})
+                else:
+                    self.report.deduplicated += shared
+                    if self.on_success is not None:
+                        self.on_success(account_id, summary)
+                    write({"account_id": account_id, "key": key, "status": "ok", "summary": summary,
+                           "shared": shared, "elapsed_s": round(time.perf_counter() - t0, 3)})
+                finally:
+                    sem.release()
+
+            tasks = set()
+            async for account_id, prompt in _aiter(items):
+                self.report.accounts += 1
+                if account_id in done:
+                    self.report.skipped += 1
+                    continue
+                await sem.acquire()  # bounds both calls in flight and prompts held in memory
+                task = asyncio.create_task(one(account_id, prompt))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        self.report.wall_s = time.perf_counter() - start
+        return self.report
+
+
+async def _aiter(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+# ─────────────────────────── sources ──────────────────────────────
+
+
+def account_prompts(store: MemoStore, glossary: GlossaryIndex,
+                    limit: Optional[int] = None) -> Iterable[Tuple[str, str]]:
+    """``(account_id, prompt)`` for every account in the store, in account order."""
+    for n, (account_id, memos) in enumerate(store.iter_accounts()):
+        if limit is not None and n >= limit:
+            return
+        memo_text = format_memos(memos)
+        yield account_id, build_prompt(memo_text, glossary.describe(memo_text))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--memos", default=MEMOS_CSV)
+    ap.add_argument("--glossary", default=SHORTCODES_CSV)
+    ap.add_argument("--checkpoint", default="summaries.jsonl")
+    ap.add_argument("--backend", choices=["gemini", "stub"], default="gemini")
+    ap.add_argument("--model", default=SUMMARY_MODEL)
+    ap.add_argument("--project")
+    ap.add_argument("--location", default="us-central1")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=5.0, help="max calls per second (0 = unlimited)")
+    ap.add_argument("--retries", type=int, default=4)
+    ap.add_argument("--limit", type=int, help="only the first N accounts")
+    ap.add_argument("--stub-latency-ms", type=float, default=200.0)
+    ap.add_argument("--stub-fail-rate", type=float, default=0.0)
+    ap.add_argument("--incremental", action="store_true",
+                    help="send the previous summary plus memos after each account's watermark")
+    ap.add_argument("--watermarks", default="summaries.db", help="summary/watermark store for --incremental")
+    ap.add_argument("--budget-tokens", type=int, default=DEFAULT_BUDGET_TOKENS)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    if args.backend == "stub":
+        backend = StubBackend(args.stub_latency_ms / 1000, args.stub_fail_rate)
+    else:
+        backend = GeminiBackend(args.model, args.project, args.location)
+    store = MemoStore(os.path.splitext(args.memos)[0] + ".store")
+    store.ingest_csv(args.memos)
+    glossary = GlossaryIndex(args.glossary)
+    if not args.incremental:
+        runner = BatchSummarizer(backend, args.checkpoint, args.concurrency, args.rate, args.retries)
+        report = asyncio.run(runner.run(account_prompts(store, glossary, args.limit)))
+        print(json.dumps(report.as_dict(), indent=2))
+        return
+
+    # Watermarks already record what is done, so the checkpoint is only an output log here.
+    inc = IncrementalSummarizer(store, glossary, WatermarkStore(args.watermarks), args.budget_tokens)
+    plans: Dict[str, object] = {}
+    tokens: List[int] = []
+
+    def items():
+        for n, plan in enumerate(inc.iter_plans()):
+            if args.limit is not None and n >= args.limit:
+                return
+            plans[plan.account_id] = plan
+            tokens.append(plan.prompt_tokens)
+            yield plan.account_id, plan.prompt
+
+    runner = BatchSummarizer(backend, args.checkpoint, args.concurrency, args.rate, args.retries, resume=False,
+                             on_success=lambda account_id, summary: inc.commit(plans.pop(account_id), summary))
+    report = asyncio.run(runner.run(items())).as_dict()
+    report["prompt_tokens_mean"] = round(float(np.mean(tokens)), 1) if tokens else 0.0
+    report["prompt_tokens_max"] = max(tokens, default=0)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Columnar memo store vs. the pandas CSV path, on synthetic memo histories.
+
+For each size it writes a memo CSV shaped like ``large_call_center_memos.csv``
+(about ten memos per account), then measures
+
+* pandas:  ``read_csv`` + boolean ``account_id`` filter, i.e. the old
+  ``provide_account_activity`` (cost per call);
+* store:   one-off ingest, cold open, per-account lookups (to a DataFrame and the
+  raw index range), a one-month date-range query and size on disk.
+
+    python llm_summary_with_finetuning/bench/memo_store_benchmark.py --rows 1000000 10000000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from memo_store import MemoStore  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_CSV = os.path.join(HERE, "..", "large_call_center_memos.csv")
+
+
+def write_csv(path: str, rows: int, seed: int = 0, chunk: int = 1_000_000) -> None:
+    sample = pd.read_csv(SAMPLE_CSV)
+    kinds = sample[["Shortcode", "Intent"]].drop_duplicates().to_numpy()
+    rng = np.random.default_rng(seed)
+    n_accounts = max(1, rows // 10)
+    accounts = np.array([f"{a:08x}-{b:04x}-4{c:03x}-a{d:03x}-{e:012x}" for a, b, c, d, e in zip(
+        rng.integers(0, 2**32, n_accounts), rng.integers(0, 2**16, n_accounts), rng.integers(0, 2**12, n_accounts),
+        rng.integers(0, 2**12, n_accounts), rng.integers(0, 2**48, n_accounts))])
+    start = np.datetime64("2023-01-01")
+    for i in range(0, rows, chunk):
+        n = min(chunk, rows - i)
+        kind = kinds[rng.integers(0, len(kinds), n)]
+        dates = (start + rng.integers(0, 730, n).astype("timedelta64[D]")).astype(str)
+        reps = np.char.add("REP", rng.integers(100, 1000, n).astype(str))
+        df = pd.DataFrame({
+            "Memo ID": np.arange(i, i + n),
+            "account_id": accounts[rng.integers(0, n_accounts, n)],
+            "Date": dates,
+            "Shortcode": kind[:, 0],
+        })
+        df["Memo"] = df["Date"] + " | " + df["Shortcode"] + " | Rep: " + reps
+        df["Rep ID"] = reps
+        df["Sentiment"] = np.array(["Positive", "Neutral", "Negative"])[rng.integers(0, 3, n)]
+        df["Channel"] = np.array(["Chat", "Email", "Voice"])[rng.integers(0, 3, n)]
+        df["Intent"] = kind[:, 1]
+        df.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+
+def _ms(values) -> str:
+    a = np.asarray(values) * 1000
+    return f"p50 {np.percentile(a, 50):.3f} ms  p99 {np.percentile(a, 99):.3f} ms"
+
+
+def _du(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(path) for f in fs) / 2**20
+
+
+def run(rows: int, lookups: int, workdir: str) -> None:
+    csv_path = os.path.join(workdir, f"memos_{rows}.csv")
+    store_dir = os.path.join(workdir, f"memos_{rows}.store")
+    print(f"\n── {rows:,} rows ──")
+    t = time.perf_counter()
+    write_csv(csv_path, rows)
+    print(f"generate csv          {time.perf_counter() - t:8.2f} s   {os.path.getsize(csv_path) / 2**20:.0f} MB")
+
+    t = time.perf_counter()
+    df = pd.read_csv(csv_path)
+    read_s = time.perf_counter() - t
+    ids = df["account_id"].drop_duplicates().sample(min(lookups, df["account_id"].nunique()), random_state=0).tolist()
+    filt = []
+    for account_id in ids[:20]:
+        t = time.perf_counter()
+        df[df["account_id"] == account_id]
+        filt.append(time.perf_counter() - t)
+    print(f"pandas read_csv       {read_s:8.2f} s   (paid on every provide_account_activity call)")
+    print(f"pandas filter         {_ms(filt)}")
+    del df
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    t = time.perf_counter()
+    MemoStore(store_dir).ingest_csv(csv_path)
+    print(f"store ingest          {time.perf_counter() - t:8.2f} s   {_du(store_dir):.0f} MB on disk")
+    t = time.perf_counter()
+    store = MemoStore(store_dir)
+    print(f"store open            {(time.perf_counter() - t) * 1000:8.2f} ms  ({len(store._segments)} segments)")
+
+    frame, raw = [], []
+    for account_id in ids:
+        t = time.perf_counter()
+        store.account(account_id)
+        frame.append(time.perf_counter() - t)
+        key = account_id.encode()
+        t = time.perf_counter()
+        for seg in store._segments:
+            seg.rows_for(key)
+        raw.append(time.perf_counter() - t)
+    print(f"store account → df    {_ms(frame)}")
+    print(f"store account index   {_ms(raw)}")
+    t = time.perf_counter()
+    n = len(store.date_range("2024-03-01", "2024-03-31", Intent="Reset PIN"))
+    print(f"store month + intent  {(time.perf_counter() - t) * 1000:8.2f} ms  ({n:,} rows)")
+    store.compact()
+    frame = []
+    for account_id in ids:
+        t = time.perf_counter()
+        store.account(account_id)
+        frame.append(time.perf_counter() - t)
+    print(f"compacted account     {_ms(frame)}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--lookups", type=int, default=1000)
+    ap.add_argument("--workdir", help="where to write the CSVs and stores (default: a temp dir)")
+    ap.add_argument("--keep", action="store_true", help="keep the generated files")
+    args = ap.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="memo_store_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        for rows in args.rows:
+            run(rows, args.lookups, workdir)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Persistent embedding store with local top-k cosine search.
+
+Vectors are keyed by a hash of the provider name and the text, so a row whose
+text has not changed is never sent to the embedding API again.  New texts are
+embedded in chunks of ``provider.batch_size`` and appended to a contiguous
+float32 file that is memory-mapped for reads::
+
+    <directory>/meta.json      provider name and dimension
+    <directory>/vectors.f32    (rows, dim) float32, L2-normalised
+    <directory>/hashes.txt     content hash of each row, in row order
+    <directory>/<name>.json    a collection: {id: content hash}
+
+Collections ("glossary", "memos", ...) map caller ids to rows. `search` is one
+matrix-vector product over the collection's rows, followed by
+``argpartition``, which is fast enough for interactive lookups of unknown
+abbreviations or similar past memos.
+
+Providers implement ``name``, ``dim``, ``batch_size`` and
+``embed(texts) -> (n, dim) array``. `VertexEmbedder` calls
+``text-embedding-005``. `HashingEmbedder` is a deterministic local embedder for
+offline runs and tests.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def content_hash(provider: str, text: str) -> str:
+    return hashlib.blake2b(f"{provider}\x00{text}".encode(), digest_size=16).hexdigest()
+
+
+def _normalise(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+# ─────────────────────────── providers ────────────────────────────
+
+
+class HashingEmbedder:
+    """Deterministic bag of hashed words and character n-grams; no network or model."""
+
+    batch_size = 10_000
+
+    def __init__(self, dim: int = 256, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+        self.name = f"hashing-{dim}-{ngram}"
+
+    def _features(self, text: str) -> Iterable[str]:
+        text = text.lower()
+        for word in re.findall(r"\w+", text):
+            yield "w:" + word
+            padded = f" {word} "
+            for i in range(max(1, len(padded) - self.ngram + 1)):
+                yield "c:" + padded[i:i + self.ngram]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), np.float32)
+        for row, text in enumerate(texts):
+            for feat in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feat.encode(), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        return out
+
+
+class VertexEmbedder:
+    """Vertex AI text embeddings (``vertexai`` is imported on first use)."""
+
+    def __init__(self, model_name: str = "text-embedding-005", dim: int = 768, batch_size: int = 100):
+        self.name = model_name
+        self.dim = dim
+        self.batch_size = batch_size
+        self._model = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        from vertexai.language_models import TextEmbeddingInput, TextEmbeddingModel
+
+        if self._model is None:
+            self._model = TextEmbeddingModel.from_pretrained(self.name)
+        embeddings = self._model.get_embeddings([TextEmbeddingInput(text=t) for t in texts])
+        return np.asarray([e.values for e in embeddings], dtype=np.float32)
+
+
+def default_provider():
+    """``EMBEDDING_PROVIDER=hashing`` selects the local embedder; anything else uses Vertex AI."""
+    if os.getenv("EMBEDDING_PROVIDER", "vertex") == "hashing":
+        return HashingEmbedder()
+    return VertexEmbedder(os.getenv("EMBEDDING_MODEL", "text-embedding-005"))
+
+# ───────────────────────────── store ──────────────────────────────
+
+
+class EmbeddingStore:
+    def __init__(self, directory: str, provider=None):
+        self.directory = directory
+        self.provider = provider if provider is not None else default_provider()
+        self.api_calls = 0
+        self.embedded = 0   # texts sent to the provider by this instance
+        self._lock = threading.Lock()
+        self._collections: Dict[str, Dict[str, str]] = {}
+        self._views: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._check_meta()
+        self._load()
+
+    # ──────────────────────────── files ───────────────────────────────
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _check_meta(self) -> None:
+        meta = {"provider": self.provider.name, "dim": self.provider.dim}
+        path = self._path("meta.json")
+        if os.path.exists(path):
+            with open(path) as fh:
+                stored = json.load(fh)
+            if stored != meta:
+                raise ValueError(f"{self.directory} holds {stored} embeddings, not {meta}")
+        else:
+            with open(path, "w") as fh:
+                json.dump(meta, fh)
+
+    def _load(self) -> None:
+        hashes: List[str] = []
+        if os.path.exists(self._path("hashes.txt")):
+            with open(self._path("hashes.txt")) as fh:
+                hashes = fh.read().split()
+        size = os.path.getsize(self._path("vectors.f32")) if os.path.exists(self._path("vectors.f32")) else 0
+        # Vectors are written before their hashes; a torn append leaves extra vectors, never extra hashes.
+        rows = min(len(hashes), size // (4 * self.provider.dim))
+        self._rows = {h: i for i, h in enumerate(hashes[:rows])}
+        self._n = rows
+        self._map()
+
+    def _map(self) -> None:
+        if self._n:
+            self.matrix = np.memmap(self._path("vectors.f32"), np.float32, "r", shape=(self._n, self.provider.dim))
+        else:
+            self.matrix = np.empty((0, self.provider.dim), np.float32)
+        self._views.clear()
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ─────────────────────────── writing ──────────────────────────────
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """``(len(texts), dim)`` unit vectors, calling the provider only for unseen texts."""
+        rows = self.rows(texts)
+        return np.asarray(self.matrix[rows])
+
+    def rows(self, texts: Sequence[str]) -> np.ndarray:
+        """Row index of each text, embedding and appending the missing ones first."""
+        keys = [content_hash(self.provider.name, t) for t in texts]
+        with self._lock:
+            missing = list(dict.fromkeys(k for k in keys if k not in self._rows))
+            if missing:
+                by_key = dict(zip(keys, texts))
+                self._append(missing, [by_key[k] for k in missing])
+            return np.fromiter((self._rows[k] for k in keys), np.int64, len(keys))
+
+    def _append(self, keys: List[str], texts: List[str]) -> None:
+        step = self.provider.batch_size
+        with open(self._path("vectors.f32"), "r+b" if os.path.exists(self._path("vectors.f32")) else "wb") as vec:
+            vec.truncate(self._n * 4 * self.provider.dim)  # drop any torn tail
+            vec.seek(0, os.SEEK_END)
+            with open(self._path("hashes.txt"), "a") as idx:
+                for i in range(0, len(texts), step):
+                    chunk = self.provider.embed(texts[i:i + step])
+                    self.api_calls += 1
+                    self.embedded += len(chunk)
+                    vec.write(_normalise(chunk).tobytes())
+                    vec.flush()
+                    idx.write("".join(k + "\n" for k in keys[i:i + step]))
+                    idx.flush()
+                    for k in keys[i:i + step]:
+                        self._rows[k] = self._n
+                        self._n += 1
+        self._map()
+
+    # ───────────────────────── collections ────────────────────────────
+
+    def collection(self, name: str) -> Dict[str, str]:
+        if name not in self._collections:
+            path = self._path(f"{name}.json")
+            if os.path.exists(path):
+                with open(path) as fh:
+                    self._collections[name] = json.load(fh)
+            else:
+                self._collections[name] = {}
+        return self._collections[name]
+
+    def upsert(self, name: str, ids: Sequence, texts: Sequence[str], prune: bool = False) -> int:
+        """Point *ids* in collection *name* at *texts*; returns how many texts were newly embedded.
+
+        With *prune* the collection becomes exactly *ids*, dropping any others. The
+        collection file is only rewritten (and its search view rebuilt) if it changed.
+        """
+        before = self.embedded
+        self.rows(texts)
+        coll = self.collection(name)
+        entries = ((str(i), content_hash(self.provider.name, t)) for i, t in zip(ids, texts))
+        updated = dict(entries) if prune else {**coll, **dict(entries)}
+        if updated != coll:
+            with open(self._path(f"{name}.json.tmp"), "w") as fh:
+                json.dump(updated, fh)
+            os.replace(self._path(f"{name}.json.tmp"), self._path(f"{name}.json"))
+            self._collections[name] = updated
+            self._views.pop(name, None)
+        return self.embedded - before
+
+    def vectors(self, name: str) -> Tuple[List[str], np.ndarray]:
+        """Ids and a contiguous copy of their vectors for collection *name* (cached until changed)."""
+        view = self._views.get(name)
+        if view is None:
+            coll = self.collection(name)
+            ids = list(coll)
+            rows = np.fromiter((self._rows[coll[i]] for i in ids), np.int64, len(ids))
+            view = self._views[name] = (ids, np.ascontiguousarray(self.matrix[rows]))
+        return view
+
+    # ─────────────────────────── search ───────────────────────────────
+
+    def _queries(self, texts: List[str]) -> np.ndarray:
+        """Vectors for query texts: stored rows where known, else embedded without being stored."""
+        keys = [content_hash(self.provider.name, t) for t in texts]
+        out = np.empty((len(texts), self.provider.dim), np.float32)
+        new = [i for i, k in enumerate(keys) if k not in self._rows]
+        known = [i for i, k in enumerate(keys) if k in self._rows]
+        if known:
+            out[known] = self.matrix[[self._rows[keys[i]] for i in known]]
+        for i in range(0, len(new), self.provider.batch_size):
+            chunk = new[i:i + self.provider.batch_size]
+            self.api_calls += 1
+            out[chunk] = _normalise(self.provider.embed([texts[j] for j in chunk]))
+        return out
+
+    def search(self, name: str, query, k: int = 5) -> List[Tuple[str, float]]:
+        """Top-*k* ``(id, cosine)`` in collection *name* for a query text or vector."""
+        return self.search_many(name, [query] if isinstance(query, str) else np.atleast_2d(query), k)[0]
+
+    def search_many(self, name: str, queries, k: int = 5) -> List[List[Tuple[str, float]]]:
+        """`search` for several query texts (or an ``(m, dim)`` array) at once."""
+        ids, matrix = self.vectors(name)
+        if not ids:
+            return [[] for _ in range(len(queries))]
+        q = self._queries(list(queries)) if len(queries) and isinstance(queries[0], str) else _normalise(queries)
+        scores = q @ matrix.T
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, cand in zip(scores, top):
+            order = cand[np.argsort(-row[cand])]
+            results.append([(ids[i], float(row[i])) for i in order])
+        return results
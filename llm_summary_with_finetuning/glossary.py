@@ -0,0 +1,204 @@
+"""Shortcode glossary index for call memos.
+
+The glossary CSV is read once into an Aho-Corasick automaton built from every
+shortcode, so all codes in a memo, single- and multi-word alike ("DC",
+"PIN RST", "CLOSE ACCT"), are found in one linear pass. A match only counts
+on word boundaries. Overlapping candidates resolve leftmost-longest, so
+"CLOSE ACCT" wins over the "ACCT" inside it.
+
+The file's modification time is checked at most every ``check_s`` seconds, and
+the index is rebuilt when it changes.
+"""
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+# Upper-case tokens that look like shortcodes; used to report codes missing from the glossary.
+CODES_PATTERN = r"\b[A-Z]{3,6}\b"
+NOT_FOUND = "No description found"
+
+
+@dataclass(frozen=True)
+class GlossaryEntry:
+    shortcode: str
+    full_form: str
+    description: str
+
+
+@dataclass(frozen=True)
+class GlossaryMatch:
+    shortcode: str
+    start: int
+    end: int
+    entry: Optional[GlossaryEntry]  # None for an unknown code
+
+    @property
+    def description(self) -> str:
+        return self.entry.description if self.entry else NOT_FOUND
+
+
+class _Automaton:
+    """Character-level Aho-Corasick automaton over a fixed set of patterns."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]   # pattern lengths ending at each state
+        for p in patterns:
+            self._add(p)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        if len(pattern) not in self.out[state]:
+            self.out[state].append(len(pattern))
+
+    def _link(self) -> None:
+        queue = list(self.goto[0].values())
+        for state in queue:  # breadth-first; the list grows as we go
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Every ``(start, end)`` of every pattern occurrence, overlapping included."""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length in out[state]:
+                yield i + 1 - length, i + 1
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class GlossaryIndex:
+    def __init__(self, path: str, check_s: float = 2.0):
+        self.path = path
+        self.check_s = check_s
+        self.version = 0
+        # (entries, automaton) swapped as one tuple so readers always see a consistent pair.
+        self._snapshot: Tuple[Dict[str, GlossaryEntry], Optional[_Automaton]] = ({}, None)
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+
+    # ──────────────────────────── loading ─────────────────────────────
+
+    def reload(self) -> bool:
+        """Rebuild the index if the CSV changed on disk.  Returns ``True`` if it did."""
+        with self._lock:
+            self._checked = time.monotonic()
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self._stamp:
+                return False
+            df = pd.read_csv(self.path, dtype=str).fillna("")
+            entries: Dict[str, GlossaryEntry] = {}
+            for code, full, desc in zip(df["Shortcode"], df["FullForm"], df["Description"]):
+                code = " ".join(code.split())
+                if code and code not in entries:  # first definition wins, as before
+                    entries[code] = GlossaryEntry(code, full, desc)
+            self._snapshot = (entries, _Automaton(entries))
+            self._stamp = stamp
+            self.version += 1
+            return True
+
+    def maybe_reload(self) -> None:
+        if time.monotonic() - self._checked >= self.check_s:
+            self.reload()
+
+    @property
+    def entries(self) -> Dict[str, GlossaryEntry]:
+        self.maybe_reload()
+        return self._snapshot[0]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, code: str) -> Optional[GlossaryEntry]:
+        return self.entries.get(code)
+
+    # ──────────────────────────── matching ────────────────────────────
+
+    def find(self, text: str, overlapping: bool = False, unknown: bool = False) -> List[GlossaryMatch]:
+        """Glossary codes in *text*, in order.
+
+        Args:
+            overlapping: Also return codes nested in a longer match ("ACCT" in "CLOSE ACCT").
+            unknown: Also return code-like tokens (`CODES_PATTERN`) that are not in the
+                glossary, with ``entry=None``.
+        """
+        self.maybe_reload()
+        entries, automaton = self._snapshot
+        if automaton is None:
+            return []
+        n = len(text)
+        hits = [(s, e) for s, e in automaton.iter(text)
+                if (s == 0 or not _is_word(text[s - 1])) and (e == n or not _is_word(text[e]))]
+        hits.sort(key=lambda h: (h[0], h[0] - h[1]))  # leftmost, then longest
+        matches, covered_to = [], -1
+        for s, e in hits:
+            if overlapping or s >= covered_to:
+                matches.append(GlossaryMatch(text[s:e], s, e, entries[text[s:e]]))
+                covered_to = max(covered_to, e)
+        if unknown:
+            known = [(m.start, m.end) for m in matches]
+            for m in re.finditer(CODES_PATTERN, text):
+                if not any(s <= m.start() < e for s, e in known):
+                    matches.append(GlossaryMatch(m.group(0), m.start(), m.end(), None))
+            matches.sort(key=lambda m: m.start)
+        return matches
+
+    def describe(self, text: str) -> Dict[str, str]:
+        """``{code: description}`` for every code in *text*; unknown codes map to `NOT_FOUND`."""
+        return {m.shortcode: m.description for m in self.find(text, unknown=True)}
+
+    # ───────────────────────────── bulk ───────────────────────────────
+
+    def annotate(self, texts: Iterable[str], unknown: bool = False) -> List[List[GlossaryMatch]]:
+        """`find` over many memos, against one consistent snapshot of the glossary."""
+        self.maybe_reload()
+        return [self.find(t, unknown=unknown) if isinstance(t, str) else [] for t in texts]
+
+    def annotate_frame(self, df: pd.DataFrame, column: str = "Memo") -> pd.DataFrame:
+        """Copy of *df* with ``Codes`` (list of shortcodes) and ``Glossary`` (code = description lines)."""
+        found = self.annotate(df[column])
+        out = df.copy()
+        out["Codes"] = [[m.shortcode for m in ms] for ms in found]
+        out["Glossary"] = ["\n".join(dict.fromkeys(f"{m.shortcode} = {m.description}" for m in ms))
+                           for ms in found]
+        return out
+
+    def annotate_csv(self, path: str, out_path: str, column: str = "Memo", chunksize: int = 100_000) -> int:
+        """Stream a memo CSV through `annotate_frame` in chunks; returns rows written."""
+        rows = 0
+        for i, chunk in enumerate(pd.read_csv(path, chunksize=chunksize)):
+            part = self.annotate_frame(chunk, column)
+            part["Codes"] = part["Codes"].str.join("|")
+            part.to_csv(out_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(part)
+        return rows
@@ -0,0 +1,155 @@
+"""Incremental per-account call summaries.
+
+The last summary of every account is kept with a date watermark, the newest
+memo date it covers, plus the ids of the memos seen on that date. A refresh
+sends the previous summary and only the memos after the watermark. An account
+with no new memos costs no model call.
+
+Every prompt is held to ``budget_tokens``. Glossary entries are sent only for
+codes that appear in the memos being sent, and when the prompt is still too
+large the oldest new memos are dropped first. The newest memo is always kept.
+Dropped memos still advance the watermark; the result reports how many were
+trimmed.
+
+The first summary of an account uses the full prompt (`prompts.build_prompt`),
+under the same budget.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from glossary import GlossaryIndex
+from memo_store import MemoStore
+from prompts import build_prompt, build_update_prompt, estimate_tokens, format_memos
+
+DEFAULT_BUDGET_TOKENS = 1500
+
+
+@dataclass
+class SummaryState:
+    account_id: str
+    summary: str
+    watermark: str           # ISO date of the newest memo covered
+    seen_ids: List[int]      # memo ids dated on the watermark day
+    memo_count: int
+    updated_at: float
+
+
+class WatermarkStore:
+    """Last summary and watermark per account, in SQLite."""
+
+    def __init__(self, path: str = "summaries.db"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (account_id TEXT PRIMARY KEY, summary TEXT, watermark TEXT,"
+            " seen_ids TEXT, memo_count INTEGER, updated_at REAL)")
+        self._db.commit()
+
+    def get(self, account_id: str) -> Optional[SummaryState]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT account_id, summary, watermark, seen_ids, memo_count, updated_at FROM summaries"
+                " WHERE account_id = ?", (account_id,)).fetchone()
+        if row is None:
+            return None
+        return SummaryState(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5])
+
+    def put(self, state: SummaryState) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                (state.account_id, state.summary, state.watermark, json.dumps(state.seen_ids),
+                 state.memo_count, state.updated_at))
+            self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+@dataclass
+class Refresh:
+    """A planned refresh: the prompt to send and the state to store once it succeeds."""
+
+    account_id: str
+    prompt: str
+    prompt_tokens: int
+    new_memos: int
+    trimmed: int
+    incremental: bool
+    memos: pd.DataFrame = field(repr=False)
+    previous: Optional[SummaryState] = field(repr=False)
+
+
+class IncrementalSummarizer:
+    def __init__(self, memos: MemoStore, glossary: GlossaryIndex, watermarks: WatermarkStore,
+                 budget_tokens: int = DEFAULT_BUDGET_TOKENS):
+        self.memos = memos
+        self.glossary = glossary
+        self.watermarks = watermarks
+        self.budget_tokens = budget_tokens
+
+    def _new_memos(self, account_id: str, previous: Optional[SummaryState]) -> pd.DataFrame:
+        if previous is None:
+            return self.memos.account(account_id)
+        df = self.memos.account(account_id, start=previous.watermark)
+        seen = set(previous.seen_ids)
+        return df[(df["Date"] > previous.watermark) | ~df["Memo ID"].isin(seen)].reset_index(drop=True)
+
+    def _prompt(self, memos: pd.DataFrame, previous: Optional[SummaryState]) -> str:
+        memo_text = format_memos(memos)
+        defs = self.glossary.describe(" ".join(memos["Memo"]))  # only codes present in the memos sent
+        if previous is None:
+            return build_prompt(memo_text, defs)
+        return build_update_prompt(previous.summary, previous.watermark, memo_text, defs)
+
+    def plan(self, account_id: str) -> Optional[Refresh]:
+        """The refresh for *account_id*, or ``None`` if nothing is new since its watermark."""
+        previous = self.watermarks.get(account_id)
+        memos = self._new_memos(account_id, previous)
+        if memos.empty:
+            return None
+        # Largest suffix of (date-ordered) memos whose prompt fits; prompt size grows with the suffix.
+        lo, hi = 0, len(memos) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if estimate_tokens(self._prompt(memos.iloc[mid:], previous)) <= self.budget_tokens:
+                hi = mid
+            else:
+                lo = mid + 1
+        prompt = self._prompt(memos.iloc[lo:], previous)
+        return Refresh(account_id, prompt, estimate_tokens(prompt), len(memos), lo, previous is not None,
+                       memos, previous)
+
+    def commit(self, refresh: Refresh, summary: str) -> SummaryState:
+        """Store *summary* and advance the watermark past every memo in *refresh*."""
+        memos, previous = refresh.memos, refresh.previous
+        watermark = str(memos["Date"].max())
+        seen = memos.loc[memos["Date"] == watermark, "Memo ID"].tolist()
+        if previous is not None and previous.watermark == watermark:
+            seen = previous.seen_ids + seen
+        state = SummaryState(refresh.account_id, summary, watermark, [int(i) for i in seen],
+                             (previous.memo_count if previous else 0) + len(memos), time.time())
+        self.watermarks.put(state)
+        return state
+
+    def refresh(self, account_id: str, generate: Callable[[str], str]) -> Optional[SummaryState]:
+        """Plan, call *generate* with the prompt and commit; ``None`` if nothing was new."""
+        plan = self.plan(account_id)
+        if plan is None:
+            return None
+        return self.commit(plan, generate(plan.prompt))
+
+    def iter_plans(self, account_ids: Optional[Iterable[str]] = None) -> Iterator[Refresh]:
+        """Refreshes due for *account_ids* (default: every account in the memo store)."""
+        for account_id in (self.memos.accounts() if account_ids is None else account_ids):
+            plan = self.plan(account_id)
+            if plan is not None:
+                yield plan
@@ -0,0 +1,259 @@
+"""Scalable training pipeline for the intent classifier.
+
+Preprocessing streams the activity log CSV in chunks of ``chunk_rows`` rows.
+Each chunk is tokenized with ``nlp.pipe``, optionally across worker processes,
+and written as one DocBin shard per split under::
+
+    <cache_dir>/<data hash>/train-00000.spacy ...
+    <cache_dir>/<data hash>/dev-00000.spacy ...
+    <cache_dir>/<data hash>/meta.json          labels, row counts
+
+The data hash covers the CSV's content and every setting that shapes the
+shards, so re-running on unchanged data skips preprocessing entirely. A shard
+directory is only published, by an atomic rename, once it is complete.
+
+Each epoch streams the training shards from disk, in shuffled order, in
+compounding batches (``batch_start`` growing to ``batch_stop``). The model is
+scored on the held-out split after every epoch, and training stops once the
+macro F-score has not improved for ``patience`` epochs. The best weights are
+the ones saved. A JSON report gives examples/sec for preprocessing and
+training, and the peak RSS.
+
+    python intent_training.py --data historical_activity_logs.csv --n-process 4
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import spacy
+from spacy.tokens import DocBin
+from spacy.training import Example
+from spacy.util import compounding, minibatch
+
+TRAINING_CSV = "historical_activity_logs.csv"
+MODEL_PATH = "intent_prediction_model"
+DOCBIN_CACHE = "docbin_cache"
+TEXT_COLUMNS = ["AgentMemo", "AccountActivity", "PreviousCallData"]
+LABEL_COLUMN = "Intent"
+
+
+@dataclass
+class TrainingConfig:
+    data_path: str = TRAINING_CSV
+    model_path: str = MODEL_PATH
+    cache_dir: str = DOCBIN_CACHE
+    text_columns: List[str] = field(default_factory=lambda: list(TEXT_COLUMNS))
+    label_column: str = LABEL_COLUMN
+    chunk_rows: int = 100_000      # CSV rows per chunk, and per shard
+    dev_fraction: float = 0.1
+    n_process: int = 1             # tokenizer worker processes
+    pipe_batch_size: int = 1000
+    batch_start: float = 4.0       # compounding batch size, examples
+    batch_stop: float = 64.0
+    batch_compound: float = 1.001
+    max_epochs: int = 20
+    patience: int = 2              # epochs without a dev improvement before stopping
+    seed: int = 42
+
+
+@dataclass
+class TrainingReport:
+    data_hash: str = ""
+    cache_hit: bool = False
+    train_examples: int = 0
+    dev_examples: int = 0
+    labels: int = 0
+    preprocess_s: float = 0.0
+    preprocess_examples_per_s: float = 0.0
+    epochs: int = 0
+    best_epoch: int = 0
+    best_dev_f: float = 0.0
+    dev_f_by_epoch: List[float] = field(default_factory=list)
+    train_s: float = 0.0
+    train_examples_per_s: float = 0.0
+    peak_rss_mb: float = 0.0
+
+    def as_dict(self) -> Dict:
+        out = asdict(self)
+        for k, v in out.items():
+            if isinstance(v, float):
+                out[k] = round(v, 4)
+        out["dev_f_by_epoch"] = [round(f, 4) for f in self.dev_f_by_epoch]
+        return out
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (Linux reports KiB, macOS bytes)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# ────────────────────────── preprocessing ─────────────────────────
+
+
+def data_hash(config: TrainingConfig) -> str:
+    """Hash of the CSV's bytes and of every setting the shards depend on."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([config.text_columns, config.label_column, config.chunk_rows,
+                         config.dev_fraction, config.seed, spacy.__version__]).encode())
+    with open(config.data_path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _chunks(config: TrainingConfig) -> Iterator[pd.DataFrame]:
+    usecols = config.text_columns + [config.label_column]
+    for chunk in pd.read_csv(config.data_path, usecols=usecols, dtype=str, chunksize=config.chunk_rows):
+        chunk = chunk[chunk[config.label_column].notna()]
+        text = chunk[config.text_columns[0]].fillna("")
+        for column in config.text_columns[1:]:
+            text = text + " " + chunk[column].fillna("")
+        yield pd.DataFrame({"text": text.str.strip(), "label": chunk[config.label_column]})
+
+
+def preprocess(config: TrainingConfig, report: TrainingReport) -> str:
+    """Tokenize the CSV into DocBin shards (or find them cached); returns the shard directory."""
+    report.data_hash = data_hash(config)
+    shard_dir = os.path.join(config.cache_dir, report.data_hash)
+    meta_path = os.path.join(shard_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        report.cache_hit = True
+        report.train_examples, report.dev_examples = meta["train"], meta["dev"]
+        report.labels = len(meta["labels"])
+        return shard_dir
+
+    start = time.perf_counter()
+    tmp_dir = shard_dir + f".tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    nlp = spacy.blank("en")  # tokenizer only
+    rng = np.random.default_rng(config.seed)
+    labels, counts = set(), {"train": 0, "dev": 0}
+    for i, chunk in enumerate(_chunks(config)):
+        is_dev = rng.random(len(chunk)) < config.dev_fraction
+        docs = nlp.pipe(chunk["text"], batch_size=config.pipe_batch_size, n_process=config.n_process)
+        shards = {"train": DocBin(), "dev": DocBin()}
+        for doc, label, dev in zip(docs, chunk["label"], is_dev):
+            doc.cats = {label: 1.0}
+            shards["dev" if dev else "train"].add(doc)
+        labels.update(chunk["label"])
+        for split, docbin in shards.items():
+            if len(docbin):
+                docbin.to_disk(os.path.join(tmp_dir, f"{split}-{i:05d}.spacy"))
+                counts[split] += len(docbin)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as fh:
+        json.dump({"labels": sorted(labels), **counts, "source": os.path.abspath(config.data_path)}, fh)
+    try:
+        os.replace(tmp_dir, shard_dir)
+    except OSError:  # published concurrently by another run; theirs is identical
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    report.preprocess_s = time.perf_counter() - start
+    report.train_examples, report.dev_examples, report.labels = counts["train"], counts["dev"], len(labels)
+    report.preprocess_examples_per_s = (counts["train"] + counts["dev"]) / max(report.preprocess_s, 1e-9)
+    return shard_dir
+
+
+def _load_labels(shard_dir: str) -> List[str]:
+    with open(os.path.join(shard_dir, "meta.json")) as fh:
+        return json.load(fh)["labels"]
+
+
+def iter_examples(nlp, shard_dir: str, split: str, labels: List[str],
+                  rng: Optional[random.Random] = None) -> Iterator[Example]:
+    """Examples of *split*, one shard in memory at a time; shuffled (shards and rows) when *rng* is given."""
+    paths = sorted(glob.glob(os.path.join(shard_dir, f"{split}-*.spacy")))
+    if rng is not None:
+        rng.shuffle(paths)
+    for path in paths:
+        docs = list(DocBin().from_disk(path).get_docs(nlp.vocab))
+        if rng is not None:
+            rng.shuffle(docs)
+        for doc in docs:
+            gold = next(iter(doc.cats))
+            yield Example.from_dict(doc, {"cats": {label: float(label == gold) for label in labels}})
+
+# ──────────────────────────── training ────────────────────────────
+
+
+def train(config: TrainingConfig) -> TrainingReport:
+    """Preprocess (or reuse cached shards), train with early stopping and save the best model."""
+    report = TrainingReport()
+    shard_dir = preprocess(config, report)
+    labels = _load_labels(shard_dir)
+
+    nlp = spacy.blank("en")
+    textcat = nlp.add_pipe("textcat", last=True)
+    for label in labels:
+        textcat.add_label(label)
+    rng = random.Random(config.seed)
+    sample = [ex for _, ex in zip(range(1000), iter_examples(nlp, shard_dir, "train", labels))]
+    optimizer = nlp.initialize(lambda: sample)
+
+    start = time.perf_counter()
+    seen, best_bytes, stale = 0, None, 0
+    sizes = compounding(config.batch_start, config.batch_stop, config.batch_compound)
+    for epoch in range(1, config.max_epochs + 1):
+        losses: Dict[str, float] = {}
+        for batch in minibatch(iter_examples(nlp, shard_dir, "train", labels, rng), size=sizes):
+            nlp.update(batch, sgd=optimizer, losses=losses)
+            seen += len(batch)
+        dev_f = nlp.evaluate(iter_examples(nlp, shard_dir, "dev", labels))["cats_score"] or 0.0
+        report.epochs = epoch
+        report.dev_f_by_epoch.append(dev_f)
+        print(f"Epoch {epoch}, Loss: {losses.get('textcat', 0.0):.4f}, Dev F: {dev_f:.4f}")
+        if best_bytes is None or dev_f > report.best_dev_f:
+            report.best_epoch, report.best_dev_f, best_bytes, stale = epoch, dev_f, nlp.to_bytes(), 0
+        else:
+            stale += 1
+            if stale >= config.patience:
+                break
+
+    report.train_s = time.perf_counter() - start
+    report.train_examples_per_s = seen / max(report.train_s, 1e-9)
+    nlp.from_bytes(best_bytes)
+    nlp.to_disk(config.model_path)
+    report.peak_rss_mb = peak_rss_mb()
+    return report
+
+
+def main() -> None:
+    defaults = TrainingConfig()
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--data", default=defaults.data_path)
+    ap.add_argument("--model", default=defaults.model_path)
+    ap.add_argument("--cache-dir", default=defaults.cache_dir)
+    ap.add_argument("--chunk-rows", type=int, default=defaults.chunk_rows)
+    ap.add_argument("--dev-fraction", type=float, default=defaults.dev_fraction)
+    ap.add_argument("--n-process", type=int, default=defaults.n_process)
+    ap.add_argument("--batch-start", type=float, default=defaults.batch_start)
+    ap.add_argument("--batch-stop", type=float, default=defaults.batch_stop)
+    ap.add_argument("--max-epochs", type=int, default=defaults.max_epochs)
+    ap.add_argument("--patience", type=int, default=defaults.patience)
+    ap.add_argument("--seed", type=int, default=defaults.seed)
+    args = ap.parse_args()
+
+    config = TrainingConfig(args.data, args.model, args.cache_dir, chunk_rows=args.chunk_rows,
+                            dev_fraction=args.dev_fraction, n_process=args.n_process,
+                            batch_start=args.batch_start, batch_stop=args.batch_stop,
+                            max_epochs=args.max_epochs, patience=args.patience, seed=args.seed)
+    report = train(config)
+    print(json.dumps(report.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
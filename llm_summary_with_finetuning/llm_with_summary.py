@@ -1,83 +1,148 @@
+import logging
+import os
 import pandas as pd
-import re
 import vertexai
 from vertexai import rag
-from vertexai.language_models import TextEmbeddingModel, TextEmbeddingInput
 from vertexai.generative_models import GenerativeModel
 
+from embeddings import EmbeddingStore, HashingEmbedder, VertexEmbedder
+from glossary import GlossaryIndex
+from incremental import IncrementalSummarizer, WatermarkStore
+from memo_store import MemoStore
+from prompts import SUMMARY_MODEL, build_prompt, format_memos
+
+logger = logging.getLogger(__name__)
+
 # Initialize Vertex AI
 PROJECT_ID = "<your-project-id>"
 REGION = "<your-region>"
 vertexai.init(project=PROJECT_ID, location=REGION)
 
 # Constants
-CODES_PATTERN = r"\b[A-Z]{3,6}\b"
 SHORTCODES_CSV = "banking_call_center_shortcodes.csv"
 MEMOS_CSV = "large_call_center_memos.csv"
+EMBEDDINGS_DIR = "embeddings"
+SUMMARIES_DB = "summaries.db"
+
+# Glossary index, loaded on first use and rebuilt when the CSV changes
+GLOSSARY = GlossaryIndex(SHORTCODES_CSV)
+
+# Embedding stores, one per model, opened on first use
+_STORES = {}
+
+# Columnar memo stores, one per memo CSV, opened on first use
+_MEMO_STORES = {}
+
+# (memo CSV, model) -> (mtime, size) of the CSV when its memos were last embedded
+_MEMO_INDEX = {}
+
+# Gemini summary model, created on first use
+_SUMMARIZER = None
+
+# Incremental summarizers (summary + watermark per account), one per memo CSV, opened on first use
+_INCREMENTAL = {}
+
+# Function to open the memo store for a CSV
+def get_memo_store(csv_path: str):
+    """Open the columnar store next to the CSV (<csv>.store/), ingesting any rows added since."""
+    if csv_path not in _MEMO_STORES:
+        _MEMO_STORES[csv_path] = MemoStore(os.path.splitext(csv_path)[0] + ".store")
+    store = _MEMO_STORES[csv_path]
+    store.ingest_csv(csv_path)
+    return store
 
 # Function to provide account activity
-def provide_account_activity(csv_path: str, account_id: str = None):
-    """Fetch account activity from the CSV file."""
-    df = pd.read_csv(csv_path)
-    return df[df['account_id'] == account_id] if account_id else df
+def provide_account_activity(csv_path: str, account_id: str = None, start_date: str = None, end_date: str = None):
+    """Fetch account activity, in date order, from the indexed memo store."""
+    store = get_memo_store(csv_path)
+    if account_id:
+        return store.account(account_id, start_date, end_date)
+    return store.date_range(start_date, end_date)
+
+# Function to open the embedding store for a model
+def get_embedding_store(model_name="text-embedding-005"):
+    """Open (once) the persistent embedding store; EMBEDDING_PROVIDER=hashing embeds locally."""
+    if model_name not in _STORES:
+        local = os.getenv("EMBEDDING_PROVIDER") == "hashing"
+        provider = HashingEmbedder() if local else VertexEmbedder(model_name)
+        _STORES[model_name] = EmbeddingStore(os.path.join(EMBEDDINGS_DIR, provider.name), provider)
+    return _STORES[model_name]
 
 # Function to embed text using Vertex AI
 def embed_text(csv_path, model_name="text-embedding-005"):
-    """Generate text embeddings for a list of texts using a specified model."""
-    df = pd.read_csv(csv_path)
-    model = TextEmbeddingModel.from_pretrained(model_name)
-    inputs = [
-        TextEmbeddingInput(
-            text=f"{row.get('Shortcode', '')} {row.get('FullForm', '')} {row.get('Description', '')}"
-        ) for _, row in df.iterrows()
-    ]
-    embeddings = model.get_embeddings(inputs)
-    df["embeddings"] = [embedding.values for embedding in embeddings]
+    """Generate text embeddings for the glossary rows, embedding only new or changed rows."""
+    df = pd.read_csv(csv_path).fillna("")
+    texts = (df["Shortcode"] + " " + df["FullForm"] + " " + df["Description"]).tolist()
+    store = get_embedding_store(model_name)
+    first = ~df["Shortcode"].duplicated()  # the first definition of a code wins, as in the glossary
+    store.upsert("glossary", df["Shortcode"][first], [t for t, f in zip(texts, first) if f])
+    df["embeddings"] = list(store.embed(texts))
     return df
 
+# Function to find glossary entries similar to an unknown abbreviation
+def find_similar_shortcodes(term: str, k: int = 3, model_name="text-embedding-005"):
+    """Top-k (Shortcode, cosine) glossary entries for a term; run embed_text first."""
+    return get_embedding_store(model_name).search("glossary", term, k)
+
+# Function to index past memos for similarity search
+def index_memos(csv_path: str = MEMOS_CSV, model_name="text-embedding-005"):
+    """Sync the "memos" collection with the memo CSV, only when the file has changed; returns texts embedded."""
+    stat = os.stat(csv_path)
+    key = (os.path.abspath(csv_path), model_name)
+    if _MEMO_INDEX.get(key) == (stat.st_mtime_ns, stat.st_size):
+        return 0
+    df = get_memo_store(csv_path).to_frame()
+    # Memos removed from the CSV are pruned; unchanged ones are not re-embedded
+    embedded = get_embedding_store(model_name).upsert("memos", df["Memo ID"], df["Memo"].astype(str).tolist(), prune=True)
+    _MEMO_INDEX[key] = (stat.st_mtime_ns, stat.st_size)
+    return embedded
+
+# Function to find similar past memos
+def find_similar_memos(memo_text: str, k: int = 5, csv_path: str = MEMOS_CSV, model_name="text-embedding-005"):
+    """Top-k (Memo ID, cosine) past memos for a memo; the memos are (re)indexed only when the CSV changes."""
+    index_memos(csv_path, model_name)
+    return get_embedding_store(model_name).search("memos", memo_text, k)
+
 # Function to look up shortcode descriptions
 def get_shortcode_description(memo_text: str):
-    """Look up the description of shortcodes from the CSV file."""
-    hits = set(re.findall(CODES_PATTERN, memo_text))
-    df = pd.read_csv(SHORTCODES_CSV)
-    defs = {}
-    for code in hits:
-        result = df[df['Shortcode'] == code]
-        defs[code] = result.iloc[0]['Description'] if not result.empty else "No description found"
-    return defs
+    """Look up the description of shortcodes (including multi-word codes) in the glossary."""
+    return GLOSSARY.describe(memo_text)
+
+# Function to get the (shared) summary model
+def get_summarizer():
+    """Create the Gemini summary model once and reuse it across calls."""
+    global _SUMMARIZER
+    if _SUMMARIZER is None:
+        _SUMMARIZER = GenerativeModel(model_name=SUMMARY_MODEL)
+    return _SUMMARIZER
 
 # Function to summarize a call
 def summarize_call(memo_text: str):
     """Generate a plain-English summary of a call using glossary definitions."""
-    defs = get_shortcode_description(memo_text)
-    glossary_block = "\n".join(f"{k} = {v}" for k, v in defs.items())
-    prompt = f"""
-### Glossary
-{glossary_block}
-
-### Memo
-{memo_text}
-
-### Task
-Write a plain-English call summary for the account representative.
-- Use the glossary meanings where applicable.
-- Keep the summary concise and under 120 words.
-- Format the summary as bullet points for clarity.
-- Include information that is missing abbreviations.
-- Predict customer call intent based on the memo.
-- Only respond with the summary and return in 3-5 bullet points.
-- Respond with "Call Summary:" and then the summary for most important topics on recent information with respective dates with call intent.
-"""
-    summarizer = GenerativeModel(model_name="gemini-2.5-pro-preview-03-25")
-    print("LLM Prompt:", prompt)
-    response = summarizer.generate_content(prompt)
-    
-    # Print the LLM response metadata
-    print("LLM Response Metadata:")
-    print(f"Response: {response}")
-    
+    prompt = build_prompt(memo_text, get_shortcode_description(memo_text))
+    logger.debug("LLM Prompt: %s", prompt)
+    response = get_summarizer().generate_content(prompt)
+    logger.debug("LLM Response: %s", response)
     return response.text
 
+# Function to open the incremental summarizer for a memo CSV
+def get_incremental_summarizer(csv_path: str = MEMOS_CSV):
+    """Open (once per CSV) the incremental summarizer, ingesting any rows added since; each CSV has its own watermarks."""
+    store = get_memo_store(csv_path)
+    if csv_path not in _INCREMENTAL:
+        db = SUMMARIES_DB if csv_path == MEMOS_CSV else os.path.splitext(csv_path)[0] + ".summaries.db"
+        _INCREMENTAL[csv_path] = IncrementalSummarizer(store, GLOSSARY, WatermarkStore(db))
+    return _INCREMENTAL[csv_path]
+
+# Function to refresh an account's summary incrementally
+def refresh_account_summary(account_id: str, csv_path: str = MEMOS_CSV):
+    """Update the stored summary with memos newer than its watermark; returns the current summary."""
+    summarizer = get_incremental_summarizer(csv_path)
+    state = summarizer.refresh(account_id, lambda prompt: get_summarizer().generate_content(prompt).text)
+    if state is None:  # nothing new since the last refresh
+        state = summarizer.watermarks.get(account_id)
+    return state.summary if state else None
+
 # Main execution
 if __name__ == "__main__":
     # Example: Provide account activity
@@ -89,7 +154,7 @@ if __name__ == "__main__":
     print(embedded_df.head())
 
     # Example: Summarize a call
-    memo_text = pd.concat([account_activity['Date'], account_activity['Memo']], axis=1).to_string(index=False)
+    memo_text = format_memos(account_activity)
     summary = summarize_call(memo_text)
     print("Call Summary:")
     print(summary)
\ No newline at end of file
@@ -0,0 +1,381 @@
+"""Columnar, account-indexed store for call memos.
+
+A memo CSV is parsed once and written as immutable segments of ``.npy``
+columns, which are memory-mapped on open, so start-up reads only a small
+manifest and no text. Each segment holds rows sorted by ``(account_id, Date)``:
+
+* ``accounts.npy``   the segment's distinct account ids, sorted (fixed-width bytes);
+* ``starts.npy``     the first row of each account (plus the row count);
+* ``date.npy``       int32 days since 1970-01-01;
+* ``memo_id.npy``    int64;
+* ``<column>.npy``   uint32 codes for the dictionary-encoded columns (`DICT_COLUMNS`),
+                     whose dictionaries are shared by all segments and kept in ``manifest.json``;
+* ``memo.bin`` / ``memo_off.npy``  UTF-8 memo text and int64 offsets.
+
+An account lookup is one binary search per segment plus a slice. Appending
+writes a new segment. `MemoStore.ingest_csv` remembers how far it has read each
+source file (always to the end of a complete record), the file's mtime and a
+hash of its first bytes and of the bytes just before that offset, so a growing
+CSV is ingested incrementally while a rewritten or truncated one is re-ingested
+from scratch. `compact` merges each source's segments into one.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Memo ID", "account_id", "Date", "Shortcode", "Memo", "Rep ID", "Sentiment", "Channel", "Intent"]
+DICT_COLUMNS = ["Shortcode", "Intent", "Channel", "Sentiment", "Rep ID"]
+NO_DATE = np.iinfo(np.int32).min
+_EPOCH = np.datetime64("1970-01-01", "D")
+_PREFIX_BYTES = 64 * 1024   # hashed at the start of a source, and just before its offset
+_BLOCK = 1 << 20
+
+
+def _file(column: str) -> str:
+    return column.lower().replace(" ", "_") + ".npy"
+
+
+def _days(dates) -> np.ndarray:
+    """ISO dates (strings, ``datetime64`` or ``None``) to int32 days since the epoch."""
+    if dates is None:
+        return None
+    parsed = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy("datetime64[D]")
+    out = (parsed - _EPOCH).astype(np.int64)
+    out[np.isnat(parsed)] = NO_DATE
+    return out.astype(np.int32)
+
+
+def _day(date) -> Optional[int]:
+    return None if date is None else int(_days([date])[0])
+
+
+def _hash_range(fh, start: int, end: int) -> str:
+    fh.seek(start)
+    return hashlib.blake2b(fh.read(end - start), digest_size=16).hexdigest()
+
+
+def _fingerprint(fh, offset: int) -> Dict[str, str]:
+    """Hashes of the first bytes of a file and of the bytes just before *offset*."""
+    return {"prefix": _hash_range(fh, 0, min(offset, _PREFIX_BYTES)),
+            "tail": _hash_range(fh, max(0, offset - _PREFIX_BYTES), offset)}
+
+
+def _record_end(fh, start: int, size: int) -> int:
+    """Offset just past the last complete CSV record in ``[start, size)``.
+
+    *start* is a record boundary. A newline ends a record only outside a quoted
+    field (an even number of quotes since *start*), since memos may span lines.
+    """
+    fh.seek(start)
+    end, quotes, pos = start, 0, start
+    while pos < size:
+        block = np.frombuffer(fh.read(min(_BLOCK, size - pos)), np.uint8)
+        parity = (quotes + np.cumsum(block == ord('"'))) % 2
+        newlines = np.flatnonzero((block == ord("\n")) & (parity == 0))
+        if len(newlines):
+            end = pos + int(newlines[-1]) + 1
+        quotes += int(np.count_nonzero(block == ord('"')))
+        pos += len(block)
+    return end
+
+
+class _Window(io.RawIOBase):
+    """Read-only view of ``[start, end)`` of an open binary file."""
+
+    def __init__(self, fh, start: int, end: int):
+        fh.seek(start)
+        self._fh, self._left = fh, end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self._fh.readinto(memoryview(buffer)[:min(len(buffer), self._left)])
+        self._left -= n
+        return n
+
+
+class _Segment:
+    def __init__(self, path: str):
+        self.path = path
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")  # noqa: E731
+        self.accounts = load("accounts.npy")
+        self.starts = load("starts.npy")
+        self.date = load("date.npy")
+        self.memo_id = load("memo_id.npy")
+        self.codes = {c: load(_file(c)) for c in DICT_COLUMNS}
+        self.memo_off = load("memo_off.npy")
+        size = os.path.getsize(os.path.join(path, "memo.bin"))
+        self.memo = np.memmap(os.path.join(path, "memo.bin"), np.uint8, "r") if size else np.empty(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def rows_for(self, account: bytes) -> Tuple[int, int]:
+        i = int(np.searchsorted(self.accounts, account))
+        if i < len(self.accounts) and self.accounts[i] == account:
+            return int(self.starts[i]), int(self.starts[i + 1])
+        return 0, 0
+
+    def account_of(self, rows: np.ndarray) -> np.ndarray:
+        return self.accounts[np.searchsorted(self.starts, rows, side="right") - 1]
+
+    def memos(self, rows: np.ndarray) -> List[str]:
+        off, data = self.memo_off, self.memo
+        return [bytes(data[off[r]:off[r + 1]]).decode() for r in rows]
+
+
+class MemoStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "manifest.json")
+        if os.path.exists(path):
+            with open(path) as fh:
+                self.manifest = json.load(fh)
+        else:
+            self.manifest = {"segments": [], "next": 0, "dicts": {c: [] for c in DICT_COLUMNS}, "sources": {}}
+        self.manifest.setdefault("owners", {})  # segment -> the source file it was ingested from
+        self._index = {c: {v: i for i, v in enumerate(vals)} for c, vals in self.manifest["dicts"].items()}
+        self._vocab: Dict[str, np.ndarray] = {}
+        self._segments = [_Segment(os.path.join(directory, s)) for s in self.manifest["segments"]]
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self._segments)
+
+    # ─────────────────────────── writing ──────────────────────────────
+
+    def _encode(self, column: str, values) -> np.ndarray:
+        index, vocab = self._index[column], self.manifest["dicts"][column]
+        codes, uniques = pd.factorize(pd.Series(values).fillna("").astype(str))
+        for v in uniques:
+            if v not in index:
+                index[v] = len(vocab)
+                vocab.append(v)
+        self._vocab.pop(column, None)
+        return np.asarray([index[v] for v in uniques], np.uint32)[codes]
+
+    def _write_segment(self, accounts: np.ndarray, date: np.ndarray, memo_id: np.ndarray,
+                       codes: Dict[str, np.ndarray], memos: Iterator[bytes], owner: Optional[str] = None) -> None:
+        """Write one segment from columns already sorted by ``(account, date)``."""
+        new = np.flatnonzero(np.r_[True, accounts[1:] != accounts[:-1]]) if len(accounts) else np.empty(0, int)
+        name = f"seg{self.manifest['next']:05d}"
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        save = lambda file, arr: np.save(os.path.join(path, file), arr)  # noqa: E731
+        save("accounts.npy", accounts[new])
+        save("starts.npy", np.append(new, len(accounts)).astype(np.int64))
+        save("date.npy", date)
+        save("memo_id.npy", memo_id)
+        for c in DICT_COLUMNS:
+            save(_file(c), codes[c])
+        offsets = np.zeros(len(accounts) + 1, np.int64)
+        with open(os.path.join(path, "memo.bin"), "wb") as fh:
+            for i, m in enumerate(memos, 1):
+                fh.write(m)
+                offsets[i] = offsets[i - 1] + len(m)
+        save("memo_off.npy", offsets)
+
+        self.manifest["segments"].append(name)
+        self.manifest["next"] += 1
+        if owner is not None:
+            self.manifest["owners"][name] = owner
+        self._segments.append(_Segment(path))
+
+    def append(self, df: pd.DataFrame, source: Optional[str] = None) -> int:
+        """Write *df* (memo CSV columns) as a new segment, owned by *source* if given; returns rows written."""
+        if df.empty:
+            return 0
+        with self._lock:
+            account, uniq = pd.factorize(df["account_id"].astype(str), sort=True)
+            date = _days(df["Date"])
+            order = np.lexsort((date, account))
+            uniq = np.array([u.encode() for u in uniq], dtype="S")
+            memos = df["Memo"].fillna("").astype(str).to_numpy()[order]
+            self._write_segment(uniq[account[order]], date[order], df["Memo ID"].to_numpy(np.int64)[order],
+                                {c: self._encode(c, df[c])[order] for c in DICT_COLUMNS},
+                                (m.encode() for m in memos), source)
+            self._save_manifest()
+            return len(df)
+
+    def _save_manifest(self) -> None:
+        tmp = os.path.join(self.directory, "manifest.json.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(self.manifest, fh)
+        os.replace(tmp, os.path.join(self.directory, "manifest.json"))
+
+    def _drop(self, names: List[str]) -> None:
+        """Unlink segments *names*; the caller saves the manifest, then calls `_remove`."""
+        self.manifest["segments"] = [n for n in self.manifest["segments"] if n not in names]
+        self._segments = [s for s in self._segments if os.path.basename(s.path) not in names]
+        for name in names:
+            self.manifest["owners"].pop(name, None)
+
+    def _remove(self, names: List[str]) -> None:
+        for name in names:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def ingest_csv(self, csv_path: str, chunksize: int = 1_000_000) -> int:
+        """Ingest the complete records of *csv_path* not read before, one segment per chunk; returns rows added.
+
+        A file that is shorter than the recorded offset, or whose bytes before it
+        changed, was rewritten: the rows ingested from it are dropped and it is read
+        again from the start. A trailing partial record is left for the next call.
+        """
+        key = os.path.abspath(csv_path)
+        source = self.manifest["sources"].get(key)
+        stat = os.stat(csv_path)
+        if isinstance(source, dict) and (source["mtime_ns"], source["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return 0
+        rows, dropped = 0, []
+        with open(csv_path, "rb") as fh:
+            offset = 0
+            if (isinstance(source, dict) and source["offset"] <= stat.st_size
+                    and _fingerprint(fh, source["offset"]) == source["fingerprint"]):
+                offset = source["offset"]
+            elif source is not None:
+                with self._lock:
+                    # Stores written before segments had owners hold one CSV: drop every unowned segment
+                    owned = key if isinstance(source, dict) else None
+                    dropped = [n for n in self.manifest["segments"] if self.manifest["owners"].get(n) == owned]
+                    self._drop(dropped)
+            end = _record_end(fh, offset, stat.st_size)
+            if end > offset:
+                window = io.BufferedReader(_Window(fh, offset, end))
+                if offset:
+                    reader = pd.read_csv(window, header=None, names=COLUMNS, dtype=str, chunksize=chunksize)
+                else:
+                    reader = pd.read_csv(window, dtype=str, chunksize=chunksize)
+                for chunk in reader:
+                    chunk["Memo ID"] = pd.to_numeric(chunk["Memo ID"])
+                    rows += self.append(chunk, key)
+            self.manifest["sources"][key] = {"offset": end, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                             "fingerprint": _fingerprint(fh, end)}
+        self._save_manifest()
+        self._remove(dropped)
+        return rows
+
+    def compact(self) -> None:
+        """Merge each source's segments into one (after many small appends).
+
+        Segments are grouped by the file they came from, so `ingest_csv` can still
+        drop one source's rows when that file is rewritten.
+        """
+        groups: Dict[Optional[str], List[str]] = {}
+        for name in self.manifest["segments"]:
+            groups.setdefault(self.manifest["owners"].get(name), []).append(name)
+        for owner, names in groups.items():
+            if len(names) > 1:
+                self._merge(names, owner)
+
+    def _merge(self, names: List[str], owner: Optional[str]) -> None:
+        """Merge segments *names* into one.
+
+        Works on the encoded columns, so memory stays at a few dozen bytes per row
+        plus one account id per row; memo text is streamed from the old segments.
+        """
+        with self._lock:
+            segs = [s for s in self._segments if os.path.basename(s.path) in names]
+            accounts = np.concatenate([np.asarray(s.account_of(np.arange(len(s)))) for s in segs])
+            date = np.concatenate([np.asarray(s.date) for s in segs])
+            order = np.lexsort((date, accounts))
+            seg_of = np.repeat(np.arange(len(segs)), [len(s) for s in segs])[order]
+            local = (order - np.repeat(np.cumsum([0] + [len(s) for s in segs[:-1]]), [len(s) for s in segs])[order])
+
+            def memos():
+                for i, r in zip(seg_of.tolist(), local.tolist()):
+                    seg = segs[i]
+                    yield bytes(seg.memo[seg.memo_off[r]:seg.memo_off[r + 1]])
+
+            self._write_segment(accounts[order], date[order],
+                                np.concatenate([np.asarray(s.memo_id) for s in segs])[order],
+                                {c: np.concatenate([np.asarray(s.codes[c]) for s in segs])[order]
+                                 for c in DICT_COLUMNS}, memos(), owner)
+            self._drop(names)
+            self._save_manifest()
+        self._remove(names)
+
+    # ─────────────────────────── reading ──────────────────────────────
+
+    def vocab(self, column: str) -> np.ndarray:
+        """Decoded values of a dictionary column, indexed by code."""
+        if column not in self._vocab:
+            self._vocab[column] = np.asarray(self.manifest["dicts"][column], dtype=object)
+        return self._vocab[column]
+
+    def _frame(self, parts: List[Tuple[_Segment, np.ndarray]]) -> pd.DataFrame:
+        cols: Dict[str, list] = {c: [] for c in COLUMNS}
+        for seg, rows in parts:
+            if not len(rows):
+                continue
+            cols["Memo ID"].append(seg.memo_id[rows])
+            cols["account_id"].append(seg.account_of(rows).astype(str))
+            days = seg.date[rows]
+            dates = (days.astype("timedelta64[D]") + _EPOCH).astype(str).astype(object)
+            dates[days == NO_DATE] = None
+            cols["Date"].append(dates)
+            cols["Memo"].append(np.asarray(seg.memos(rows), dtype=object))
+            for c in DICT_COLUMNS:
+                cols[c].append(self.vocab(c)[seg.codes[c][rows]])
+        if not cols["Memo ID"]:
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.DataFrame({c: np.concatenate(v) for c, v in cols.items()})
+
+    def account(self, account_id: str, start=None, end=None) -> pd.DataFrame:
+        """Memos of one account in date order, optionally within ``[start, end]`` (ISO dates)."""
+        key = account_id.encode()
+        lo_day, hi_day = _day(start), _day(end)
+        parts = []
+        for seg in self._segments:
+            a, b = seg.rows_for(key)
+            if a == b:
+                continue
+            if lo_day is not None:  # rows of an account are date-sorted within a segment
+                a += int(np.searchsorted(seg.date[a:b], lo_day, side="left"))
+            if hi_day is not None:
+                b = a + int(np.searchsorted(seg.date[a:b], hi_day, side="right"))
+            parts.append((seg, np.arange(a, b)))
+        df = self._frame(parts)
+        return df.sort_values("Date", kind="stable", ignore_index=True) if len(parts) > 1 else df
+
+    def date_range(self, start=None, end=None, **equals) -> pd.DataFrame:
+        """Memos dated within ``[start, end]``, optionally filtered on dictionary columns,
+        e.g. ``date_range("2025-01-01", "2025-01-31", Intent="Reset PIN")``."""
+        lo_day, hi_day = _day(start), _day(end)
+        wanted = {c: self._index[c].get(v, -1) for c, v in equals.items()}
+        parts = []
+        for seg in self._segments:
+            mask = np.ones(len(seg), bool)
+            if lo_day is not None:
+                mask &= seg.date >= lo_day
+            if hi_day is not None:
+                mask &= seg.date <= hi_day
+            for c, code in wanted.items():
+                mask &= seg.codes[c] == code
+            parts.append((seg, np.flatnonzero(mask)))
+        return self._frame(parts)
+
+    def accounts(self) -> np.ndarray:
+        """All account ids, sorted."""
+        if not self._segments:
+            return np.empty(0, dtype=str)
+        return np.unique(np.concatenate([np.asarray(s.accounts) for s in self._segments])).astype(str)
+
+    def iter_accounts(self, batch: int = 1000) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """``(account_id, memos)`` for every account, in account order."""
+        ids = self.accounts()
+        for i in range(0, len(ids), batch):
+            for account_id in ids[i:i + batch]:
+                yield account_id, self.account(account_id)
+
+    def to_frame(self) -> pd.DataFrame:
+        return self._frame([(s, np.arange(len(s))) for s in self._segments])
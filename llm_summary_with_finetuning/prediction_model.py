@@ -1,12 +1,33 @@
-import spacy
+"""Intent prediction for call memos with a spaCy text classifier.
+
+Importing this module does no work: the trained model is loaded once per
+process on the first prediction and reused. `predict_intents` scores many
+texts with ``nlp.pipe`` (batched, optionally across worker processes).
+
+Training (`intent_training`: chunked, cached, with early stopping) and bulk
+scoring run from the command line:
+
+    python prediction_model.py train --data historical_activity_logs.csv
+    python prediction_model.py predict --csv large_call_center_memos.csv --out memo_intents.csv --n-process 4
+"""
+
+import argparse
+import json
+import random
+import time
+
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
+import spacy
+from spacy.training import Example
 from spacy.util import minibatch
-import random
 
-# Load SpaCy's English model
-nlp = spacy.blank("en")
+# Constants
+MODEL_PATH = "intent_prediction_model"
+TRAINING_CSV = "historical_activity_logs.csv"  # Replace with your CSV file path
+BATCH_SIZE = 256
+
+# Trained models, one per path, loaded on first use
+_MODELS = {}
 
 # Function to prepare training data
 def prepare_training_data(dataframe, text_column, label_column):
@@ -19,12 +40,8 @@ def prepare_training_data(dataframe, text_column, label_column):
     Returns:
         list: A list of tuples in the format (text, {"cats": {"label": value}}).
     """
-    training_data = []
-    for _, row in dataframe.iterrows():
-        text = row[text_column]
-        label = row[label_column]
-        training_data.append((text, {"cats": {label: 1.0}}))
-    return training_data
+    return [(text, {"cats": {label: 1.0}})
+            for text, label in zip(dataframe[text_column], dataframe[label_column])]
 
 # Function to train the intent prediction model
 def train_intent_model(training_data, n_iter=10):
@@ -36,80 +53,137 @@ def train_intent_model(training_data, n_iter=10):
     Returns:
         nlp: The trained SpaCy model.
     """
-    # Add the text categorizer to the pipeline
-    if "textcat" not in nlp.pipe_names:
-        textcat = nlp.add_pipe("textcat", last=True)
-    else:
-        textcat = nlp.get_pipe("textcat")
+    nlp = spacy.blank("en")
+    textcat = nlp.add_pipe("textcat", last=True)
 
     # Add labels to the text categorizer
-    for _, annotations in training_data:
-        for label in annotations["cats"]:
-            textcat.add_label(label)
+    labels = sorted({label for _, annotations in training_data for label in annotations["cats"]})
+    for label in labels:
+        textcat.add_label(label)
 
-    # Convert training data to SpaCy's format
-    train_data = [(nlp.make_doc(text), annotations) for text, annotations in training_data]
+    # Convert training data to SpaCy's format; every label is scored, 0.0 unless it is the gold one
+    train_data = [Example.from_dict(nlp.make_doc(text), {"cats": {l: annotations["cats"].get(l, 0.0) for l in labels}})
+                  for text, annotations in training_data]
 
     # Train the model
-    optimizer = nlp.begin_training()
+    optimizer = nlp.initialize(lambda: train_data)
     for i in range(n_iter):
         random.shuffle(train_data)
         losses = {}
         for batch in minibatch(train_data, size=8):
-            texts, annotations = zip(*batch)
-            nlp.update(texts, annotations, sgd=optimizer, losses=losses)
+            nlp.update(batch, sgd=optimizer, losses=losses)
         print(f"Iteration {i + 1}, Loss: {losses['textcat']}")
 
     return nlp
 
+# Function to load a trained model
+def load_model(model_path=MODEL_PATH):
+    """Load the model at *model_path* once per process and reuse it."""
+    if model_path not in _MODELS:
+        _MODELS[model_path] = spacy.load(model_path)
+    return _MODELS[model_path]
+
+# Function to predict intents in bulk
+def predict_intents(texts, model_path=MODEL_PATH, nlp=None, batch_size=BATCH_SIZE, n_process=1):
+    """
+    Predicts the intent of many texts in one pass with ``nlp.pipe``.
+    Args:
+        texts (iterable of str): The input texts; missing values are scored as empty text.
+        model_path (str): Path to the trained model (ignored when *nlp* is given).
+        nlp: An already loaded model, e.g. straight from training.
+        batch_size (int): Texts per pipeline batch.
+        n_process (int): Worker processes; -1 uses every CPU.
+    Returns:
+        list: The predicted intent of each text, in order.
+    """
+    nlp = nlp if nlp is not None else load_model(model_path)
+    texts = (t if isinstance(t, str) else "" for t in texts)
+    return [max(doc.cats, key=doc.cats.get) for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)]
+
+# Function to predict a single intent
+def predict_intent(text, model_path=MODEL_PATH):
+    """
+    Predicts the intent of a given text using the trained model.
+    Args:
+        text (str): The input text.
+        model_path (str): Path to the trained model.
+    Returns:
+        str: The predicted intent.
+    """
+    return predict_intents([text], model_path)[0]
+
 # Function to evaluate the model
-def evaluate_model(nlp, test_data):
+def evaluate_model(nlp, test_data, batch_size=BATCH_SIZE, n_process=1):
     """
-    Evaluates the trained SpaCy model on test data.
+    Evaluates the trained SpaCy model on test data, scoring each document once.
     Args:
         nlp: The trained SpaCy model.
         test_data (list): The test data in SpaCy's format.
     Returns:
-        None
+        str: The classification report.
     """
+    from sklearn.metrics import classification_report
+
     texts, annotations = zip(*test_data)
     true_labels = [max(ann["cats"], key=ann["cats"].get) for ann in annotations]
-    predictions = [max(nlp(text).cats, key=nlp(text).cats.get) for text in texts]
-    print(classification_report(true_labels, predictions))
+    predictions = predict_intents(texts, nlp=nlp, batch_size=batch_size, n_process=n_process)
+    report = classification_report(true_labels, predictions)
+    print(report)
+    return report
 
-# Load historical activity logs
-data = pd.read_csv("historical_activity_logs.csv")  # Replace with your CSV file path
+# Function to score a memo CSV
+def predict_csv(path, out_path, text_column="Memo", model_path=MODEL_PATH, chunksize=100_000,
+                batch_size=BATCH_SIZE, n_process=1):
+    """Stream a memo CSV through `predict_intents` in chunks, adding a ``PredictedIntent`` column; returns rows written."""
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(path, chunksize=chunksize)):
+        chunk["PredictedIntent"] = predict_intents(chunk[text_column], model_path,
+                                                   batch_size=batch_size, n_process=n_process)
+        chunk.to_csv(out_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(chunk)
+    return rows
 
-# Prepare the data
-data["combined_text"] = data["AgentMemo"] + " " + data["AccountActivity"] + " " + data["PreviousCallData"]
-training_data, test_data = train_test_split(data, test_size=0.2, random_state=42)
-train_data = prepare_training_data(training_data, text_column="combined_text", label_column="Intent")
-test_data = prepare_training_data(test_data, text_column="combined_text", label_column="Intent")
+# Function to train, evaluate and save a model from historical activity logs
+def train(data_path=TRAINING_CSV, model_path=MODEL_PATH, n_iter=10, n_process=1):
+    """Train with the chunked, cached pipeline in `intent_training` (at most *n_iter* epochs) and cache the result."""
+    from intent_training import TrainingConfig, train as train_pipeline
 
-# Train the model
-trained_model = train_intent_model(train_data, n_iter=10)
+    report = train_pipeline(TrainingConfig(data_path, model_path, max_epochs=n_iter, n_process=n_process))
+    print(json.dumps(report.as_dict(), indent=2))
+    _MODELS.pop(model_path, None)
+    return load_model(model_path)
 
-# Evaluate the model
-evaluate_model(trained_model, test_data)
 
-# Save the model
-trained_model.to_disk("intent_prediction_model")
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model", default=MODEL_PATH)
+    sub = ap.add_subparsers(dest="command", required=True)
+    tr = sub.add_parser("train", help="train, evaluate and save the model")
+    tr.add_argument("--data", default=TRAINING_CSV)
+    tr.add_argument("--iterations", type=int, default=10, help="maximum epochs (training stops early)")
+    tr.add_argument("--n-process", type=int, default=1)
+    pr = sub.add_parser("predict", help="predict intents for a text or a memo CSV")
+    pr.add_argument("text", nargs="?")
+    pr.add_argument("--csv")
+    pr.add_argument("--out", default="memo_intents.csv")
+    pr.add_argument("--column", default="Memo")
+    pr.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    pr.add_argument("--n-process", type=int, default=1)
+    args = ap.parse_args()
 
-# Example usage
-def predict_intent(text, model_path="intent_prediction_model"):
-    """
-    Predicts the intent of a given text using the trained model.
-    Args:
-        text (str): The input text.
-        model_path (str): Path to the trained model.
-    Returns:
-        str: The predicted intent.
-    """
-    nlp = spacy.load(model_path)
-    doc = nlp(text)
-    return max(doc.cats, key=doc.cats.get)
-
-# Example prediction
-example_text = "Customer requested a PIN reset and reported a suspicious transaction."
-predicted_intent = predict_intent(example_text)
-print(f"Predicted Intent: {predicted_intent}")
\ No newline at end of file
+    if args.command == "train":
+        train(args.data, args.model, args.iterations, args.n_process)
+    elif args.csv:
+        start = time.perf_counter()
+        rows = predict_csv(args.csv, args.out, args.column, args.model,
+                           batch_size=args.batch_size, n_process=args.n_process)
+        elapsed = time.perf_counter() - start
+        print(f"Scored {rows} memos in {elapsed:.1f}s ({rows / elapsed:.0f}/s) -> {args.out}")
+    else:
+        # Example prediction
+        text = args.text or "Customer requested a PIN reset and reported a suspicious transaction."
+        print(f"Predicted Intent: {predict_intent(text, args.model)}")
+
+
+if __name__ == "__main__":
+    main()
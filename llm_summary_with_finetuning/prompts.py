@@ -0,0 +1,69 @@
+"""Prompt construction for call summaries, shared by the interactive and batch paths."""
+
+import pandas as pd
+
+SUMMARY_MODEL = "gemini-2.5-pro-preview-03-25"
+
+SUMMARY_TASK = """Write a plain-English call summary for the account representative.
+- Use the glossary meanings where applicable.
+- Keep the summary concise and under 120 words.
+- Format the summary as bullet points for clarity.
+- Include information that is missing abbreviations.
+- Predict customer call intent based on the memo.
+- Only respond with the summary and return in 3-5 bullet points.
+- Respond with "Call Summary:" and then the summary for most important topics on recent information with respective dates with call intent."""
+
+
+# Function to render an account's memos as prompt text
+def format_memos(memos: pd.DataFrame) -> str:
+    """Date and memo columns as the plain-text table the summary prompt expects."""
+    return pd.concat([memos['Date'], memos['Memo']], axis=1).to_string(index=False)
+
+
+# Function to build the summary prompt
+def build_prompt(memo_text: str, defs: dict) -> str:
+    """Glossary block, memo text and task instructions as one prompt."""
+    glossary_block = "\n".join(f"{k} = {v}" for k, v in defs.items())
+    return f"""
+### Glossary
+{glossary_block}
+
+### Memo
+{memo_text}
+
+### Task
+{SUMMARY_TASK}
+"""
+
+
+UPDATE_TASK = """Update the call summary for the account representative with the new memos.
+- Keep points from the previous summary that are still relevant; replace outdated ones.
+- Use the glossary meanings where applicable.
+- Keep the summary concise and under 120 words, as 3-5 bullet points.
+- Predict customer call intent based on the memos.
+- Respond with "Call Summary:" and then the summary for most important topics on recent information with respective dates with call intent."""
+
+
+# Function to build the incremental (update) prompt
+def build_update_prompt(previous_summary: str, watermark: str, memo_text: str, defs: dict) -> str:
+    """Previous summary, glossary block for the new memos, the new memos and update instructions."""
+    glossary_block = "\n".join(f"{k} = {v}" for k, v in defs.items())
+    return f"""
+### Previous Summary (memos through {watermark})
+{previous_summary}
+
+### Glossary
+{glossary_block}
+
+### New Memos
+{memo_text}
+
+### Task
+{UPDATE_TASK}
+"""
+
+
+# Function to estimate prompt size
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return (len(text) + 3) // 4